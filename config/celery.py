@@ -3,6 +3,14 @@ from __future__ import absolute_import, unicode_literals
 import os
 
 from celery import Celery  # type: ignore
+from celery.signals import (  # type: ignore
+    task_failure,
+    task_postrun,
+    task_prerun,
+    task_retry,
+    worker_init,
+    worker_process_shutdown,
+)
 
 # Установка переменной окружения для настроек проекта. Указывает Celery, где искать настройки Django.
 # Без этого Celery не будет знать, какой проект загружать. Вместо "my_project" нужно указать "config".
@@ -19,3 +27,78 @@ app.config_from_object("django.conf:settings", namespace="CELERY")
 # Celery будет автоматически искать файлы tasks.py в каждом приложении Django. Это значит, что не нужно
 # вручную регистрировать каждую задачу.
 app.autodiscover_tasks()
+
+
+@worker_init.connect
+def configure_worker_database_connections(**kwargs):
+    """Настройка соединений с БД в воркере Celery (главный процесс, до запуска дочерних процессов prefork):
+    - вместо пула psycopg 3 (DATABASE_POOL=True) - постоянные соединения на CELERY_DATABASE_CONN_MAX_AGE секунд;
+    - открытые соединения и пулы закрываются, чтобы дочерние процессы не унаследовали сокеты и фоновые потоки пула.
+    """
+    from django.conf import settings
+
+    from config.db import close_connection_pools, use_persistent_connections
+
+    use_persistent_connections(settings.CELERY_DATABASE_CONN_MAX_AGE)
+    close_connection_pools()
+
+
+@task_prerun.connect
+def close_old_database_connections(task=None, **kwargs):
+    """Перед задачей закрываются соединения старше CONN_MAX_AGE, а перед первым запросом проверяется, что постоянное
+    соединение живо (CONN_HEALTH_CHECKS) - так же, как Django делает в начале каждого HTTP-запроса. Задачи, которые
+    выполняются сразу в процессе веб-приложения (CELERY_TASK_ALWAYS_EAGER), не трогают соединения запроса."""
+    if task is not None and task.request.is_eager:
+        return
+
+    from django.db import close_old_connections
+
+    close_old_connections()
+
+
+@worker_init.connect
+def start_worker_metrics(**kwargs):
+    """Метрики задач (config/metrics.py) в главном процессе воркера: очистка файлов PROMETHEUS_MULTIPROC_DIR прошлого
+    запуска и HTTP-сервер метрик на порту CELERY_METRICS_PORT."""
+    from config.metrics import reset_multiprocess_directory, start_worker_metrics_server
+
+    reset_multiprocess_directory()
+    start_worker_metrics_server()
+
+
+@worker_process_shutdown.connect
+def mark_worker_process_dead(pid=None, **kwargs):
+    """Дочерний процесс prefork завершается (перезапуск после worker_max_tasks_per_child, остановка воркера):
+    удаляются его данные, которые не должны суммироваться с живыми процессами - так же, как хук child_exit в
+    config/gunicorn.conf.py для воркеров gunicorn."""
+    from config.metrics import mark_process_dead
+
+    mark_process_dead(pid or os.getpid())
+
+
+@task_prerun.connect
+def record_task_start(task_id=None, **kwargs):
+    from config.metrics import task_started
+
+    task_started(task_id)
+
+
+@task_postrun.connect
+def record_task_duration(task_id=None, task=None, state=None, **kwargs):
+    from config.metrics import task_finished
+
+    task_finished(task_id, task.name, state)
+
+
+@task_retry.connect
+def record_task_retry(sender=None, **kwargs):
+    from config.metrics import task_retried
+
+    task_retried(sender.name)
+
+
+@task_failure.connect
+def record_task_failure(sender=None, exception=None, **kwargs):
+    from config.metrics import task_failed
+
+    task_failed(sender.name, exception)
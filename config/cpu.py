@@ -0,0 +1,20 @@
+import math
+import os
+
+
+def get_cpu_count():
+    """Количество CPU, доступных контейнеру: ограничение cgroup v2 (docker --cpus / deploy.resources.limits.cpus),
+    иначе CPU, на которых процессу разрешено выполняться. os.cpu_count() в контейнере возвращает все CPU хоста,
+    и процессов (воркеров gunicorn, процессов хеширования паролей) получилось бы больше, чем контейнер может
+    выполнить."""
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            return max(1, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
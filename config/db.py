@@ -0,0 +1,157 @@
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.functional import LazyObject, empty
+from rest_framework.permissions import SAFE_METHODS
+
+
+def close_connection_pools():
+    """Закрывает пулы соединений psycopg 3 (DATABASE_POOL=True) и обычные соединения с БД текущего процесса.
+    Вызывается в родительском процессе перед fork (мастер gunicorn после прогрева с preload_app, главный процесс
+    Celery перед запуском дочерних процессов): соединения и фоновые потоки пула нельзя разделить между процессами,
+    поэтому каждый дочерний процесс должен открыть свой пул при первом запросе к БД."""
+    for connection in connections.all(initialized_only=True):
+        connection.close()
+        # close_pool() есть только у бэкенда PostgreSQL (Django 5.1+) и ничего не делает без пула
+        close_pool = getattr(connection, "close_pool", None)
+        if close_pool is not None:
+            close_pool()
+
+
+def use_persistent_connections(conn_max_age):
+    """Переключает соединения с БД текущего процесса с пула psycopg 3 на постоянные соединения (CONN_MAX_AGE).
+    Используется в воркерах Celery: процесс prefork выполняет одну задачу за раз, поэтому пул ему не нужен, а
+    встроенная интеграция Celery с Django закрывает пул после каждой задачи (и открывала бы его заново).
+    :param conn_max_age: Время жизни соединения в секундах.
+    """
+    for alias in connections:
+        settings_dict = connections[alias].settings_dict
+        settings_dict["CONN_MAX_AGE"] = conn_max_age
+        settings_dict.get("OPTIONS", {}).pop("pool", None)
+
+
+# Запрос, который сейчас обрабатывается (PrimaryReplicaMiddleware). ContextVar, а не threading.local: в режиме ASGI
+# запрос может выполняться в разных потоках (sync_to_async), а контекст копируется вместе с ним
+_current_request = ContextVar("current_request", default=None)
+
+# Ключ в кэше: пользователь недавно что-то изменил и читает из основной БД
+PRIMARY_PIN_CACHE_KEY = "db:pin-primary:{}"
+
+
+def get_replica_alias():
+    """Алиас реплики для чтения из DATABASE_REPLICA_ALIAS или None, если реплика не настроена."""
+    alias = settings.DATABASE_REPLICA_ALIAS
+    if alias and alias in settings.DATABASES:
+        return alias
+    return None
+
+
+def is_pinned_to_primary(request):
+    """Проверяет, что запрос должен читать из основной БД, несмотря на безопасный метод:
+    - пользователь еще не определен (идет аутентификация - пользователь читается из основной БД);
+    - в этом запросе уже была запись;
+    - пользователь что-то изменил в последние DATABASE_REPLICA_PIN_SECONDS секунд (реплика могла еще не получить
+    изменения). Результат проверки кэша запоминается на время запроса.
+    """
+    if getattr(request, "_db_written", False):
+        return True
+    # DRF записывает пользователя, определенного по JWT, в исходный HttpRequest (request.user). До этого там ленивый
+    # объект AuthenticationMiddleware - его нельзя вычислять здесь: это запрос в БД изнутри роутера
+    user = request.__dict__.get("user")
+    if user is None or (isinstance(user, LazyObject) and user._wrapped is empty):
+        return True
+    if not user.is_authenticated:
+        return False
+    if not hasattr(request, "_db_pinned_to_primary"):
+        request._db_pinned_to_primary = bool(cache.get(PRIMARY_PIN_CACHE_KEY.format(user.pk)))
+    return request._db_pinned_to_primary
+
+
+class PrimaryReplicaRouter:
+    """Роутер БД (DATABASE_ROUTERS): чтение в безопасных запросах (GET, HEAD, OPTIONS) идет в реплику
+    DATABASE_REPLICA_ALIAS, запись и все остальное - в основную БД.
+    В основную БД читают также: код вне HTTP-запросов (задачи Celery, команды), запросы внутри транзакции,
+    запросы после записи и пользователи, закрепленные за основной БД после записи (is_pinned_to_primary).
+    Без реплики (DATABASE_REPLICA_ALIAS не задан) роутер ничего не меняет."""
+
+    def db_for_read(self, model, **hints):
+        request = _current_request.get()
+        if request is None or request.method not in SAFE_METHODS:
+            return None
+        alias = get_replica_alias()
+        if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block or is_pinned_to_primary(request):
+            return None
+        return alias
+
+    def db_for_write(self, model, **hints):
+        # Явно основная БД: без этого Django сохранил бы объект, прочитанный из реплики, обратно в реплику
+        request = _current_request.get()
+        if request is not None:
+            request._db_written = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Основная БД и реплика - одни и те же данные, связи между объектами из них допустимы
+        databases = {DEFAULT_DB_ALIAS, get_replica_alias()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Реплика получает схему из основной БД (репликация), миграции на нее не применяются
+        if db == get_replica_alias():
+            return False
+        return None
+
+
+class PrimaryReplicaMiddleware:
+    """Запоминает текущий запрос для PrimaryReplicaRouter, а после запроса с записью в БД закрепляет пользователя
+    за основной БД на DATABASE_REPLICA_PIN_SECONDS секунд: следующие запросы (например, получение объекта после
+    perform_update) читают из основной БД, пока изменения доходят до реплики."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        # Под ASGI Django передает корутину - тогда и middleware работает как корутина (без переключения потоков)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        token = _current_request.set(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_request.reset(token)
+
+        if getattr(request, "_db_written", False) and get_replica_alias():
+            self.pin_to_primary(request)
+        return response
+
+    async def __acall__(self, request):
+        """Асинхронный вариант __call__ (ASGI). ContextVar с запросом копируется в потоки sync_to_async, поэтому
+        роутер видит запрос и в асинхронном ORM, и в синхронных контроллерах."""
+        token = _current_request.set(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_request.reset(token)
+
+        if getattr(request, "_db_written", False) and get_replica_alias():
+            # request.user может быть ленивым объектом (запрос в БД) - вычисляется в потоке
+            await sync_to_async(self.pin_to_primary)(request)
+        return response
+
+    @staticmethod
+    def pin_to_primary(request):
+        """Закрепляет пользователя, который изменил данные, за основной БД на DATABASE_REPLICA_PIN_SECONDS секунд."""
+        user = getattr(request, "user", None)
+        if user and user.is_authenticated:
+            cache.set(PRIMARY_PIN_CACHE_KEY.format(user.pk), True, settings.DATABASE_REPLICA_PIN_SECONDS)
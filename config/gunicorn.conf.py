@@ -0,0 +1,79 @@
+"""
+Конфигурация gunicorn для запуска приложения в Docker (entrypoint.sh: gunicorn -c config/gunicorn.conf.py).
+
+Все значения можно переопределить переменными окружения (.env.docker):
+    - SERVER_MODE - wsgi (по умолчанию) или asgi (воркеры uvicorn, см. users/async_views.py);
+    - GUNICORN_WORKERS - количество процессов (по умолчанию от количества доступных CPU);
+    - GUNICORN_THREADS - количество потоков в процессе для WSGI (по умолчанию 4, воркер gthread);
+    - GUNICORN_MAX_REQUESTS / GUNICORN_MAX_REQUESTS_JITTER - перезапуск воркера после N запросов;
+    - GUNICORN_TIMEOUT - время (в секундах), после которого зависший воркер перезапускается.
+"""
+
+import os
+
+from config.cpu import get_cpu_count
+
+SERVER_MODE = os.getenv("SERVER_MODE") or "wsgi"
+
+# Ограничение CPU контейнера (cgroup), а не все CPU хоста
+cpu_count = get_cpu_count()
+
+bind = os.getenv("GUNICORN_BIND") or "0.0.0.0:8000"
+
+if SERVER_MODE == "asgi":
+    # Воркер uvicorn сам обслуживает много соединений в цикле событий, поэтому достаточно процесса на CPU
+    wsgi_app = "config.asgi:application"
+    worker_class = "uvicorn_worker.UvicornWorker"
+    workers = int(os.getenv("GUNICORN_WORKERS") or cpu_count)
+else:
+    # Классическая формула gunicorn (2 * CPU + 1) и потоки: запросы в основном ждут Stripe и БД, а не CPU.
+    # При threads > 1 gunicorn использует воркер gthread.
+    wsgi_app = "config.wsgi:application"
+    workers = int(os.getenv("GUNICORN_WORKERS") or cpu_count * 2 + 1)
+    threads = int(os.getenv("GUNICORN_THREADS") or 4)
+
+# Приложение (Django, контроллеры, DRF) загружается один раз в мастер-процессе, воркеры получают его после fork:
+# быстрее запуск и перезапуск воркеров и меньше памяти (общие страницы copy-on-write)
+preload_app = True
+
+# Перезапуск воркера после max_requests запросов ограничивает рост памяти (фрагментация, кэши в процессе).
+# Случайная добавка jitter, чтобы воркеры не перезапускались одновременно
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS") or 1000)
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER") or max_requests // 10)
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT") or 30)
+graceful_timeout = 30
+# Время ожидания следующего запроса в keep-alive соединении от nginx: больше, чем keepalive_timeout в upstream
+# nginx/nginx.conf (60 с), иначе gunicorn может закрыть соединение в момент, когда nginx отправляет в него запрос
+keepalive = 75
+
+# Файл heartbeat воркеров в памяти, а не на диске контейнера (overlayfs), иначе при медленном диске мастер
+# считает воркер зависшим
+worker_tmp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+accesslog = "-"
+errorlog = "-"
+
+
+def on_starting(server):
+    """Хук gunicorn: запуск мастер-процесса. Файлы метрик воркеров прошлого запуска (PROMETHEUS_MULTIPROC_DIR,
+    config/metrics.py) удаляются, иначе /metrics суммировал бы их с новыми."""
+    from config.metrics import reset_multiprocess_directory
+
+    reset_multiprocess_directory()
+
+
+def child_exit(server, worker):
+    """Хук gunicorn: воркер завершился (перезапуск после max_requests, таймаут)."""
+    from config.metrics import mark_process_dead
+
+    mark_process_dead(worker.pid)
+
+
+def when_ready(server):
+    """Хук gunicorn: мастер-процесс готов, воркеры еще не запущены. Прогреваю приложение (config/warmup.py), чтобы
+    каждый воркер не делал это на первых запросах."""
+    from config.warmup import warmup_application
+
+    elapsed = warmup_application()
+    server.log.info(f"Приложение прогрето за {elapsed:.2f} с (воркеров: {server.num_workers})")
@@ -0,0 +1,173 @@
+import os
+import time
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Histogram, multiprocess, start_http_server
+from prometheus_client.exposition import choose_encoder
+
+from config.timing import get_request_timings
+
+# Метрики в формате Prometheus (адрес /metrics у веб-приложения, CELERY_METRICS_PORT у воркера Celery).
+# Несколько процессов (воркеры gunicorn, дочерние процессы Celery prefork): если задана переменная окружения
+# PROMETHEUS_MULTIPROC_DIR (до запуска процесса - prometheus_client читает ее при импорте), каждый процесс пишет
+# значения в свои файлы в этой папке, а /metrics суммирует файлы всех процессов (MultiProcessCollector). Без нее
+# метрики хранятся в памяти процесса, и /metrics показывает только процесс, который обработал запрос.
+
+# Границы корзин гистограмм (в секундах): от быстрых ответов из кэша до запросов, которые ждут Stripe
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+TASK_DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900)
+
+# Методы, которые попадают в метки как есть. Остальные - "other", чтобы произвольный метод в запросе не создавал
+# новые временные ряды
+HTTP_METHODS = {"GET", "HEAD", "OPTIONS", "POST", "PUT", "PATCH", "DELETE"}
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Время обработки HTTP-запроса в Django",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+HTTP_DB_QUERIES = Counter(
+    "http_db_queries",
+    "Количество SQL-запросов при обработке HTTP-запросов",
+    ["method", "route"],
+)
+HTTP_DB_QUERY_SECONDS = Counter(
+    "http_db_query_seconds",
+    "Время SQL-запросов при обработке HTTP-запросов",
+    ["method", "route"],
+)
+CELERY_TASK_DURATION = Histogram(
+    "celery_task_duration_seconds",
+    "Время выполнения задачи Celery",
+    ["task", "state"],
+    buckets=TASK_DURATION_BUCKETS,
+)
+CELERY_TASK_RETRIES = Counter("celery_task_retries", "Количество повторов задач Celery", ["task"])
+CELERY_TASK_FAILURES = Counter(
+    "celery_task_failures",
+    "Количество задач Celery, завершившихся ошибкой",
+    ["task", "exception"],
+)
+
+# Время начала выполняющихся задач текущего процесса по task_id (task_prerun -> task_postrun)
+_task_started = {}
+
+
+def is_multiprocess_mode():
+    """Метрики хранятся в файлах PROMETHEUS_MULTIPROC_DIR (несколько процессов)."""
+    return bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+
+def get_metrics_registry():
+    """Реестр для выдачи метрик: в режиме нескольких процессов - сумма файлов всех процессов, иначе метрики
+    текущего процесса."""
+    if not is_multiprocess_mode():
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def reset_multiprocess_directory():
+    """Очищает PROMETHEUS_MULTIPROC_DIR при запуске мастер-процесса gunicorn или главного процесса воркера Celery
+    (до запуска дочерних процессов): файлы процессов прошлого запуска иначе суммировались бы с новыми."""
+    if not is_multiprocess_mode():
+        return
+    directory = Path(os.environ["PROMETHEUS_MULTIPROC_DIR"])
+    directory.mkdir(parents=True, exist_ok=True)
+    for path in directory.glob("*.db"):
+        path.unlink(missing_ok=True)
+
+
+def mark_process_dead(pid):
+    """Удаляет данные завершившегося процесса, которые не должны суммироваться (gauge с режимом livesum)."""
+    if is_multiprocess_mode():
+        multiprocess.mark_process_dead(pid)
+
+
+def metrics_view(request):
+    """Метрики всех процессов веб-приложения в текстовом формате Prometheus (формат по заголовку Accept).
+    Адрес не должен быть доступен снаружи: в nginx/nginx.conf закрыт, Prometheus собирает метрики напрямую
+    с web:8000/metrics."""
+    encoder, content_type = choose_encoder(request.headers.get("Accept"))
+    return HttpResponse(encoder(get_metrics_registry()), content_type=content_type)
+
+
+def get_route_label(request):
+    """Шаблон URL запроса (например, api/lesson/<int:pk>/) - метка для группировки, а не путь с ID объектов."""
+    resolver_match = getattr(request, "resolver_match", None)
+    return resolver_match.route if resolver_match else "unmatched"
+
+
+class PrometheusMiddleware:
+    """Метрики HTTP-запросов: время обработки по шаблону URL, методу и статусу ответа, количество и время
+    SQL-запросов (из замеров config.timing.RequestTimingMiddleware, поэтому указывается сразу после него)."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        # Под ASGI Django передает корутину - тогда и middleware работает как корутина (без переключения потоков)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        started = time.perf_counter()
+        response = self.get_response(request)
+        self.observe(request, response, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        """Асинхронный вариант __call__ (ASGI)."""
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        self.observe(request, response, time.perf_counter() - started)
+        return response
+
+    @staticmethod
+    def observe(request, response, duration):
+        """Записывает метрики запроса (время обработки, количество и время SQL-запросов)."""
+        method = request.method if request.method in HTTP_METHODS else "other"
+        route = get_route_label(request)
+        HTTP_REQUEST_DURATION.labels(method, route, str(response.status_code)).observe(duration)
+        timings = get_request_timings()
+        if timings is not None and timings.db_queries:
+            HTTP_DB_QUERIES.labels(method, route).inc(timings.db_queries)
+            HTTP_DB_QUERY_SECONDS.labels(method, route).inc(timings.db_time)
+
+
+def task_started(task_id):
+    """Сигнал task_prerun: начало выполнения задачи."""
+    _task_started[task_id] = time.perf_counter()
+
+
+def task_finished(task_id, task_name, state):
+    """Сигнал task_postrun: время выполнения задачи с итоговым состоянием (SUCCESS, FAILURE, RETRY)."""
+    started = _task_started.pop(task_id, None)
+    if started is not None:
+        CELERY_TASK_DURATION.labels(task_name, state or "UNKNOWN").observe(time.perf_counter() - started)
+
+
+def task_retried(task_name):
+    """Сигнал task_retry."""
+    CELERY_TASK_RETRIES.labels(task_name).inc()
+
+
+def task_failed(task_name, exception):
+    """Сигнал task_failure."""
+    CELERY_TASK_FAILURES.labels(task_name, type(exception).__name__).inc()
+
+
+def start_worker_metrics_server():
+    """Запускает HTTP-сервер метрик в главном процессе воркера Celery (CELERY_METRICS_PORT, 0 - не запускать).
+    Дочерние процессы prefork пишут метрики в PROMETHEUS_MULTIPROC_DIR, а сервер отдает их сумму."""
+    if settings.CELERY_METRICS_PORT:
+        start_http_server(settings.CELERY_METRICS_PORT, registry=get_metrics_registry())
@@ -0,0 +1,102 @@
+import hashlib
+from functools import cache
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.module_loading import import_string
+from drf_yasg import openapi
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+# Описание API (SWAGGER_SETTINGS["DEFAULT_INFO"])
+API_INFO = openapi.Info(
+    title="LMS API",
+    default_version="v1",
+    description="Документация к API LMS-платформы",
+    contact=openapi.Contact(email="maks_lakovich@gmail.com"),
+    license=openapi.License(name="BSD License"),
+)
+
+# Генераторы, кодеки и рендеры drf_yasg импортируются внутри функций: вместе с ними загружаются
+# swagger_spec_validator и jsonschema, которые нужны только для генерации схемы и страниц документации, а не для
+# каждого процесса, загружающего config.urls
+
+
+def get_live_schema_view():
+    """Контроллер, генерирующий схему на каждый запрос - только для разработки (DEBUG=True), чтобы изменения
+    в контроллерах и сериализаторах сразу были видны в документации."""
+    from drf_yasg.views import get_schema_view
+
+    return get_schema_view(API_INFO, public=True, permission_classes=(permissions.AllowAny,))
+
+
+def build_openapi_schema():
+    """Генерирует схему OpenAPI (Swagger 2.0) по всем контроллерам и сериализаторам проекта.
+    Это дорогая операция (разбор всех URL-шаблонов, контроллеров, сериализаторов и фильтров), поэтому она
+    выполняется при сборке (команда build_openapi_schema) или один раз в процессе, а не на каждый запрос.
+    :return: Схема в формате JSON (bytes).
+    """
+    from drf_yasg.codecs import OpenAPICodecJson
+    from drf_yasg.generators import OpenAPISchemaGenerator
+
+    schema = OpenAPISchemaGenerator(API_INFO).get_schema(request=None, public=True)
+    return OpenAPICodecJson(validators=[]).encode(schema)
+
+
+@cache
+def get_openapi_schema():
+    """Схема OpenAPI для OpenAPISchemaView: файл OPENAPI_SCHEMA_FILE, собранный при сборке образа, а если его нет -
+    схема, сгенерированная при первом запросе. Результат хранится в памяти процесса до перезапуска, то есть до
+    следующего развертывания.
+    :return: Кортеж (схема в формате JSON, ETag).
+    """
+    try:
+        content = settings.OPENAPI_SCHEMA_FILE.read_bytes()
+    except FileNotFoundError:
+        content = build_openapi_schema()
+    return content, f'"{hashlib.sha256(content).hexdigest()[:32]}"'
+
+
+class OpenAPISchemaView(APIView):
+    """Контроллер для готовой схемы OpenAPI в формате JSON (без генерации на каждый запрос).
+    Ответ с ETag: браузер, у которого открыта документация, получает 304 без тела ответа."""
+
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+    # Генерация схемы не должна описывать сам адрес схемы
+    swagger_schema = None
+
+    def get(self, request):
+        content, etag = get_openapi_schema()
+        if etag in request.headers.get("If-None-Match", ""):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(content, content_type="application/json")
+        response["ETag"] = etag
+        # Браузер проверяет актуальность схемы (ETag) при каждом открытии документации
+        response["Cache-Control"] = "public, no-cache"
+        return response
+
+
+class SwaggerUIView(APIView):
+    """Страница Swagger UI. Схему страница загружает отдельным запросом с адреса SWAGGER_SETTINGS["SPEC_URL"],
+    поэтому для самой страницы достаточно описания API (API_INFO) без генерации схемы."""
+
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+    # Рендер указан строкой и импортируется при первом запросе к странице (см. комментарий в начале модуля)
+    renderer_path = "drf_yasg.renderers.SwaggerUIRenderer"
+    swagger_schema = None
+
+    def get_renderers(self):
+        return [import_string(self.renderer_path)()]
+
+    def get(self, request):
+        return Response(openapi.Swagger(info=API_INFO, _prefix="/", paths=openapi.Paths(paths={})))
+
+
+class ReDocView(SwaggerUIView):
+    """Страница ReDoc, схема загружается с адреса REDOC_SETTINGS["SPEC_URL"]."""
+
+    renderer_path = "drf_yasg.renderers.ReDocRenderer"
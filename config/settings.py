@@ -50,6 +50,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Замеры запроса (SQL-запросы, сериализаторы, общее время) - первым, чтобы учесть все остальные middleware
+    'config.timing.RequestTimingMiddleware',
+    # Метрики Prometheus (/metrics, config/metrics.py) - сразу после замеров, чтобы взять из них SQL-запросы
+    'config.metrics.PrometheusMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -57,6 +61,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Текущий запрос для роутера реплики БД (config/db.py)
+    'config.db.PrimaryReplicaMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -87,9 +93,50 @@ DATABASES = {
         'PASSWORD': os.getenv('DATABASE_PASSWORD'),
         'HOST': os.getenv('DATABASE_HOST'),
         'PORT': os.getenv('DATABASE_PORT', default='5432'),
+        # Постоянные соединения: соединение с PostgreSQL (TCP + аутентификация) живет CONN_MAX_AGE секунд и
+        # переиспользуется следующими запросами этого потока, а не открывается заново на каждый запрос.
+        # В режиме ASGI (SERVER_MODE=asgi) по умолчанию 0: синхронный код запросов выполняется в разных потоках,
+        # и постоянные соединения копились бы по одному на поток - для ASGI нужен пул (DATABASE_POOL=True).
+        'CONN_MAX_AGE': int(os.getenv('DATABASE_CONN_MAX_AGE') or (0 if os.getenv('SERVER_MODE') == 'asgi' else 60)),
+        # Перед использованием постоянного соединения в новом запросе Django проверяет, что оно живо (например, после
+        # перезапуска PostgreSQL), и открывает новое вместо ошибки в запросе
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Пул соединений psycopg 3 (DATABASE_POOL=True): процесс держит от DATABASE_POOL_MIN_SIZE до DATABASE_POOL_MAX_SIZE
+# открытых соединений, запрос берет соединение из пула и возвращает его после завершения. Нужен пакет
+# psycopg[binary,pool] (poetry install -E pool), с пулом постоянные соединения (CONN_MAX_AGE) не используются.
+# Пул открывается в каждом воркере gunicorn отдельно, в воркерах Celery вместо пула - постоянные соединения
+# (config/db.py, config/celery.py).
+if os.getenv('DATABASE_POOL') == 'True':
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': int(os.getenv('DATABASE_POOL_MIN_SIZE', 2)),
+            'max_size': int(os.getenv('DATABASE_POOL_MAX_SIZE', 10)),
+            # Сколько секунд запрос ждет свободное соединение, если все заняты
+            'timeout': int(os.getenv('DATABASE_POOL_TIMEOUT', 10)),
+        },
+    }
+
+# Реплика PostgreSQL только для чтения (DATABASE_REPLICA_HOST): чтение в GET-запросах (списки и детали курсов, уроков,
+# пользователей, платежей) идет в реплику, запись - в основную БД (config.db.PrimaryReplicaRouter). Пользователь,
+# который что-то изменил, DATABASE_REPLICA_PIN_SECONDS секунд читает из основной БД (реплика отстает).
+# Без DATABASE_REPLICA_HOST все запросы идут в основную БД.
+DATABASE_REPLICA_ALIAS = None
+DATABASE_REPLICA_PIN_SECONDS = int(os.getenv('DATABASE_REPLICA_PIN_SECONDS', 5))
+if os.getenv('DATABASE_REPLICA_HOST'):
+    DATABASE_REPLICA_ALIAS = 'replica'
+    DATABASES[DATABASE_REPLICA_ALIAS] = {
+        **DATABASES['default'],
+        'HOST': os.getenv('DATABASE_REPLICA_HOST'),
+        'PORT': os.getenv('DATABASE_REPLICA_PORT') or DATABASES['default']['PORT'],
+        'OPTIONS': dict(DATABASES['default'].get('OPTIONS', {})),
+    }
+
+DATABASE_ROUTERS = ['config.db.PrimaryReplicaRouter']
+
 # База данных для тестов при разворачивании приложения (чтоб не разворачивать сразу postgresql достаточно в начале
 # для тестов развернуть sqlite
 if 'test' in sys.argv:
@@ -100,8 +147,16 @@ if 'test' in sys.argv:
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': BASE_DIR / 'test_db.sqlite3',
-        }
+        },
+        # Реплика в тестах - второе соединение с той же тестовой БД (MIRROR). По умолчанию не используется, тесты
+        # роутера включают ее через override_settings(DATABASE_REPLICA_ALIAS='replica')
+        'replica': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+            'TEST': {'MIRROR': 'default'},
+        },
     }
+    DATABASE_REPLICA_ALIAS = None
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -133,23 +188,132 @@ STATICFILES_DIRS = [BASE_DIR / 'static']
 # STATIC_ROOT важен при развертывании приложения на ВМ и использовании Nginx
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# Хранилища (config/storage.py):
+# - загруженные файлы сохраняются под хэшем содержимого (одинаковые файлы хранятся один раз, имя файла никогда
+# не переиспользуется, и браузер кэширует файлы бессрочно);
+# - collectstatic сохраняет рядом с текстовыми файлами статики их сжатые копии (.gz) для "gzip_static on"
+# в nginx/nginx.conf
+STORAGES = {
+    'default': {
+        'BACKEND': 'config.storage.ContentAddressedStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'config.storage.GzipStaticFilesStorage',
+    },
+}
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# Загруженные файлы отдает users.views.ProtectedMediaAPIView после проверки доступа. За nginx
+# (MEDIA_X_ACCEL_REDIRECT=True) Django возвращает только заголовок X-Accel-Redirect, а файл из внутреннего location
+# MEDIA_X_ACCEL_PREFIX (nginx/nginx.conf) отдает nginx через sendfile
+MEDIA_X_ACCEL_REDIRECT = os.getenv('MEDIA_X_ACCEL_REDIRECT') == 'True'
+MEDIA_X_ACCEL_PREFIX = '/protected-media/'
+
+# Уменьшенные копии загруженных картинок (аватар, превью курса и урока), users/thumbnails.py: ширины в пикселях
+# (через запятую), форматы (webp, jpeg) и качество сжатия. Создаются задачей Celery после загрузки картинки
+THUMBNAIL_WIDTHS = [int(width) for width in os.getenv('THUMBNAIL_WIDTHS', '160,320,640').split(',') if width.strip()]
+THUMBNAIL_FORMATS = [name.strip() for name in os.getenv('THUMBNAIL_FORMATS', 'webp,jpeg').split(',') if name.strip()]
+THUMBNAIL_QUALITY = int(os.getenv('THUMBNAIL_QUALITY', 80))
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'users.CustomUser'
 
+# Настройки кэша Django.
+# 1) Если задан CACHE_REDIS_URL, то используется общий для всех процессов кэш в Redis (через django-redis). Это нужно,
+# чтобы инвалидация данных из одного процесса (например, из Celery-задачи) сразу была видна всем воркерам gunicorn.
+# 2) Если не задан (или запущены тесты), то используется кэш в памяти процесса (LocMemCache).
+# Рекомендуется отдельная база Redis (например, /1), чтобы задачи Celery и кэш Django не мешали друг другу.
+CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL')
+if CACHE_REDIS_URL and 'test' not in sys.argv:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': CACHE_REDIS_URL,
+            'OPTIONS': {
+                'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+            },
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Время жизни (в секундах) снимка пользователя в кэше для users.authentication.CachedJWTAuthentication.
+USER_SNAPSHOT_CACHE_TIMEOUT = int(os.getenv('USER_SNAPSHOT_CACHE_TIMEOUT', 60))
+
+# Замеры HTTP-запросов (config/timing.py):
+# - SERVER_TIMING - отдавать замеры (SQL-запросы, сериализаторы, общее время) в заголовке ответа Server-Timing;
+# - REQUEST_QUERY_BUDGET - допустимое количество SQL-запросов на один HTTP-запрос, запросы сверх бюджета
+# попадают в лог с уровнем WARNING (0 - без проверки);
+# - REQUEST_TIMING_LOG_LEVEL - уровень лога config.timing: INFO - строка с замерами для каждого запроса,
+# WARNING - только запросы сверх бюджета.
+SERVER_TIMING = os.getenv('SERVER_TIMING', 'True') == 'True'
+REQUEST_QUERY_BUDGET = int(os.getenv('REQUEST_QUERY_BUDGET', 20))
+REQUEST_TIMING_LOG_LEVEL = os.getenv('REQUEST_TIMING_LOG_LEVEL', 'INFO')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'config.timing': {
+            'handlers': ['console'],
+            'level': REQUEST_TIMING_LOG_LEVEL,
+            'propagate': False,
+        },
+    },
+}
+if 'test' in sys.argv:
+    # Строки замеров не выводятся в консоль при запуске тестов (тесты проверяют их через assertLogs)
+    LOGGING['loggers']['config.timing']['level'] = 'ERROR'
+
+# Документация API (config/openapi.py): страницы Swagger UI / ReDoc загружают схему с адреса openapi.json.
+# Схема собирается при сборке образа командой build_openapi_schema в OPENAPI_SCHEMA_FILE (без файла - генерируется
+# один раз в процессе), в DEBUG генерируется на каждый запрос
+OPENAPI_SCHEMA_FILE = BASE_DIR / 'openapi.json'
+SWAGGER_SETTINGS = {
+    'DEFAULT_INFO': 'config.openapi.API_INFO',
+    'SPEC_URL': 'openapi-schema',
+}
+REDOC_SETTINGS = {
+    'SPEC_URL': 'openapi-schema',
+}
+
 REST_FRAMEWORK = {
     'DEFAULT_FILTER_BACKENDS': (
         'django_filters.rest_framework.DjangoFilterBackend',
     ),
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # Вместо 'rest_framework_simplejwt.authentication.JWTAuthentication' - тот же JWT, но пользователь берется
+        # из короткоживущего снимка в кэше, а не из БД на каждый запрос
+        'users.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated'
-    ]
+    ],
+    # Ограничение частоты запросов (ведро с токенами) для "дорогих" контроллеров: логин и регистрация (хэширование
+    # пароля) и платежи (запросы в Stripe). Ограничение включается в контроллере через атрибут throttle_scope.
+    'DEFAULT_THROTTLE_CLASSES': (
+        'users.throttles.TokenBucketThrottle',
+    ),
+    'DEFAULT_THROTTLE_RATES': {
+        'login': os.getenv('THROTTLE_RATE_LOGIN', '10/min'),
+        'register': os.getenv('THROTTLE_RATE_REGISTER', '5/min'),
+        'payment': os.getenv('THROTTLE_RATE_PAYMENT', '10/min'),
+        'payment_status': os.getenv('THROTTLE_RATE_PAYMENT_STATUS', '30/min'),
+    },
+    # Количество прокси-серверов перед приложением (в Docker это Nginx = 1). Нужно, чтобы IP-адрес клиента для
+    # ограничения частоты запросов брался из X-Forwarded-For правильно и его нельзя было подделать.
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES')) if os.getenv('NUM_PROXIES') else None,
 }
 
 SIMPLE_JWT = {
@@ -159,6 +323,64 @@ SIMPLE_JWT = {
 
 SECRET_KEY_FOR_STRIPE = os.getenv('SECRET_KEY_FOR_STRIPE')
 
+# Валюта цен, которые создаются в Stripe
+STRIPE_CURRENCY = os.getenv('STRIPE_CURRENCY', 'RUB')
+
+# Настройки HTTP-клиента Stripe (users/stripe_client.py):
+# - таймауты (в секундах) на установку соединения и на чтение ответа, чтобы медленный ответ Stripe не занимал
+# воркер gunicorn до 80 секунд (значение по умолчанию в библиотеке Stripe);
+# - количество повторов при сетевых ошибках (с ключами идемпотентности);
+# - размер пула keep-alive соединений;
+# - адрес API: пусто = настоящий Stripe, или адрес локальной заглушки (python manage.py run_stripe_stub).
+STRIPE_CONNECT_TIMEOUT = float(os.getenv('STRIPE_CONNECT_TIMEOUT', 3))
+STRIPE_READ_TIMEOUT = float(os.getenv('STRIPE_READ_TIMEOUT', 10))
+STRIPE_MAX_NETWORK_RETRIES = int(os.getenv('STRIPE_MAX_NETWORK_RETRIES', 2))
+STRIPE_POOL_MAXSIZE = int(os.getenv('STRIPE_POOL_MAXSIZE', 10))
+STRIPE_API_BASE = os.getenv('STRIPE_API_BASE')
+
+# Секрет для проверки подписи webhook-событий от Stripe (Dashboard -> Developers -> Webhooks, "whsec_...").
+# Если указан, то статус оплаты обновляется webhook-событиями, а /payment/<pk>/status/ читает статус только из БД.
+STRIPE_WEBHOOK_SECRET = os.getenv('STRIPE_WEBHOOK_SECRET')
+
+# Настройки периодической сверки статусов платежей со Stripe (users.tasks.task_reconcile_stripe_payments):
+# - размер страницы списка сессий оплаты (максимум в Stripe - 100);
+# - перекрытие с прошлой сверкой в минутах (расхождение часов и сессии, созданные во время прохода). Поздние
+# изменения статуса уже просмотренных сессий приходят webhook-событиями.
+STRIPE_RECONCILE_PAGE_SIZE = int(os.getenv('STRIPE_RECONCILE_PAGE_SIZE', 100))
+STRIPE_RECONCILE_OVERLAP_MINUTES = int(os.getenv('STRIPE_RECONCILE_OVERLAP_MINUTES', 5))
+
+# Секционирование таблицы платежей по месяцам (только PostgreSQL, см. users/partitions.py и команду
+# manage_payment_partitions): на сколько месяцев вперед создавать секции и сколько месяцев хранить секции
+# в основной таблице (0 - не отсоединять старые секции).
+PAYMENTS_PARTITIONS_AHEAD = int(os.getenv('PAYMENTS_PARTITIONS_AHEAD', 3))
+PAYMENTS_PARTITIONS_RETENTION_MONTHS = int(os.getenv('PAYMENTS_PARTITIONS_RETENTION_MONTHS', 0))
+# Ожидание блокировки при обычном (не CONCURRENTLY) отсоединении секции: ACCESS EXCLUSIVE на таблицу платежей.
+# Если блокировку не удалось получить за это время (долгий запрос к таблице), секция отсоединяется при следующем
+# запуске, а запросы к платежам не стоят в очереди за ALTER TABLE.
+PAYMENTS_PARTITIONS_LOCK_TIMEOUT = os.getenv('PAYMENTS_PARTITIONS_LOCK_TIMEOUT') or '5s'
+
+# Сколько часов хранится ключ идемпотентности (заголовок Idempotency-Key при создании платежа) и его ответ
+IDEMPOTENCY_KEY_TTL_HOURS = int(os.getenv('IDEMPOTENCY_KEY_TTL_HOURS', 24))
+# Сколько секунд ключ принадлежит запросу, который его зарезервировал: если процесс упал, не сохранив ответ, то
+# после этого времени повтор с тем же ключом обрабатывается заново (больше времени ответа - GUNICORN_TIMEOUT)
+IDEMPOTENCY_KEY_LEASE_SECONDS = int(os.getenv('IDEMPOTENCY_KEY_LEASE_SECONDS', 60))
+
+# Асинхронный режим создания ссылки на оплату: если True, то платеж (transfer) сохраняется сразу со статусом
+# "pending", а продукт / цену / сессию в Stripe создает Celery-задача users.tasks.task_create_stripe_checkout.
+STRIPE_CHECKOUT_ASYNC = True if os.getenv('STRIPE_CHECKOUT_ASYNC') == 'True' else False
+
+# Настройки массового импорта пользователей из CSV (users.services.import_users_from_csv):
+# - количество процессов для хэширования паролей (None = количество CPU контейнера, config.cpu.get_cpu_count());
+# - с какого количества паролей имеет смысл запускать пул процессов (для маленьких файлов хэширую в текущем процессе);
+# - размер пачки для bulk_create().
+USER_IMPORT_HASH_WORKERS = int(os.getenv('USER_IMPORT_HASH_WORKERS', 0)) or None
+USER_IMPORT_POOL_THRESHOLD = int(os.getenv('USER_IMPORT_POOL_THRESHOLD', 20))
+USER_IMPORT_BATCH_SIZE = int(os.getenv('USER_IMPORT_BATCH_SIZE', 1000))
+# - очередь Celery для задачи импорта (users.tasks.task_import_users). Ее обслуживает отдельный воркер
+# с --pool=solo (docker-compose.yml -> celery_import): в процессах пула prefork нельзя запустить пул процессов
+# для хэширования паролей.
+USER_IMPORT_QUEUE = os.getenv('USER_IMPORT_QUEUE') or 'user_import'
+
 # Настройки для Celery
 # URL-адрес брокера сообщений. Например, Redis, который по умолчанию работает на порту 6379 — адрес брокера сообщений.
 # Формат: redis://<host>:<port>/<db_number>.
@@ -179,6 +401,22 @@ CELERY_TASK_TRACK_STARTED = True
 # Максимальное время на выполнение задачи
 CELERY_TASK_TIME_LIMIT = 30 * 60
 
+# Маршрутизация задач по очередям: импорт пользователей выполняется отдельным воркером (см. USER_IMPORT_QUEUE),
+# остальные задачи - в очереди по умолчанию "celery"
+CELERY_TASK_ROUTES = {
+    'users.tasks.task_import_users': {'queue': USER_IMPORT_QUEUE},
+}
+
+# Соединения с БД в воркерах Celery (config/celery.py): постоянные соединения живут CELERY_DATABASE_CONN_MAX_AGE секунд
+# (пул psycopg 3 в воркерах не используется). Встроенная интеграция Celery с Django по умолчанию закрывает соединение
+# после каждой задачи, а с CELERY_DB_REUSE_MAX - только раз в столько задач.
+CELERY_DATABASE_CONN_MAX_AGE = int(os.getenv('CELERY_DATABASE_CONN_MAX_AGE', 300))
+CELERY_DB_REUSE_MAX = int(os.getenv('CELERY_DB_REUSE_MAX', 100))
+
+# Порт HTTP-сервера метрик Prometheus в главном процессе воркера Celery (config/metrics.py): длительность, повторы
+# и ошибки задач. 0 - не запускать. Для prefork нужна переменная окружения PROMETHEUS_MULTIPROC_DIR
+CELERY_METRICS_PORT = int(os.getenv('CELERY_METRICS_PORT', 0))
+
 # Подключение почтового сервера в Django
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'smtp.yandex.ru'
@@ -196,6 +434,18 @@ CELERY_BEAT_SCHEDULE = {
         # 'schedule': timedelta(minutes=3),  # Расписание выполнения задачи (например, каждые 3 минут)
         'schedule': crontab(hour=0, minute=0),  # Каждый день в полночь
     },
+    'task-delete-expired-idempotency-keys-every-hour': {
+        'task': 'users.tasks.task_delete_expired_idempotency_keys',
+        'schedule': crontab(minute=15),  # Каждый час (в 15 минут)
+    },
+    'task-maintain-payments-partitions-every-day': {
+        'task': 'users.tasks.task_maintain_payments_partitions',
+        'schedule': crontab(hour=1, minute=0),  # Каждый день в 01:00
+    },
+    'task-reconcile-stripe-payments-every-30-minutes': {
+        'task': 'users.tasks.task_reconcile_stripe_payments',
+        'schedule': crontab(minute='*/30'),  # Каждые 30 минут
+    },
 }
 
 # 1) ЧТО ЭТО?
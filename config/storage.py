@@ -0,0 +1,99 @@
+import gzip
+import hashlib
+import os
+import posixpath
+import re
+
+from django.contrib.staticfiles.storage import StaticFilesStorage
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+# Расширения текстовых файлов, которые имеет смысл сжимать (картинки и шрифты woff/woff2 уже сжаты)
+GZIP_EXTENSIONS = (".css", ".js", ".json", ".map", ".svg", ".txt", ".html", ".xml", ".ico", ".ttf", ".eot")
+# Маленькие файлы не сжимаю: выигрыш меньше заголовков, а nginx все равно проверит наличие .gz
+GZIP_MIN_SIZE = 1024
+
+# Имя файла в ContentAddressedStorage: <папка>/<первые 2 символа хэша>/<sha256 содержимого>.<расширение>
+CONTENT_ADDRESSED_NAME_RE = re.compile(r"(?:.+/)?(?P<prefix>[0-9a-f]{2})/(?P<digest>[0-9a-f]{64})(?:\.[a-z0-9]+)?")
+# Размер блока при чтении загруженного файла для хэша (файл не читается в память целиком)
+CONTENT_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class GzipStaticFilesStorage(StaticFilesStorage):
+    """Хранилище статики, которое при collectstatic рядом с каждым текстовым файлом сохраняет его сжатую копию
+    (<файл>.gz, максимальная степень сжатия). Nginx с "gzip_static on" (nginx/nginx.conf) отдает готовый .gz
+    клиентам с Accept-Encoding: gzip и не сжимает файл на каждый запрос. Копия сохраняется, только если она меньше
+    исходного файла."""
+
+    def post_process(self, paths, dry_run=False, **options):
+        """Вызывается collectstatic после копирования файлов. Возвращает (yield) кортежи (исходный файл,
+        сжатый файл, обработан ли файл) - collectstatic выводит их в отчет."""
+        if dry_run:
+            return
+
+        for name in paths:
+            if not name.endswith(GZIP_EXTENSIONS):
+                continue
+            path = self.path(name)
+            with open(path, "rb") as f:
+                content = f.read()
+            if len(content) < GZIP_MIN_SIZE:
+                continue
+
+            # mtime=0 - одинаковый файл дает одинаковый архив (без лишних изменений между сборками)
+            compressed = gzip.compress(content, compresslevel=9, mtime=0)
+            if len(compressed) >= len(content):
+                continue
+            with open(f"{path}.gz", "wb") as f:
+                f.write(compressed)
+            # Время изменения .gz как у исходного файла: nginx берет его для Last-Modified / ETag, и они не зависят
+            # от того, отдан клиенту сжатый файл или исходный
+            stat = os.stat(path)
+            os.utime(f"{path}.gz", (stat.st_atime, stat.st_mtime))
+            yield name, f"{name}.gz", True
+
+
+def is_content_addressed_name(name):
+    """Проверяет, что файл сохранен ContentAddressedStorage: по такому имени всегда отдается одно и то же содержимое,
+    поэтому его можно кэшировать в браузере бессрочно (Cache-Control: immutable)."""
+    match = CONTENT_ADDRESSED_NAME_RE.fullmatch(name)
+    return match is not None and match["digest"].startswith(match["prefix"])
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранилище загруженных файлов (STORAGES["default"]), которое сохраняет файл под хэшем его содержимого:
+    <папка upload_to>/<2 символа хэша>/<sha256>.<расширение>, например course_preview/3f/3fa9...c1.png.
+    - Одинаковые файлы (одна картинка в превью многих уроков) хранятся один раз: если файл с таким хэшем уже есть,
+    он не записывается повторно.
+    - В имени нет пробелов и кириллицы из исходного имени, а новое содержимое всегда получает новое имя - файл можно
+    кэшировать бессрочно (users/media.py).
+    - Хэш считается по блокам CONTENT_HASH_CHUNK_SIZE, большие загрузки (TemporaryUploadedFile) не читаются
+    в память целиком и переносятся во MEDIA_ROOT без копирования.
+    Один файл может использоваться несколькими объектами, поэтому перед delete() нужно проверить, что на файл
+    больше никто не ссылается."""
+
+    def get_content_name(self, name, content):
+        """Имя файла по хэшу содержимого. Папка берется из исходного имени, расширение - из исходного имени в нижнем
+        регистре (только латиница и цифры)."""
+        digest = hashlib.sha256()
+        for chunk in content.chunks(CONTENT_HASH_CHUNK_SIZE):
+            digest.update(chunk)
+        digest = digest.hexdigest()
+
+        folder, basename = posixpath.split(name.replace("\\", "/"))
+        extension = posixpath.splitext(basename)[1].lower()
+        if not re.fullmatch(r"\.[a-z0-9]{1,10}", extension):
+            extension = ""
+        return posixpath.join(folder, digest[:2], f"{digest}{extension}")
+
+    def save(self, name, content, max_length=None):
+        """Сохраняет файл под хэшем содержимого и возвращает его имя. Если такой файл уже есть, возвращает имя
+        существующего файла (дедупликация)."""
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+        name = self.get_content_name(name, content)
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length=max_length)
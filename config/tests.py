@@ -0,0 +1,209 @@
+from unittest.mock import patch
+
+from asgiref.sync import iscoroutinefunction
+from celery.signals import worker_process_shutdown  # type: ignore
+from django.core.cache import cache
+from django.db import connections
+from django.http import HttpResponse
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase, APITransactionTestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from config.db import PRIMARY_PIN_CACHE_KEY, PrimaryReplicaMiddleware
+from config.metrics import PrometheusMiddleware
+from config.timing import RequestTimingMiddleware
+from lms_system.models import Course, Lesson
+from users.models import CustomUser
+from users.tasks import task_deactivate_inactive_users
+
+
+@override_settings(DATABASE_REPLICA_ALIAS="replica")
+class PrimaryReplicaRouterTestCase(APITransactionTestCase):
+    """Тесты роутера реплики БД (config.db.PrimaryReplicaRouter). Реплика - второе соединение с той же тестовой БД,
+    поэтому нужен APITransactionTestCase: данные APITestCase не зафиксированы в БД и не видны другому соединению."""
+
+    databases = {"default", "replica"}
+
+    def setUp(self):
+        """Метод для подготовки тестовых данных и настроек перед выполнением тестов в тестовом классе."""
+        cache.clear()
+        self.user = CustomUser.objects.create_user(email="user_1_for_tests@gmail.com", password="123qwe")
+        self.client.force_authenticate(user=self.user)
+        # Для запросов через async_client (force_authenticate работает только в APIClient)
+        self.token = str(AccessToken.for_user(self.user))
+        self.course = Course.objects.create(title="Курс", description="Описание", owner=self.user)
+        self.lesson = Lesson.objects.create(
+            course=self.course, title="Урок", video_url="https://youtube.com/video.mp4", owner=self.user
+        )
+
+    def get_lessons(self):
+        """Запрашивает список уроков и возвращает количество SQL-запросов в основную БД и в реплику."""
+        with CaptureQueriesContext(connections["default"]) as primary:
+            with CaptureQueriesContext(connections["replica"]) as replica:
+                response = self.client.get(reverse("lms_system:lesson-list-create"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(primary), len(replica)
+
+    def test_safe_request_reads_from_replica(self):
+        """Тест проверки, что GET-запрос читает из реплики."""
+        primary_queries, replica_queries = self.get_lessons()
+        self.assertEqual(primary_queries, 0)
+        self.assertGreater(replica_queries, 0)
+
+    def test_user_is_pinned_to_primary_after_write(self):
+        """Тест проверки, что изменение выполняется в основной БД и после него пользователь читает из основной БД."""
+        url = reverse("lms_system:lesson-retrieve-update-destroy", args=[self.lesson.pk])
+        with CaptureQueriesContext(connections["replica"]) as replica:
+            response = self.client.patch(url, {"title": "Новое название"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(replica), 0)
+
+        primary_queries, replica_queries = self.get_lessons()
+        self.assertGreater(primary_queries, 0)
+        self.assertEqual(replica_queries, 0)
+
+    @override_settings(DATABASE_REPLICA_ALIAS=None)
+    def test_without_replica_reads_from_primary(self):
+        """Тест проверки, что без настроенной реплики все запросы идут в основную БД."""
+        primary_queries, replica_queries = self.get_lessons()
+        self.assertGreater(primary_queries, 0)
+        self.assertEqual(replica_queries, 0)
+
+    async def test_user_is_pinned_to_primary_after_write_under_asgi(self):
+        """Тест проверки, что под ASGI (асинхронная цепочка middleware) роутер видит текущий запрос и после
+        изменения пользователь закрепляется за основной БД."""
+        url = reverse("lms_system:lesson-retrieve-update-destroy", args=[self.lesson.pk])
+        response = await self.async_client.patch(
+            url,
+            {"title": "Новое название"},
+            content_type="application/json",
+            headers={"Authorization": f"Bearer {self.token}"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(await cache.aget(PRIMARY_PIN_CACHE_KEY.format(self.user.pk)))
+
+    def test_middleware_is_async_capable(self):
+        """Тест проверки, что с асинхронной цепочкой middleware (ASGI) middleware сам является корутиной."""
+
+        async def get_response(request):
+            return HttpResponse()
+
+        self.assertTrue(iscoroutinefunction(PrimaryReplicaMiddleware(get_response)))
+        self.assertFalse(iscoroutinefunction(PrimaryReplicaMiddleware(lambda request: HttpResponse())))
+
+
+class RequestTimingTestCase(APITestCase):
+    """Тесты, которые будут проверять замеры запросов (config.timing.RequestTimingMiddleware)."""
+
+    def setUp(self):
+        """Метод для подготовки тестовых данных и настроек перед выполнением тестов в тестовом классе."""
+        self.user = CustomUser.objects.create_user(email="timing_user@gmail.com", password="123qwe")
+        self.client.force_authenticate(user=self.user)
+        # Для запросов через async_client (force_authenticate работает только в APIClient)
+        self.token = str(AccessToken.for_user(self.user))
+        course = Course.objects.create(title="Курс", description="Описание", owner=self.user)
+        for number in range(3):
+            Lesson.objects.create(
+                course=course,
+                title=f"Урок {number}",
+                description="Описание",
+                video_url="https://youtube.com/lesson",
+                owner=self.user,
+            )
+        self.url = reverse("lms_system:lesson-list-create")
+
+    def test_server_timing_header(self):
+        """Тест проверки, что в заголовке Server-Timing есть количество и время SQL-запросов, время сериализатора
+        и общее время, а в лог пишутся поля запроса."""
+        with self.assertLogs("config.timing", "INFO") as logs:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        metrics = {item.split(";")[0]: item for item in response["Server-Timing"].split(", ")}
+        self.assertEqual(set(metrics), {"db", "serializer", "total"})
+        self.assertRegex(metrics["db"], r'^db;dur=[\d.]+;desc="[1-9]\d* queries"$')
+
+        record = logs.records[0]
+        self.assertEqual((record.method, record.route, record.status), ("GET", "api/lesson/", 200))
+        self.assertGreater(record.db_queries, 0)
+        self.assertFalse(record.query_budget_exceeded)
+
+    @override_settings(REQUEST_QUERY_BUDGET=1)
+    def test_query_budget_exceeded(self):
+        """Тест проверки, что запрос сверх бюджета SQL-запросов попадает в лог с уровнем WARNING."""
+        with self.assertLogs("config.timing", "WARNING") as logs:
+            response = self.client.get(self.url)
+        self.assertIn('query-budget;desc="exceeded', response["Server-Timing"])
+        self.assertTrue(logs.records[0].query_budget_exceeded)
+
+    async def test_server_timing_header_under_asgi(self):
+        """Тест проверки, что под ASGI (асинхронная цепочка middleware) SQL-запросы контроллера тоже попадают
+        в замеры."""
+        response = await self.async_client.get(self.url, headers={"Authorization": f"Bearer {self.token}"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertRegex(response["Server-Timing"], r'db;dur=[\d.]+;desc="[1-9]\d* queries"')
+
+    def test_middleware_is_async_capable(self):
+        """Тест проверки, что с асинхронной цепочкой middleware (ASGI) middleware сам является корутиной."""
+
+        async def get_response(request):
+            return HttpResponse()
+
+        self.assertTrue(iscoroutinefunction(RequestTimingMiddleware(get_response)))
+        self.assertFalse(iscoroutinefunction(RequestTimingMiddleware(lambda request: HttpResponse())))
+
+
+class PrometheusMetricsTestCase(APITestCase):
+    """Тесты, которые будут проверять метрики Prometheus (config/metrics.py)."""
+
+    def setUp(self):
+        """Метод для подготовки тестовых данных и настроек перед выполнением тестов в тестовом классе."""
+        self.user = CustomUser.objects.create_user(email="metrics_user@gmail.com", password="123qwe")
+        self.client.force_authenticate(user=self.user)
+        # Для запросов через async_client (force_authenticate работает только в APIClient)
+        self.token = str(AccessToken.for_user(self.user))
+
+    def test_request_metrics(self):
+        """Тест проверки, что время запроса попадает в гистограмму по шаблону URL и статусу, а SQL-запросы -
+        в счетчик."""
+        self.client.get(reverse("lms_system:lesson-list-create"))
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        content = response.content.decode()
+        self.assertIn('http_request_duration_seconds_count{method="GET",route="api/lesson/",status="200"}', content)
+        self.assertIn('http_db_queries_total{method="GET",route="api/lesson/"}', content)
+
+    async def test_request_metrics_under_asgi(self):
+        """Тест проверки, что под ASGI (асинхронная цепочка middleware) метрики запроса тоже записываются."""
+        url = reverse("lms_system:lesson-list-create")
+        await self.async_client.get(url, headers={"Authorization": f"Bearer {self.token}"})
+        response = await self.async_client.get(reverse("metrics"))
+        self.assertIn('http_db_queries_total{method="GET",route="api/lesson/"}', response.content.decode())
+
+    def test_middleware_is_async_capable(self):
+        """Тест проверки, что с асинхронной цепочкой middleware (ASGI) middleware сам является корутиной."""
+
+        async def get_response(request):
+            return HttpResponse()
+
+        self.assertTrue(iscoroutinefunction(PrometheusMiddleware(get_response)))
+        self.assertFalse(iscoroutinefunction(PrometheusMiddleware(lambda request: HttpResponse())))
+
+    def test_celery_task_metrics(self):
+        """Тест проверки, что время выполнения задачи Celery попадает в гистограмму с состоянием задачи."""
+        task_deactivate_inactive_users.delay()
+        content = self.client.get(reverse("metrics")).content.decode()
+        self.assertIn(
+            'celery_task_duration_seconds_count{state="SUCCESS",task="users.tasks.task_deactivate_inactive_users"}',
+            content,
+        )
+
+    def test_celery_process_shutdown_marks_process_dead(self):
+        """Тест проверки, что при завершении дочернего процесса Celery его данные метрик удаляются (как в хуке
+        child_exit gunicorn)."""
+        with patch("config.metrics.mark_process_dead") as mock_mark_process_dead:
+            worker_process_shutdown.send(sender=None, pid=4242, exitcode=0)
+        mock_mark_process_dead.assert_called_once_with(4242)
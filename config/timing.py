@@ -0,0 +1,175 @@
+import logging
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from rest_framework.fields import empty
+
+logger = logging.getLogger(__name__)
+
+# Замеры запроса, который сейчас обрабатывается (RequestTimingMiddleware). ContextVar - как и текущий запрос
+# в config/db.py: сериализаторы не знают о запросе, а в режиме ASGI запрос может выполняться в разных потоках
+_request_timings = ContextVar("request_timings", default=None)
+
+
+class RequestTimings:
+    """Замеры одного HTTP-запроса: количество и время SQL-запросов (во всех БД), время сериализаторов и общее время."""
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.total_time = 0.0
+        # Начало замера внешнего сериализатора: вложенные сериализаторы (уроки в курсе, элементы many=True)
+        # выполняются внутри него и отдельно не учитываются
+        self.serializer_started = None
+
+    def record_query(self, execute, sql, params, many, context):
+        """Обертка выполнения SQL-запроса (connection.execute_wrapper)."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.db_queries += 1
+
+    def as_server_timing(self, query_budget=None):
+        """Значение заголовка Server-Timing (время в миллисекундах, видно в инструментах разработчика браузера).
+        :param query_budget: Бюджет SQL-запросов, если он превышен.
+        """
+        metrics = [
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.db_queries} queries"',
+            f"serializer;dur={self.serializer_time * 1000:.1f}",
+            f"total;dur={self.total_time * 1000:.1f}",
+        ]
+        if query_budget is not None:
+            metrics.append(f'query-budget;desc="exceeded: {self.db_queries} > {query_budget}"')
+        return ", ".join(metrics)
+
+
+def get_request_timings():
+    """Замеры текущего HTTP-запроса (RequestTimings) или None вне запроса (например, для метрик в
+    config.metrics.PrometheusMiddleware)."""
+    return _request_timings.get()
+
+
+class TimedSerializerMixin:
+    """Миксин для сериализаторов: время сериализации (to_representation) и валидации (run_validation) входит
+    в замеры запроса (Server-Timing: serializer). Указывается в списке родителей первым. Вне HTTP-запроса
+    (задачи Celery, команды) ничего не замеряет."""
+
+    def to_representation(self, instance):
+        return self._timed(super().to_representation, instance)
+
+    def run_validation(self, data=empty):
+        return self._timed(super().run_validation, data)
+
+    @staticmethod
+    def _timed(method, *args):
+        timings = _request_timings.get()
+        if timings is None or timings.serializer_started is not None:
+            return method(*args)
+        timings.serializer_started = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            timings.serializer_time += time.perf_counter() - timings.serializer_started
+            timings.serializer_started = None
+
+
+class RequestTimingMiddleware:
+    """Замеры каждого HTTP-запроса: количество и время SQL-запросов, время сериализаторов и общее время обработки
+    в Django. Указывается первым в MIDDLEWARE, чтобы учитывались запросы в БД и время всех остальных middleware.
+        - SERVER_TIMING=True - замеры в заголовке ответа Server-Timing;
+        - в лог config.timing пишется строка с полями запроса (INFO), поля передаются и в extra записи лога -
+        для обработчиков со структурированным форматом (JSON);
+        - если SQL-запросов больше REQUEST_QUERY_BUDGET (0 - без проверки), запись в логе - WARNING (обычно это
+        N+1 - запросы в цикле по объектам), а в Server-Timing добавляется метрика query-budget.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        # Под ASGI цепочка middleware асинхронная: Django передает корутину, и middleware тоже должен быть корутиной,
+        # иначе Django переключает каждый запрос между потоком и циклом событий (sync_to_async / async_to_sync)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        timings = RequestTimings()
+        token = _request_timings.set(timings)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                self.wrap_connections(stack, timings)
+                response = self.get_response(request)
+        finally:
+            timings.total_time = time.perf_counter() - started
+            _request_timings.reset(token)
+        return self.finish_request(request, response, timings)
+
+    async def __acall__(self, request):
+        """Асинхронный вариант __call__ (ASGI). Соединения с БД принадлежат потоку: асинхронный ORM и синхронные
+        контроллеры выполняются через sync_to_async(thread_sensitive=True) в одном потоке на запрос, поэтому обертки
+        SQL-запросов ставятся и снимаются в этом же потоке."""
+        timings = RequestTimings()
+        token = _request_timings.set(timings)
+        started = time.perf_counter()
+        try:
+            stack = ExitStack()
+            await sync_to_async(self.wrap_connections)(stack, timings)
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(stack.close)()
+        finally:
+            timings.total_time = time.perf_counter() - started
+            _request_timings.reset(token)
+        return self.finish_request(request, response, timings)
+
+    @staticmethod
+    def wrap_connections(stack, timings):
+        """Ставит обертку замера SQL-запросов на соединения всех БД текущего потока (снимается при выходе из stack)."""
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(timings.record_query))
+
+    def finish_request(self, request, response, timings):
+        """Заголовок Server-Timing и запись в лог по замерам запроса."""
+        budget = settings.REQUEST_QUERY_BUDGET
+        over_budget = bool(budget) and timings.db_queries > budget
+        if settings.SERVER_TIMING:
+            response["Server-Timing"] = timings.as_server_timing(budget if over_budget else None)
+        self.log_request(request, response, timings, over_budget)
+        return response
+
+    @staticmethod
+    def log_request(request, response, timings, over_budget):
+        resolver_match = getattr(request, "resolver_match", None)
+        fields = {
+            "method": request.method,
+            "path": request.path,
+            # Шаблон URL (например, api/lesson/<int:pk>/) - для группировки запросов к одному контроллеру
+            "route": resolver_match.route if resolver_match else None,
+            "status": response.status_code,
+            "db_queries": timings.db_queries,
+            "db_time_ms": round(timings.db_time * 1000, 1),
+            "serializer_time_ms": round(timings.serializer_time * 1000, 1),
+            "total_time_ms": round(timings.total_time * 1000, 1),
+            "query_budget_exceeded": over_budget,
+        }
+        if over_budget:
+            level = logging.WARNING
+        elif logger.isEnabledFor(logging.INFO):
+            level = logging.INFO
+        else:
+            return
+        message = " ".join(f"{name}={value}" for name, value in fields.items())
+        logger.log(level, message, extra=fields)
@@ -1,24 +1,10 @@
-from typing import cast
-
 from django.conf import settings
-from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import URLResolver, include, path
-from drf_yasg import openapi
-from drf_yasg.views import get_schema_view
-from rest_framework import permissions
+from django.urls import include, path
 
-schema_view = get_schema_view(
-    openapi.Info(
-        title="LMS API",
-        default_version="v1",
-        description="Документация к API LMS-платформы",
-        contact=openapi.Contact(email="maks_lakovich@gmail.com"),
-        license=openapi.License(name="BSD License"),
-    ),
-    public=True,
-    permission_classes=(permissions.AllowAny,),
-)
+from config.metrics import metrics_view
+from config.openapi import OpenAPISchemaView, ReDocView, SwaggerUIView, get_live_schema_view
+from users.views import ProtectedMediaAPIView
 
 urlpatterns = [
     path("admin/", admin.site.urls),
@@ -28,16 +14,17 @@ urlpatterns = [
     # - ничего не указываю, так как DefaultRouter() из lms_system/urls.py создаст URL-ы (например, /api/lms/courses/)
     path("api/", include("users.urls", namespace="users")),
     path("api/", include("lms_system.urls", namespace="lms")),
-    # URL-шаблоны для API документации:
+    # URL-шаблоны для API документации (config/openapi.py). Страницы Swagger UI и ReDoc загружают схему с адреса
+    # openapi.json: готовая схема (собрана командой build_openapi_schema) или, в DEBUG, генерация на каждый запрос
     path(
-        "swagger/",
-        schema_view.with_ui("swagger", cache_timeout=0),
-        name="schema-swagger-ui",
+        "openapi.json",
+        get_live_schema_view().without_ui(cache_timeout=0) if settings.DEBUG else OpenAPISchemaView.as_view(),
+        name="openapi-schema",
     ),
-    path("redoc/", schema_view.with_ui("redoc", cache_timeout=0), name="schema-redoc"),
+    path("swagger/", SwaggerUIView.as_view(), name="schema-swagger-ui"),
+    path("redoc/", ReDocView.as_view(), name="schema-redoc"),
+    # Метрики Prometheus (config/metrics.py), снаружи закрыт в nginx/nginx.conf
+    path("metrics", metrics_view, name="metrics"),
+    # Загруженные файлы (аватары, превью) с проверкой доступа - и в DEBUG, и за nginx (X-Accel-Redirect)
+    path(f"{settings.MEDIA_URL.lstrip('/')}<path:path>", ProtectedMediaAPIView.as_view(), name="protected-media"),
 ]
-
-if settings.DEBUG:
-    urlpatterns += cast(
-        list[URLResolver], static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
-    )
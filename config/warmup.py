@@ -0,0 +1,66 @@
+import logging
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DatabaseError
+from django.template import TemplateDoesNotExist
+from django.template.loader import get_template
+from django.urls import get_resolver
+from django.utils import translation
+from rest_framework.settings import api_settings
+
+from config.db import close_connection_pools
+from config.openapi import get_openapi_schema
+from users.stripe_client import get_pooled_requests_client_class
+
+logger = logging.getLogger(__name__)
+
+# Шаблоны, которые DRF рендерит для браузера (Browsable API) и которые иначе компилируются при первом запросе
+WARMUP_TEMPLATES = ("rest_framework/api.html", "rest_framework/login.html")
+
+
+def warmup_application():
+    """Прогрев приложения в мастер-процессе gunicorn перед запуском воркеров (preload_app, хук when_ready в
+    config/gunicorn.conf.py). Все, что загружено тут, воркеры получают после fork готовым (copy-on-write), а не
+    загружают каждый на первом запросе:
+        - импорт всех контроллеров, сериализаторов и разбор URL-шаблонов (get_resolver);
+        - импорт классов DRF из настроек REST_FRAMEWORK (аутентификация, права, throttling, рендеры);
+        - компиляция шаблонов DRF и загрузка каталога переводов;
+        - чтение готовой схемы OpenAPI (config/openapi.py);
+        - импорт библиотеки stripe (около секунды) через get_pooled_requests_client_class - иначе его выполняет
+        каждый воркер на первом платеже. Для Celery и команд manage.py импорт по-прежнему отложенный;
+        - кэш ContentType (одна выборка вместо запроса на каждую модель в каждом воркере).
+    В конце закрываются соединения с БД (и пул соединений) и кэшем: сокет, открытый до fork, нельзя использовать
+    в нескольких процессах.
+    Ошибки БД (например, БД еще не готова) не мешают запуску - прогрев кэша ContentType просто пропускается.
+    :return: Время прогрева в секундах.
+    """
+    started = time.perf_counter()
+
+    get_resolver()._populate()
+    for name in api_settings.import_strings:
+        getattr(api_settings, name)
+    for template_name in WARMUP_TEMPLATES:
+        try:
+            get_template(template_name)
+        except TemplateDoesNotExist:
+            pass
+    translation.activate(settings.LANGUAGE_CODE)
+    translation.deactivate()
+    if not settings.DEBUG:
+        get_openapi_schema()
+    get_pooled_requests_client_class()
+
+    from django.contrib.contenttypes.models import ContentType
+
+    try:
+        ContentType.objects.get_for_models(*apps.get_models())
+    except DatabaseError as e:
+        logger.warning(f"Прогрев кэша ContentType пропущен: {e}")
+    finally:
+        close_connection_pools()
+        caches.close_all()
+
+    return time.perf_counter() - started
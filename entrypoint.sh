@@ -5,11 +5,40 @@ while ! nc -z -v db 5432; do
   sleep 1
 done
 
-echo "🚀 Делаю миграции..."
-python manage.py migrate --noinput
+# Быстрый запуск (FAST_BOOT=True, по умолчанию): migrate и collectstatic выполняются, только если что-то изменилось.
+# - миграции: "migrate --check" только проверяет, есть ли непримененные миграции (без post_migrate-сигналов,
+#   которые при каждом запуске сверяют ContentType и права всех моделей);
+# - статика: отпечаток (sha256) poetry.lock (статика пакетов: admin, DRF, drf-yasg), settings.py и файлов из папок
+#   static/ проекта сравнивается с сохраненным в томе статики после прошлого collectstatic.
+# FAST_BOOT=False - всегда выполнять migrate и collectstatic.
+STATIC_FINGERPRINT_FILE=staticfiles/.collectstatic.sha256
+static_fingerprint() {
+  {
+    cat poetry.lock config/settings.py
+    find . \( -path ./staticfiles -o -path ./media -o -path ./.git \) -prune -o -path "*/static/*" -type f -print \
+      | sort | xargs -r sha256sum
+  } | sha256sum | cut -d " " -f 1
+}
 
-echo "📦 Собираю статику..."
-python manage.py collectstatic --noinput
+if [ "${FAST_BOOT:-True}" = "True" ] && python manage.py migrate --check >/dev/null 2>&1; then
+  echo "⏩ Новых миграций нет, пропускаю migrate"
+else
+  echo "🚀 Делаю миграции..."
+  python manage.py migrate --noinput
+fi
 
-echo "✅ Запускаю Gunicorn..."
-exec gunicorn config.wsgi:application --bind 0.0.0.0:8000
+FINGERPRINT=$(static_fingerprint)
+if [ "${FAST_BOOT:-True}" = "True" ] && [ "$(cat "$STATIC_FINGERPRINT_FILE" 2>/dev/null)" = "$FINGERPRINT" ]; then
+  echo "⏩ Статика не изменилась, пропускаю collectstatic"
+else
+  echo "📦 Собираю статику..."
+  python manage.py collectstatic --noinput
+  echo "$FINGERPRINT" > "$STATIC_FINGERPRINT_FILE"
+fi
+
+# Настройки gunicorn (количество воркеров и потоков от CPU, preload_app и прогрев приложения, перезапуск воркеров
+# после max_requests) - в config/gunicorn.conf.py. SERVER_MODE=asgi - воркеры uvicorn (config.asgi), асинхронные
+# контроллеры (users/async_views.py) не блокируют воркер, пока ждут Stripe / БД. SERVER_MODE=wsgi (по умолчанию) -
+# config.wsgi с потоками (воркер gthread).
+echo "✅ Запускаю Gunicorn (${SERVER_MODE:-wsgi})..."
+exec gunicorn -c config/gunicorn.conf.py
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lms_system", "0006_course_created_at_course_updated_at_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="course",
+            name="preview_thumbnails",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                editable=False,
+                verbose_name="Уменьшенные копии превью курса:",
+            ),
+        ),
+        migrations.AddField(
+            model_name="lesson",
+            name="preview_thumbnails",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                editable=False,
+                verbose_name="Уменьшенные копии превью урока:",
+            ),
+        ),
+    ]
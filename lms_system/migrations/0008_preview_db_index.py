@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lms_system", "0007_course_preview_thumbnails_lesson_preview_thumbnails"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="course",
+            name="preview",
+            field=models.ImageField(
+                blank=True,
+                db_index=True,
+                help_text="Загрузите картинку",
+                null=True,
+                upload_to="course_preview",
+                verbose_name="Превью (картинка) курса:",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="lesson",
+            name="preview",
+            field=models.ImageField(
+                blank=True,
+                db_index=True,
+                help_text="Загрузите картинку",
+                null=True,
+                upload_to="lesson_preview",
+                verbose_name="Превью (картинка) урока:",
+            ),
+        ),
+    ]
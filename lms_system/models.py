@@ -31,9 +31,17 @@ class Course(TimeStampedModel):
         upload_to="course_preview",
         blank=True,
         null=True,
+        db_index=True,
         verbose_name="Превью (картинка) курса:",
         help_text="Загрузите картинку",
     )
+    # Уменьшенные копии картинки (users/thumbnails.py), создаются задачей Celery после загрузки
+    preview_thumbnails = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name="Уменьшенные копии превью курса:",
+    )
     description = models.TextField(
         blank=True,
         null=True,
@@ -90,9 +98,17 @@ class Lesson(TimeStampedModel):
         upload_to="lesson_preview",
         blank=True,
         null=True,
+        db_index=True,
         verbose_name="Превью (картинка) урока:",
         help_text="Загрузите картинку",
     )
+    # Уменьшенные копии картинки (users/thumbnails.py), создаются задачей Celery после загрузки
+    preview_thumbnails = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name="Уменьшенные копии превью урока:",
+    )
     video_url = models.URLField(
         blank=True,
         null=True,
@@ -1,21 +1,26 @@
 from rest_framework import serializers
 
+from config.timing import TimedSerializerMixin
 from lms_system.models import Course, Lesson, Subscription
 from lms_system.validators import YoutubeDomainValidator, validate_domain_links
+from users.serializers import ThumbnailSrcsetField
 
 
-class LessonSerializer(serializers.ModelSerializer):
+class LessonSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Класс-сериализатор с использованием класса ModelSerializer для осуществления базовой сериализация в DRF на
     основе модели Lesson. Описывает то, какие поля модели Lesson будут участвовать в сериализации и десериализации.
     """
 
+    preview_srcset = ThumbnailSrcsetField(source="preview_thumbnails")
+
     class Meta:
         model = Lesson
-        fields = "__all__"  # можно указать автоматом все поля модели
+        # Все поля модели, кроме служебного JSON с уменьшенными копиями превью (в ответе он в виде preview_srcset)
+        exclude = ("preview_thumbnails",)
         validators = [YoutubeDomainValidator(fields=["video_url", "description"])]
 
 
-class CourseSerializer(serializers.ModelSerializer):
+class CourseSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Класс-сериализатор с использованием класса ModelSerializer для осуществления базовой сериализация в DRF на
     основе модели Course. Описывает то, какие поля модели Course будут участвовать в сериализации и десериализации.
     """
@@ -24,6 +29,7 @@ class CourseSerializer(serializers.ModelSerializer):
     lessons = LessonSerializer(many=True, read_only=True)
     description = serializers.CharField(validators=[validate_domain_links])
     is_subscribed = serializers.SerializerMethodField()
+    preview_srcset = ThumbnailSrcsetField(source="preview_thumbnails")
 
     def get_count_lessons(self, instance):
         """Функция для определения количества уроков в курсе. Запрос в БД для подсчёта связанных уроков."""
@@ -54,6 +60,7 @@ class CourseSerializer(serializers.ModelSerializer):
             "id",
             "title",
             "preview",
+            "preview_srcset",
             "description",
             "count_lessons",
             "lessons",
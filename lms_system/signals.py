@@ -1,8 +1,13 @@
+from functools import partial
+
+from django.db import transaction
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.utils import timezone
 
 from lms_system.models import Course, Lesson
+from users.tasks import task_generate_thumbnails
+from users.thumbnails import thumbnails_outdated
 
 
 @receiver(post_save, sender=Lesson)
@@ -19,3 +24,19 @@ def update_course_timestamp(sender, instance, **kwargs):
     # Плюсы: один UPDATE, без SELECT и без вызова save(), а значит не сработают сигналы для Course, если они появятся.
     # Минус: руками выставляем timezone.now(), обходя auto_now=True, но в этом кейсе это нормально и ничего не портит.
     Course.objects.filter(pk=instance.course_id).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_save, sender=Lesson)
+def generate_preview_thumbnails(sender, instance, update_fields, **kwargs):
+    """Сигнал для создания уменьшенных копий превью курса / урока (users.tasks.task_generate_thumbnails) после
+    загрузки, замены или удаления картинки. Задача ставится в очередь после фиксации транзакции.
+    :param sender: Модель, которая отправила сигнал (Course или Lesson).
+    :param instance: Конкретный объект, который был сохранён.
+    :param update_fields: Список полей, переданных в save(update_fields=...), или None.
+    :param kwargs: Дополнительные параметры, которые Django передаёт в сигнал.
+    """
+    if update_fields is not None and "preview" not in update_fields:
+        return
+    if thumbnails_outdated(instance, "preview"):
+        transaction.on_commit(partial(task_generate_thumbnails.delay, sender._meta.label, instance.pk, "preview"))
@@ -1,4 +1,4 @@
-from django.shortcuts import get_object_or_404
+from django.shortcuts import aget_object_or_404
 from rest_framework import generics, viewsets
 from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
@@ -8,6 +8,7 @@ from lms_system.models import Course, Lesson, Subscription
 from lms_system.paginators import ListPagination
 from lms_system.serializers import CourseSerializer, LessonSerializer
 from lms_system.tasks import task_send_course_update_email
+from users.async_views import AsyncAPIViewMixin
 from users.permissions import IsModerator, IsOwner
 
 
@@ -122,12 +123,13 @@ class LessonRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView):
         )
 
 
-class SubscriptionToggleAPIView(APIView):
-    """Класс-контроллер на основе низкоуровневого APIView для подписки/отписки Пользователя на Курс."""
+class SubscriptionToggleAPIView(AsyncAPIViewMixin, APIView):
+    """Класс-контроллер на основе низкоуровневого APIView для подписки/отписки Пользователя на Курс.
+    Контроллер асинхронный (см. users/async_views.py): запросы в БД выполняются асинхронным ORM."""
 
     permission_classes = [IsAuthenticated]
 
-    def post(self, request, *args, **kwargs):
+    async def post(self, request, *args, **kwargs):
         """Метод для подписки/отписки Пользователя на Курс.
         1. Получает пользователя из request.user (аутентифицированный пользователь).
         2. Получает ID курса из request.data.
@@ -146,7 +148,7 @@ class SubscriptionToggleAPIView(APIView):
             return Response({"error": "Не указан id курса"}, status=400)
 
         # Ищу в БД курс по id, а если такого курса нет, то возвращаю 404:
-        obj_course = get_object_or_404(Course, id=course_id)
+        obj_course = await aget_object_or_404(Course, id=course_id)
 
         # Получаю QuerySet с существующей подпиской (если она есть). Когда вызываю filter(user=user) и передаю
         # туда объект целиком, Django автоматически использует его первичный ключ (ID). Но можно в фильтр передавать
@@ -157,10 +159,10 @@ class SubscriptionToggleAPIView(APIView):
             user=obj_user.pk, course=obj_course.pk
         )
 
-        if subscription_data.exists():
-            subscription_data.delete()
+        if await subscription_data.aexists():
+            await subscription_data.adelete()
             message = "Подписка удалена"
         else:
-            Subscription.objects.create(user=obj_user, course=obj_course)
+            await Subscription.objects.acreate(user=obj_user, course=obj_course)
             message = "Подписка добавлена"
         return Response({"message": message})  # Возвращаю JSON-ответ
@@ -1,7 +1,15 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 
-from users.models import CustomUser, Payments
+from users.models import (
+    CustomUser,
+    PaymentRevenueRollup,
+    Payments,
+    StripePrice,
+    StripeSyncCheckpoint,
+    StripeWebhookEvent,
+    UserImportJob,
+)
 
 
 @admin.register(CustomUser)
@@ -90,3 +98,105 @@ class PaymentsAdmin(admin.ModelAdmin):
         "payment_method",
     )
     ordering = ("payment_date",)
+
+
+@admin.register(StripePrice)
+class StripePriceAdmin(admin.ModelAdmin):
+    """Настройка отображения модели *Цены в Stripe* в админке (справочник только для просмотра)."""
+
+    list_display = (
+        "paid_course",
+        "paid_lesson",
+        "unit_amount",
+        "currency",
+        "stripe_product_id",
+        "stripe_price_id",
+    )
+    readonly_fields = (
+        "paid_course",
+        "paid_lesson",
+        "unit_amount",
+        "currency",
+        "stripe_product_id",
+        "stripe_price_id",
+    )
+    search_fields = (
+        "stripe_product_id",
+        "stripe_price_id",
+    )
+
+
+@admin.register(StripeWebhookEvent)
+class StripeWebhookEventAdmin(admin.ModelAdmin):
+    """Настройка отображения модели *Webhook-события Stripe* в админке (журнал только для просмотра)."""
+
+    list_display = (
+        "event_id",
+        "event_type",
+        "received_at",
+    )
+    readonly_fields = (
+        "event_id",
+        "event_type",
+        "received_at",
+    )
+    search_fields = ("event_id",)
+    list_filter = ("event_type",)
+
+
+@admin.register(StripeSyncCheckpoint)
+class StripeSyncCheckpointAdmin(admin.ModelAdmin):
+    """Настройка отображения модели *Контрольная точка сверки Stripe* в админке."""
+
+    list_display = (
+        "name",
+        "created_gte",
+        "updated_at",
+    )
+
+
+@admin.register(PaymentRevenueRollup)
+class PaymentRevenueRollupAdmin(admin.ModelAdmin):
+    """Настройка отображения модели *Выручка по дням* в админке (сводная таблица только для просмотра)."""
+
+    list_display = (
+        "day",
+        "paid_course",
+        "paid_lesson",
+        "payment_method",
+        "payments_count",
+        "total_amount",
+        "paid_count",
+        "paid_amount",
+    )
+    list_filter = ("payment_method",)
+    date_hierarchy = "day"
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(UserImportJob)
+class UserImportJobAdmin(admin.ModelAdmin):
+    """Настройка отображения модели *Импорт пользователей* в админке (задания только для просмотра)."""
+
+    list_display = (
+        "id",
+        "status",
+        "created_by",
+        "created_at",
+        "finished_at",
+    )
+    readonly_fields = (
+        "file",
+        "status",
+        "report",
+        "error",
+        "created_by",
+        "created_at",
+        "finished_at",
+    )
+    list_filter = ("status",)
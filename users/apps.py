@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class UsersConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "users"
+
+    def ready(self):
+        """Подключение сигналов в приложении (users/signals.py). Импорт нужен ради побочного эффекта (регистрации
+        обработчиков сигналов), поэтому указываю "# noqa: F401"."""
+        import users.signals  # noqa: F401
@@ -0,0 +1,46 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+
+
+class AsyncAPIViewMixin:
+    """Миксин для контроллеров на основе APIView / Generic-классов DRF с асинхронными обработчиками
+    (async def get / post / ...). Указывается в списке родителей первым.
+    DRF вызывает обработчики синхронно, поэтому тут переопределен dispatch:
+    - аутентификация, проверка прав и ограничение частоты запросов (initial) и обработка исключений
+    (handle_exception) работают с БД и кэшем синхронно, поэтому выполняются через sync_to_async;
+    - обработчик запроса выполняется в цикле событий (event loop) и может ожидать (await) асинхронный ORM
+    (aget, asave, acreate...) и внешние API (например, Stripe через sync_to_async), не занимая воркер.
+    Миксин нужен только обработчикам, которые действительно ожидают асинхронный ORM или внешние API. Синхронный
+    Generic-контроллер (list() / create()) под ASGI Django сам выполняет в потоке, и обертка
+    async def get(...): return await sync_to_async(self.list)(...) ничего не дает.
+    Django определяет контроллер как асинхронный (View.view_is_async), если все обработчики, кроме options,
+    объявлены через async def. При запуске через ASGI (uvicorn) такой запрос не блокирует процесс, а через
+    WSGI (gunicorn config.wsgi) Django выполняет его в отдельном цикле событий - поведение API не меняется."""
+
+    async def dispatch(self, request, *args, **kwargs):
+        """Асинхронный аналог APIView.dispatch()."""
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            response = handler(request, *args, **kwargs)
+            # options и http_method_not_allowed в APIView синхронные
+            if asyncio.iscoroutine(response):
+                response = await response
+
+        except Exception as exc:
+            response = await sync_to_async(self.handle_exception)(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
@@ -0,0 +1,104 @@
+from django.conf import settings
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from users.models import CustomUser
+
+# Поля модели CustomUser, которые хранятся в "снимке" (snapshot) пользователя в кэше. Этого набора хватает для
+# работы permission-классов проекта (IsAuthenticated, IsAdminUser, IsOwner, IsModerator) и для подстановки
+# request.user в owner / user при создании объектов.
+USER_SNAPSHOT_FIELDS = ("id", "email", "is_active", "is_staff", "is_superuser")
+
+
+def get_user_snapshot_cache_key(user_id):
+    """Формирует ключ в кэше для снимка пользователя.
+    :param user_id: ID пользователя (CustomUser.pk).
+    :return: Строка-ключ для кэша.
+    """
+    return f"users:snapshot:{user_id}"
+
+
+def get_user_snapshot(user_id):
+    """Возвращает снимок пользователя (словарь) из кэша, а если его там нет - то загружает из БД одним SQL-запросом
+    и кладет в кэш на USER_SNAPSHOT_CACHE_TIMEOUT секунд.
+    Флаг "is_moderator" (состоит ли пользователь в группе "Moderators") вычисляется в том же запросе через
+    подзапрос EXISTS, чтобы не делать отдельный запрос к группам.
+    :param user_id: ID пользователя (CustomUser.pk).
+    :return: Словарь с полями снимка или None, если пользователь не найден.
+    """
+    cache_key = get_user_snapshot_cache_key(user_id)
+    snapshot = cache.get(cache_key)
+    if snapshot is not None:
+        return snapshot
+
+    snapshot = (
+        CustomUser.objects.filter(pk=user_id)
+        .annotate(
+            is_moderator=Exists(
+                Group.objects.filter(user=OuterRef("pk"), name="Moderators")
+            )
+        )
+        .values(*USER_SNAPSHOT_FIELDS, "is_moderator")
+        .first()
+    )
+    if snapshot is None:
+        return None
+
+    cache.set(cache_key, snapshot, settings.USER_SNAPSHOT_CACHE_TIMEOUT)
+    return snapshot
+
+
+def invalidate_user_snapshots(user_ids):
+    """Удаляет из кэша снимки пользователей (например, после блокировки через is_active=False).
+    :param user_ids: Список (или любой итерируемый объект) ID пользователей.
+    """
+    cache.delete_many([get_user_snapshot_cache_key(user_id) for user_id in user_ids])
+
+
+def build_user_from_snapshot(snapshot):
+    """Собирает объект CustomUser из снимка без обращения к БД.
+    Использую CustomUser.from_db() - это тот же метод, которым Django собирает объекты из результатов SQL-запроса.
+    Все поля, которых нет в снимке (first_name, avatar и т.д.), становятся "отложенными" (deferred), поэтому если
+    к ним кто-то обратится - Django сам догрузит их из БД. Т.е. поведение request.user не меняется.
+    :param snapshot: Словарь со снимком пользователя.
+    :return: Объект CustomUser.
+    """
+    user = CustomUser.from_db(
+        CustomUser.objects.db,
+        USER_SNAPSHOT_FIELDS,
+        [snapshot[field] for field in USER_SNAPSHOT_FIELDS],
+    )
+    user.is_moderator = snapshot["is_moderator"]
+    return user
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """Класс аутентификации по JWT-токену, который берет пользователя не из таблицы users_customuser, а из
+    короткоживущего снимка в кэше. Стандартный JWTAuthentication делает SELECT пользователя на каждый авторизованный
+    запрос, а тут запрос в БД выполняется только один раз за USER_SNAPSHOT_CACHE_TIMEOUT секунд (или после
+    инвалидации снимка)."""
+
+    def get_user(self, validated_token):
+        """Возвращает пользователя по проверенному токену на основе снимка из кэша."""
+        # Если включена проверка отзыва токена по смене пароля, то нужен хэш пароля из БД, поэтому тогда
+        # использую стандартное поведение JWTAuthentication.
+        if api_settings.CHECK_REVOKE_TOKEN:
+            return super().get_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken("Токен не содержит идентификатор пользователя.")
+
+        snapshot = get_user_snapshot(user_id)
+        if snapshot is None:
+            raise AuthenticationFailed("Пользователь не найден.", code="user_not_found")
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not snapshot["is_active"]:
+            raise AuthenticationFailed("Пользователь заблокирован.", code="user_inactive")
+
+        return build_user_from_snapshot(snapshot)
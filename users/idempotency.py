@@ -0,0 +1,141 @@
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from users.models import IdempotencyKey
+
+# Заголовок ответа, по которому клиент понимает, что получил сохраненный ответ на первый запрос
+IDEMPOTENT_REPLAYED_HEADER = "Idempotent-Replayed"
+
+
+def delete_expired_idempotency_keys():
+    """Удаляет ключи идемпотентности старше IDEMPOTENCY_KEY_TTL_HOURS.
+    :return: Количество удаленных ключей.
+    """
+    expired_before = timezone.now() - timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS)
+    deleted, _ = IdempotencyKey.objects.filter(created_at__lt=expired_before).delete()
+    return deleted
+
+
+class IdempotentCreateMixin:
+    """Миксин для контроллеров на основе CreateAPIView / ListCreateAPIView, который делает POST-запрос идемпотентным
+    по заголовку Idempotency-Key (аналогично API Stripe):
+    - первый запрос с ключом "резервирует" ключ (уникальная пара пользователь + ключ в IdempotencyKey), создает
+    объект и сохраняет успешный ответ;
+    - повтор с тем же ключом и тем же телом получает сохраненный ответ (заголовок Idempotent-Replayed: true) без
+    создания объекта и без запросов в Stripe;
+    - повтор, пока первый запрос еще обрабатывается - 409 Conflict (клиент повторит позже). Резервирование - это
+    аренда на IDEMPOTENCY_KEY_LEASE_SECONDS: если процесс упал, не сохранив ответ, то после этого времени повтор
+    забирает ключ себе и обрабатывается заново (а не получает 409 до конца TTL);
+    - тот же ключ с другим телом запроса - 422 Unprocessable Entity;
+    - если первый запрос завершился ошибкой, то ключ освобождается и запрос можно повторить;
+    - ключи хранятся IDEMPOTENCY_KEY_TTL_HOURS часов (после этого ключ можно использовать заново);
+    - повтор, на который есть сохраненный ответ, не расходует токены ограничения частоты запросов (get_throttles):
+    он ничего не создает, а клиенты повторяют запросы как раз тогда, когда сеть работает плохо.
+    Без заголовка Idempotency-Key запрос обрабатывается как обычно."""
+
+    idempotency_header = "Idempotency-Key"
+
+    def create(self, request, *args, **kwargs):
+        """Создает объект с учетом заголовка Idempotency-Key (без заголовка - стандартное поведение create())."""
+        key = request.headers.get(self.idempotency_header)
+        if not key:
+            return super().create(request, *args, **kwargs)
+        if len(key) > IdempotencyKey._meta.get_field("key").max_length:
+            return Response(
+                {"detail": f"Заголовок {self.idempotency_header} длиннее 255 символов."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        record, replay = self.reserve_idempotency_key(request.user, key, self.get_request_fingerprint(request))
+        if replay is not None:
+            return replay
+
+        # Ответ сохраняется и ключ освобождается, только если аренду не забрал повтор (reserved_at не изменился)
+        owned = IdempotencyKey.objects.filter(pk=record.pk, reserved_at=record.reserved_at)
+        try:
+            response = super().create(request, *args, **kwargs)
+        except Exception:
+            owned.delete()
+            raise
+
+        owned.update(response_status=response.status_code, response_body=response.data)
+        return response
+
+    def get_throttles(self):
+        """Повтор с сохраненным ответом не ограничивается по частоте (ограничения проверяются до create())."""
+        if self.get_stored_replay(self.request) is not None:
+            return []
+        return super().get_throttles()
+
+    @staticmethod
+    def get_request_fingerprint(request):
+        """Хэш разобранного тела запроса (а не сырых байт), чтобы порядок ключей и пробелы в JSON не имели значения."""
+        body = json.dumps(request.data, sort_keys=True, cls=DjangoJSONEncoder)
+        return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+    def get_stored_replay(self, request):
+        """Сохраненный ответ на POST-запрос с тем же ключом и тем же телом (повтор) или None."""
+        key = request.headers.get(self.idempotency_header)
+        if request.method != "POST" or not key or not request.user.is_authenticated:
+            return None
+        expired_before = timezone.now() - timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS)
+        record = IdempotencyKey.objects.filter(
+            user=request.user, key=key, created_at__gte=expired_before, response_status__isnull=False
+        ).first()
+        if record is None or record.request_fingerprint != self.get_request_fingerprint(request):
+            return None
+        return self.build_replay(record)
+
+    @staticmethod
+    def build_replay(record):
+        """Сохраненный ответ с заголовком Idempotent-Replayed."""
+        return Response(
+            record.response_body,
+            status=record.response_status,
+            headers={IDEMPOTENT_REPLAYED_HEADER: "true"},
+        )
+
+    def reserve_idempotency_key(self, user, key, fingerprint):
+        """Резервирует ключ идемпотентности для пользователя.
+        :return: Кортеж (объект IdempotencyKey, None) - если ключ зарезервирован этим запросом, или
+        (None, Response) - если это повтор и клиенту нужно вернуть готовый ответ.
+        """
+        expired_before = timezone.now() - timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS)
+        # Устаревший ключ удаляю, чтобы его можно было зарезервировать заново
+        IdempotencyKey.objects.filter(user=user, key=key, created_at__lt=expired_before).delete()
+        try:
+            with transaction.atomic():
+                return IdempotencyKey.objects.create(user=user, key=key, request_fingerprint=fingerprint), None
+        except IntegrityError:
+            existing = IdempotencyKey.objects.filter(user=user, key=key).first()
+
+        if existing is not None and existing.request_fingerprint != fingerprint:
+            return None, Response(
+                {"detail": "Ключ идемпотентности уже использован для запроса с другими параметрами."},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            )
+        if existing is not None and existing.response_status is None:
+            # Аренда истекла - процесс, который зарезервировал ключ, не сохранил ответ (например, упал). Ключ
+            # забирает тот, чей UPDATE по старому reserved_at сработал первым
+            now = timezone.now()
+            lease_expired_before = now - timedelta(seconds=settings.IDEMPOTENCY_KEY_LEASE_SECONDS)
+            if existing.reserved_at < lease_expired_before and IdempotencyKey.objects.filter(
+                pk=existing.pk, reserved_at=existing.reserved_at, response_status__isnull=True
+            ).update(reserved_at=now):
+                existing.reserved_at = now
+                return existing, None
+        # Первый запрос еще не сохранил ответ (или только что завершился ошибкой и освободил ключ)
+        if existing is None or existing.response_status is None:
+            return None, Response(
+                {"detail": "Запрос с этим ключом идемпотентности еще обрабатывается, повторите позже."},
+                status=status.HTTP_409_CONFLICT,
+            )
+        return None, self.build_replay(existing)
@@ -0,0 +1,88 @@
+import importlib.util
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.signals import request_finished, request_started
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from config.db import close_connection_pools
+
+MODES = ("new", "persistent", "pool")
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнение стоимости соединения с БД на запрос: цикл запроса Django (сигналы request_started / "
+        "request_finished, как у обработчика WSGI) с одним SELECT 1 при новом соединении на каждый запрос "
+        "(CONN_MAX_AGE=0), постоянном соединении (CONN_MAX_AGE) и пуле psycopg 3. Выводятся задержки на запрос "
+        "(среднее / p50 / p95). Имеет смысл на PostgreSQL - на SQLite соединение почти ничего не стоит"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=500, help="Количество запросов в каждом режиме")
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS, help="Алиас БД из DATABASES")
+        parser.add_argument(
+            "--modes", nargs="+", choices=MODES, default=list(MODES), help="Режимы для сравнения (по умолчанию все)"
+        )
+        parser.add_argument(
+            "--conn-max-age", type=int, default=60, help="CONN_MAX_AGE для режима persistent (по умолчанию 60)"
+        )
+
+    def handle(self, *args, **options):
+        connection = connections[options["database"]]
+        settings_dict = connection.settings_dict
+        original_conn_max_age = settings_dict["CONN_MAX_AGE"]
+        original_options = dict(settings_dict["OPTIONS"])
+
+        for mode in options["modes"]:
+            if mode == "pool" and not self.pool_available(connection):
+                message = "pool: пропущен (нужны PostgreSQL и пакет psycopg[pool], poetry install -E pool)"
+                self.stdout.write(self.style.WARNING(message))
+                continue
+
+            close_connection_pools()
+            settings_dict["OPTIONS"] = {key: value for key, value in original_options.items() if key != "pool"}
+            if mode == "new":
+                settings_dict["CONN_MAX_AGE"] = 0
+            elif mode == "persistent":
+                settings_dict["CONN_MAX_AGE"] = options["conn_max_age"]
+            else:
+                settings_dict["CONN_MAX_AGE"] = 0
+                settings_dict["OPTIONS"]["pool"] = original_options.get("pool") or True
+
+            try:
+                latencies = self.run_requests(connection, options["requests"])
+            finally:
+                close_connection_pools()
+                settings_dict["CONN_MAX_AGE"] = original_conn_max_age
+                settings_dict["OPTIONS"] = dict(original_options)
+
+            percentiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+            self.stdout.write(
+                f"{mode}: запросов {len(latencies)}, мс на запрос: среднее {statistics.mean(latencies) * 1000:.2f}, "
+                f"p50 {percentiles[49] * 1000:.2f}, p95 {percentiles[94] * 1000:.2f}"
+            )
+
+    @staticmethod
+    def pool_available(connection):
+        """Пул поддерживает только бэкенд PostgreSQL с драйвером psycopg 3."""
+        return connection.vendor == "postgresql" and importlib.util.find_spec("psycopg_pool") is not None
+
+    def run_requests(self, connection, count):
+        """Выполняет count циклов запроса и возвращает время каждого в секундах. Соединение закрывается или
+        возвращается в пул обработчиком request_finished (close_old_connections), как после настоящего запроса."""
+        if count < 1:
+            raise CommandError("Количество запросов должно быть больше 0.")
+        latencies = []
+        for _ in range(count):
+            started = time.perf_counter()
+            request_started.send(sender=self.__class__)
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                    cursor.fetchone()
+            finally:
+                request_finished.send(sender=self.__class__)
+            latencies.append(time.perf_counter() - started)
+        return latencies
@@ -0,0 +1,73 @@
+import json
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+from requests.adapters import HTTPAdapter
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочный тест HTTP-эндпоинта: N параллельных клиентов (concurrency) отправляют запросы, в конце выводятся "
+        "пропускная способность (запросов в секунду) и задержки (p50 / p95 / p99). Используется для сравнения "
+        "запуска через WSGI и ASGI (SERVER_MODE в entrypoint.sh)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("url", help="Адрес эндпоинта (например, http://127.0.0.1:8000/users/payment/1/status/)")
+        parser.add_argument("--method", default="GET", help="HTTP-метод (по умолчанию GET)")
+        parser.add_argument("--data", help="Тело запроса в формате JSON (для POST)")
+        parser.add_argument("--email", help="Email пользователя, от имени которого выпускается JWT-токен")
+        parser.add_argument("--concurrency", type=int, default=50, help="Количество параллельных клиентов")
+        parser.add_argument("--requests", type=int, default=500, help="Общее количество запросов")
+        parser.add_argument("--timeout", type=float, default=30, help="Таймаут одного запроса в секундах")
+
+    def handle(self, *args, **options):
+        headers = {}
+        if options["email"]:
+            user = CustomUser.objects.filter(email=options["email"]).first()
+            if user is None:
+                raise CommandError(f"Пользователь {options['email']} не найден.")
+            headers["Authorization"] = f"Bearer {RefreshToken.for_user(user).access_token}"
+        body = json.loads(options["data"]) if options["data"] else None
+
+        concurrency = options["concurrency"]
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+
+        def send(_):
+            started = time.perf_counter()
+            try:
+                response = session.request(
+                    options["method"], options["url"], json=body, headers=headers, timeout=options["timeout"]
+                )
+                status = response.status_code
+            except requests.RequestException:
+                status = None
+            return status, time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(send, range(options["requests"])))
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(latency for _, latency in results)
+        statuses = {}
+        for status, _ in results:
+            statuses[status or "error"] = statuses.get(status or "error", 0) + 1
+        percentiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+
+        self.stdout.write(f"Запросов: {len(results)}, параллельно: {concurrency}, время: {elapsed:.2f} с")
+        self.stdout.write(f"Ответы: {', '.join(f'{status}: {count}' for status, count in statuses.items())}")
+        self.stdout.write(
+            f"Задержка, мс: p50 {percentiles[49] * 1000:.0f}, p95 {percentiles[94] * 1000:.0f}, "
+            f"p99 {percentiles[98] * 1000:.0f}, max {latencies[-1] * 1000:.0f}"
+        )
+        self.stdout.write(self.style.SUCCESS(f"Пропускная способность: {len(results) / elapsed:.1f} запросов/с"))
@@ -0,0 +1,23 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from config.openapi import build_openapi_schema
+
+
+class Command(BaseCommand):
+    help = (
+        "Генерация схемы OpenAPI (документация API) в файл OPENAPI_SCHEMA_FILE. Выполняется при сборке Docker-образа, "
+        "чтобы воркеры отдавали готовую схему с адреса /openapi.json, а не генерировали ее на каждый запрос"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", help="Путь к файлу (по умолчанию OPENAPI_SCHEMA_FILE из settings.py)")
+
+    def handle(self, *args, **options):
+        output = Path(options["output"] or settings.OPENAPI_SCHEMA_FILE)
+        content = build_openapi_schema()
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_bytes(content)
+        self.stdout.write(self.style.SUCCESS(f"Схема OpenAPI сохранена в {output} ({len(content) // 1024} КБ)"))
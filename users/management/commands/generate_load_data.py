@@ -0,0 +1,63 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from users.synthetic_data import SyntheticDataGenerator
+
+
+class Command(BaseCommand):
+    help = (
+        "Синтетические данные для нагрузочного тестирования: пользователи, курсы, уроки, подписки и платежи "
+        "с реалистичными распределениями (рост аудитории, популярность курсов по Ципфу). Один и тот же --seed и "
+        "--end-date дают одни и те же данные. В PostgreSQL строки записываются через COPY, в остальных БД - "
+        "через bulk_create. Только для тестовых стендов: данные добавляются к существующим"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1_000_000, help="Количество пользователей")
+        parser.add_argument("--courses", type=int, default=50_000, help="Количество курсов")
+        parser.add_argument("--lessons", type=int, default=2_000_000, help="Количество уроков")
+        parser.add_argument("--subscriptions", type=int, default=10_000_000, help="Количество подписок")
+        parser.add_argument("--payments", type=int, default=5_000_000, help="Количество платежей")
+        parser.add_argument("--days", type=int, default=730, help="Длина периода данных в днях")
+        parser.add_argument(
+            "--end-date",
+            type=date.fromisoformat,
+            default=None,
+            help="Последний день периода данных, ГГГГ-ММ-ДД (по умолчанию сегодня)",
+        )
+        parser.add_argument("--seed", type=int, default=0, help="Seed генераторов случайных чисел")
+        parser.add_argument("--batch-size", type=int, default=10_000, help="Размер пачки для COPY / bulk_create")
+        parser.add_argument("--password", default="password123", help="Пароль всех созданных пользователей")
+        parser.add_argument(
+            "--method",
+            choices=["auto", "copy", "bulk"],
+            default="auto",
+            help="Способ записи: copy (только PostgreSQL), bulk (bulk_create), auto - copy для PostgreSQL",
+        )
+
+    def handle(self, *args, **options):
+        volumes = {name: options[name] for name in ("users", "courses", "lessons", "subscriptions", "payments")}
+        if any(value < 0 for value in volumes.values()) or options["days"] < 1 or options["batch_size"] < 1:
+            raise CommandError("Количества не могут быть отрицательными, --days и --batch-size - больше 0.")
+
+        use_copy = {"auto": None, "copy": True, "bulk": False}[options["method"]]
+        generator = SyntheticDataGenerator(
+            seed=options["seed"],
+            end_date=options["end_date"],
+            days=options["days"],
+            batch_size=options["batch_size"],
+            password=options["password"],
+            use_copy=use_copy,
+            log=self.stdout.write if options["verbosity"] > 1 else None,
+        )
+        if generator.use_copy and not generator.supports_copy():
+            raise CommandError("COPY поддерживается только в PostgreSQL: используйте --method bulk.")
+        try:
+            report = generator.generate(**volumes)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        for name, count in report.items():
+            self.stdout.write(f"{name}: {count}")
+        self.stdout.write(self.style.SUCCESS("Синтетические данные созданы"))
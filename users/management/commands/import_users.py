@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from users.services import import_users_from_csv
+
+
+class Command(BaseCommand):
+    help = "Массовый импорт пользователей из CSV-файла (email, password, first_name, last_name, phone_number, city)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("csv_path", help="Путь к CSV-файлу с пользователями")
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Количество процессов для хэширования паролей (по умолчанию - количество ядер CPU)",
+        )
+
+    def handle(self, *args, **options):
+        with open(options["csv_path"], encoding="utf-8-sig") as csv_file:
+            report = import_users_from_csv(csv_file, workers=options["workers"])
+
+        for error in report["errors"]:
+            self.stdout.write(
+                self.style.WARNING(f"Строка {error['line']} ({error['email']}): {error['error']}")
+            )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Импорт завершен: создано {report['created']}, пропущено {report['skipped']}"
+            )
+        )
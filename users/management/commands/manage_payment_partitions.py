@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from users.partitions import convert_payments_to_partitioned, maintain_payments_partitions
+
+
+class Command(BaseCommand):
+    help = (
+        "Секционирование таблицы платежей по месяцам (PostgreSQL): создание секций на будущие месяцы и "
+        "отсоединение устаревших. С флагом --convert - одноразовое преобразование таблицы в секционированную"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--convert",
+            action="store_true",
+            help="Преобразовать обычную таблицу платежей в секционированную (выполнять в окно обслуживания)",
+        )
+
+    def handle(self, *args, **options):
+        if options["convert"]:
+            try:
+                moved = convert_payments_to_partitioned()
+            except RuntimeError as e:
+                raise CommandError(str(e))
+            self.stdout.write(self.style.SUCCESS(f"Таблица платежей секционирована, перенесено платежей: {moved}"))
+
+        report = maintain_payments_partitions()
+        if report is None:
+            self.stdout.write(self.style.WARNING("Таблица платежей не секционирована - обслуживание секций не нужно"))
+            return
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Создано секций: {len(report['created'])}, отсоединено секций: {len(report['detached'])}"
+            )
+        )
+        for name in report["detached"]:
+            self.stdout.write(f"Отсоединена секция {name} (архивировать: pg_dump -t {name}, затем DROP TABLE)")
@@ -0,0 +1,124 @@
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+
+# Код запуска каждого типа процесса - то, что процесс импортирует до обработки первого запроса / задачи:
+#   - manage: manage.py (django.setup - настройки и все приложения из INSTALLED_APPS, их модели и сигналы);
+#   - web: воркер gunicorn (config.wsgi и разбор URL-шаблонов - все контроллеры и сериализаторы);
+#   - celery: воркер Celery (celery -A config worker - приложение config.celery и модули задач из autodiscover).
+PROCESS_SCRIPTS = {
+    "manage": "import django; django.setup()",
+    "web": "from config.wsgi import application; from django.urls import get_resolver; get_resolver()._populate()",
+    "celery": "from config.celery import app; app.loader.import_default_modules()",
+}
+
+# Строка вывода python -X importtime: "import time: <собственное, мкс> | <с вложенными, мкс> | <отступ><модуль>"
+IMPORTTIME_PREFIX = "import time:"
+
+
+def parse_importtime(output):
+    """Разбор вывода python -X importtime (stderr).
+    :return: Список кортежей (модуль, собственное время в мкс, время с вложенными импортами в мкс, модуль, который его
+    импортировал, или None для импортов верхнего уровня).
+    """
+    records = []
+    for line in output.splitlines():
+        if not line.startswith(IMPORTTIME_PREFIX):
+            continue
+        self_us, cumulative_us, name = line[len(IMPORTTIME_PREFIX):].split("|", 2)
+        # Первая строка вывода - заголовок таблицы ("self [us] | cumulative | imported package")
+        if not self_us.strip().isdigit():
+            continue
+        # Вложенность импорта обозначается отступом в два пробела на уровень (после одного пробела-разделителя)
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        records.append([name.strip(), int(self_us), int(cumulative_us), depth])
+
+    # Модуль выводится после всех своих вложенных импортов, поэтому родитель ищется при обходе с конца
+    parents = []
+    for record in reversed(records):
+        depth = record[3]
+        del parents[depth:]
+        record[3] = parents[-1] if parents else None
+        parents.append(record[0])
+    return [tuple(record) for record in records]
+
+
+def get_package(module):
+    """Пакет верхнего уровня модуля (django.db.models -> django)."""
+    return module.split(".", 1)[0]
+
+
+def summarize_imports(records):
+    """Сводка по импортам процесса.
+    :return: Кортеж:
+        - общее время импорта в мкс (сумма импортов верхнего уровня);
+        - собственное время импорта по пакетам верхнего уровня {пакет: мкс};
+        - точки входа в пакеты {(модуль, кто импортировал): мкс} - импорты, которые загружают модуль другого пакета,
+        вместе с вложенными импортами. По ним видно, какой модуль проекта тянет тяжелую зависимость.
+    """
+    total = sum(cumulative for _, _, cumulative, parent in records if parent is None)
+    packages = defaultdict(int)
+    entry_points = {}
+    for name, self_us, cumulative, parent in records:
+        packages[get_package(name)] += self_us
+        if parent is None or get_package(parent) != get_package(name):
+            entry_points[(name, parent)] = cumulative
+    return total, dict(packages), entry_points
+
+
+class Command(BaseCommand):
+    help = (
+        "Время импорта модулей при запуске процессов проекта (manage.py, воркер gunicorn, воркер Celery). "
+        "Каждый процесс запускается отдельно (python -X importtime), выводятся общее время импорта, пакеты с "
+        "наибольшим собственным временем импорта и самые долгие импорты пакетов вместе с вложенными импортами "
+        "(какой модуль загружает тяжелый пакет)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--processes",
+            nargs="+",
+            choices=PROCESS_SCRIPTS,
+            default=list(PROCESS_SCRIPTS),
+            help="Типы процессов (по умолчанию все)",
+        )
+        parser.add_argument("--top", type=int, default=15, help="Количество пакетов и модулей в отчете")
+
+    def handle(self, *args, **options):
+        if options["top"] < 1:
+            raise CommandError("Количество пакетов и модулей должно быть больше 0.")
+
+        for process in options["processes"]:
+            records = self.profile_process(process)
+            total, packages, entry_points = summarize_imports(records)
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{process}: импорт {total / 1000:.0f} мс"))
+
+            self.stdout.write("  Пакеты (собственное время импорта всех модулей пакета):")
+            for package, self_us in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:options["top"]]:
+                self.stdout.write(f"    {self_us / 1000:8.1f} мс  {package}")
+
+            self.stdout.write("  Импорты пакетов (время вместе с вложенными импортами):")
+            for (name, parent), cumulative in sorted(
+                entry_points.items(), key=lambda item: item[1], reverse=True
+            )[:options["top"]]:
+                imported_by = f" <- {parent}" if parent else ""
+                self.stdout.write(f"    {cumulative / 1000:8.1f} мс  {name}{imported_by}")
+
+    @staticmethod
+    def profile_process(process):
+        """Запускает код запуска процесса в новом интерпретаторе с -X importtime (в текущем процессе модули уже
+        импортированы) и возвращает разобранный вывод (parse_importtime)."""
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": os.environ.get("DJANGO_SETTINGS_MODULE", "config.settings")}
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", PROCESS_SCRIPTS[process]],
+            capture_output=True,
+            text=True,
+            env=env,
+        )
+        if result.returncode:
+            error = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else result.returncode
+            raise CommandError(f"Процесс {process} завершился с ошибкой: {error}")
+        return parse_importtime(result.stderr)
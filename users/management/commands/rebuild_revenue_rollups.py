@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from users.services import rebuild_payment_revenue_rollups
+
+
+class Command(BaseCommand):
+    help = "Полный пересчет сводной таблицы выручки (PaymentRevenueRollup) по таблице платежей"
+
+    def handle(self, *args, **options):
+        rows = rebuild_payment_revenue_rollups()
+        self.stdout.write(self.style.SUCCESS(f"Сводная таблица выручки пересчитана: {rows} строк"))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from users.stripe_stub import create_stripe_stub_server
+
+
+class Command(BaseCommand):
+    help = "Запуск локальной заглушки Stripe API (для тестов и нагрузочного тестирования без настоящего Stripe)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1", help="Адрес сервера (по умолчанию 127.0.0.1)")
+        parser.add_argument("--port", type=int, default=12111, help="Порт сервера (по умолчанию 12111)")
+        parser.add_argument(
+            "--latency", type=int, default=0, help="Задержка ответа в миллисекундах (имитация сети до Stripe)"
+        )
+
+    def handle(self, *args, **options):
+        server = create_stripe_stub_server(options["host"], options["port"], options["latency"] / 1000)
+        host, port = server.server_address[:2]
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Заглушка Stripe запущена: укажите STRIPE_API_BASE=http://{host}:{port} (Ctrl+C - остановить)"
+            )
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
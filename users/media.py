@@ -0,0 +1,79 @@
+import mimetypes
+import posixpath
+from pathlib import Path
+from urllib.parse import quote
+
+from django.conf import settings
+from django.db.models import Q
+from django.http import FileResponse, Http404, HttpResponse
+
+from config.storage import is_content_addressed_name
+from lms_system.models import Course, Lesson
+from users.models import CustomUser, ImageRendition
+
+# Поля с загружаемыми файлами, которые отдаются через ProtectedMediaAPIView. Папка в MEDIA_ROOT берется из upload_to
+# поля ("user_avatar", "course_preview", "lesson_preview").
+PROTECTED_MEDIA_FIELDS = (
+    (CustomUser, "avatar"),
+    (Course, "preview"),
+    (Lesson, "preview"),
+)
+# Время (в секундах), на которое браузер может сохранить файл у себя (только у себя - Cache-Control: private)
+PROTECTED_MEDIA_MAX_AGE = 3600
+# Файлы с именем по хэшу содержимого (config.storage.ContentAddressedStorage) не меняются - кэш на год без
+# повторных запросов (immutable). Файлы, загруженные до этого хранилища, кэшируются на PROTECTED_MEDIA_MAX_AGE
+PROTECTED_MEDIA_IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+def get_media_field(path):
+    """Находит модель и поле, в которое загружен файл, по первой папке пути.
+    :param path: Путь к файлу относительно MEDIA_ROOT (например, "user_avatar/photo.png").
+    :return: Кортеж (модель, имя поля) или None, если путь не относится к защищенным файлам или выходит за пределы
+    своей папки ("..", абсолютный путь).
+    """
+    normalized = posixpath.normpath(path)
+    if normalized != path or path.startswith("/") or ".." in path.split("/"):
+        return None
+    folder = path.split("/", 1)[0]
+    for model, field_name in PROTECTED_MEDIA_FIELDS:
+        if model._meta.get_field(field_name).upload_to == folder:
+            return model, field_name
+    return None
+
+
+def is_media_referenced(path):
+    """Проверяет, что файл загружен в поле какого-нибудь объекта или является уменьшенной копией такого файла
+    (users/thumbnails.py). Файлы, на которые объекты уже не ссылаются (например, старая аватарка после замены), не
+    отдаются.
+    Оба условия - точное сравнение по столбцу с картинкой (db_index): исходные картинки копии берутся из таблицы
+    ImageRendition по индексу, а не поиском подстроки в JSON-полях копий (полный просмотр таблицы)."""
+    media_field = get_media_field(path)
+    if media_field is None:
+        return False
+    model, field_name = media_field
+    sources = ImageRendition.objects.filter(name=path).values("source")
+    return model._default_manager.filter(Q(**{field_name: path}) | Q(**{f"{field_name}__in": sources})).exists()
+
+
+def build_media_response(path):
+    """Ответ с файлом из MEDIA_ROOT.
+    - MEDIA_X_ACCEL_REDIRECT=True (за nginx): пустой ответ с заголовком X-Accel-Redirect. Nginx сам отдает файл из
+    внутреннего (internal) location MEDIA_X_ACCEL_PREFIX через sendfile, воркер Django не читает и не передает байты.
+    - Иначе (локальный запуск и тесты): файл отдает Django (FileResponse).
+    :raise Http404: Если файла нет на диске (только без X-Accel-Redirect - с ним 404 вернет nginx).
+    """
+    content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    if settings.MEDIA_X_ACCEL_REDIRECT:
+        response = HttpResponse(content_type=content_type)
+        # Путь кодируется (пробелы, кириллица в имени файла), nginx декодирует его сам
+        response["X-Accel-Redirect"] = f"{settings.MEDIA_X_ACCEL_PREFIX}{quote(path)}"
+    else:
+        file_path = Path(settings.MEDIA_ROOT) / path
+        if not file_path.is_file():
+            raise Http404("Файл не найден.")
+        response = FileResponse(file_path.open("rb"), content_type=content_type)
+    if is_content_addressed_name(path):
+        response["Cache-Control"] = f"private, max-age={PROTECTED_MEDIA_IMMUTABLE_MAX_AGE}, immutable"
+    else:
+        response["Cache-Control"] = f"private, max-age={PROTECTED_MEDIA_MAX_AGE}"
+    return response
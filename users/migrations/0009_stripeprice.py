@@ -0,0 +1,85 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lms_system", "0006_course_created_at_course_updated_at_and_more"),
+        ("users", "0008_payments_payment_status"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StripePrice",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "unit_amount",
+                    models.PositiveIntegerField(verbose_name="Сумма в копейках:"),
+                ),
+                ("currency", models.CharField(max_length=3, verbose_name="Валюта:")),
+                (
+                    "stripe_product_id",
+                    models.CharField(
+                        max_length=255,
+                        verbose_name="Продукт в платежной системе Stripe:",
+                    ),
+                ),
+                (
+                    "stripe_price_id",
+                    models.CharField(
+                        max_length=255, verbose_name="Цена в платежной системе Stripe:"
+                    ),
+                ),
+                (
+                    "paid_course",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="stripe_prices",
+                        to="lms_system.course",
+                        verbose_name="Курс:",
+                    ),
+                ),
+                (
+                    "paid_lesson",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="stripe_prices",
+                        to="lms_system.lesson",
+                        verbose_name="Урок:",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Цена в Stripe",
+                "verbose_name_plural": "Цены в Stripe",
+                "constraints": [
+                    models.UniqueConstraint(
+                        condition=models.Q(("paid_course__isnull", False)),
+                        fields=("paid_course", "unit_amount", "currency"),
+                        name="unique_stripe_price_for_course",
+                    ),
+                    models.UniqueConstraint(
+                        condition=models.Q(("paid_lesson__isnull", False)),
+                        fields=("paid_lesson", "unit_amount", "currency"),
+                        name="unique_stripe_price_for_lesson",
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0009_stripeprice"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StripeWebhookEvent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "event_id",
+                    models.CharField(
+                        max_length=255, unique=True, verbose_name="ID события в Stripe:"
+                    ),
+                ),
+                (
+                    "event_type",
+                    models.CharField(max_length=255, verbose_name="Тип события:"),
+                ),
+                (
+                    "received_at",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="Дата и время получения:"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Событие Stripe",
+                "verbose_name_plural": "События Stripe",
+            },
+        ),
+        migrations.AlterField(
+            model_name="payments",
+            name="stripe_session_id",
+            field=models.CharField(
+                blank=True,
+                db_index=True,
+                max_length=255,
+                null=True,
+                verbose_name="Созданная сессия для получения ссылки в платежной системе Stripe:",
+            ),
+        ),
+    ]
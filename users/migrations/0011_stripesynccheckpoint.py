@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0010_stripewebhookevent_payments_session_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StripeSyncCheckpoint",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "name",
+                    models.CharField(
+                        max_length=100, unique=True, verbose_name="Название сверки:"
+                    ),
+                ),
+                (
+                    "created_gte",
+                    models.DateTimeField(verbose_name="Сессии, созданные начиная с:"),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        auto_now=True, verbose_name="Дата и время последней сверки:"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Контрольная точка сверки Stripe",
+                "verbose_name_plural": "Контрольные точки сверки Stripe",
+            },
+        ),
+    ]
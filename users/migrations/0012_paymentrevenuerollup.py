@@ -0,0 +1,107 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lms_system", "0006_course_created_at_course_updated_at_and_more"),
+        ("users", "0011_stripesynccheckpoint"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PaymentRevenueRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField(verbose_name="День:")),
+                (
+                    "payment_method",
+                    models.CharField(
+                        choices=[("transfer", "Перевод на счет"), ("cash", "Наличные")],
+                        max_length=100,
+                        verbose_name="Метод платежа:",
+                    ),
+                ),
+                (
+                    "payments_count",
+                    models.IntegerField(default=0, verbose_name="Количество платежей:"),
+                ),
+                (
+                    "total_amount",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        max_digits=16,
+                        verbose_name="Сумма платежей:",
+                    ),
+                ),
+                (
+                    "paid_count",
+                    models.IntegerField(
+                        default=0, verbose_name="Количество оплаченных платежей:"
+                    ),
+                ),
+                (
+                    "paid_amount",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        max_digits=16,
+                        verbose_name="Сумма оплаченных платежей:",
+                    ),
+                ),
+                (
+                    "paid_course",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="revenue_rollups",
+                        to="lms_system.course",
+                        verbose_name="Курс:",
+                    ),
+                ),
+                (
+                    "paid_lesson",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="revenue_rollups",
+                        to="lms_system.lesson",
+                        verbose_name="Урок:",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Выручка за день",
+                "verbose_name_plural": "Выручка по дням",
+                "indexes": [
+                    models.Index(fields=["day"], name="revenue_rollup_day_idx")
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        condition=models.Q(("paid_course__isnull", False)),
+                        fields=("day", "paid_course", "payment_method"),
+                        name="unique_revenue_rollup_for_course",
+                    ),
+                    models.UniqueConstraint(
+                        condition=models.Q(("paid_lesson__isnull", False)),
+                        fields=("day", "paid_lesson", "payment_method"),
+                        name="unique_revenue_rollup_for_lesson",
+                    ),
+                ],
+            },
+        ),
+    ]
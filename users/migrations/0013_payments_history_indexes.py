@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lms_system", "0006_course_created_at_course_updated_at_and_more"),
+        ("users", "0012_paymentrevenuerollup"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="payments",
+            index=models.Index(
+                fields=["user", "payment_date", "id"], name="payments_user_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="payments",
+            index=models.Index(
+                fields=["user", "paid_course", "payment_date", "id"],
+                name="payments_user_course_date_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="payments",
+            index=models.Index(
+                fields=["user", "paid_lesson", "payment_date", "id"],
+                name="payments_user_lesson_date_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="payments",
+            index=models.Index(
+                fields=["user", "payment_method", "payment_date", "id"],
+                name="payments_user_method_date_idx",
+            ),
+        ),
+    ]
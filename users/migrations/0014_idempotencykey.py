@@ -0,0 +1,87 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:53
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0013_payments_history_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="IdempotencyKey",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "key",
+                    models.CharField(
+                        max_length=255, verbose_name="Ключ идемпотентности:"
+                    ),
+                ),
+                (
+                    "request_fingerprint",
+                    models.CharField(max_length=64, verbose_name="Хэш тела запроса:"),
+                ),
+                (
+                    "response_status",
+                    models.PositiveSmallIntegerField(
+                        blank=True,
+                        help_text="Пусто, пока первый запрос еще обрабатывается",
+                        null=True,
+                        verbose_name="HTTP-статус ответа:",
+                    ),
+                ),
+                (
+                    "response_body",
+                    models.JSONField(
+                        blank=True,
+                        encoder=django.core.serializers.json.DjangoJSONEncoder,
+                        null=True,
+                        verbose_name="Тело ответа:",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="Дата и время первого запроса:"
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="idempotency_keys",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Пользователь:",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Ключ идемпотентности",
+                "verbose_name_plural": "Ключи идемпотентности",
+                "indexes": [
+                    models.Index(
+                        fields=["created_at"], name="idempotency_key_created_idx"
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("user", "key"), name="unique_idempotency_key_for_user"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0014_idempotencykey"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="customuser",
+            name="avatar_thumbnails",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                editable=False,
+                verbose_name="Уменьшенные копии аватара:",
+            ),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:55
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0015_customuser_avatar_thumbnails"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="idempotencykey",
+            name="reserved_at",
+            field=models.DateTimeField(
+                default=django.utils.timezone.now,
+                help_text="Начало обработки запроса, который зарезервировал ключ (аренда на IDEMPOTENCY_KEY_LEASE_SECONDS)",
+                verbose_name="Дата и время резервирования:",
+            ),
+        ),
+    ]
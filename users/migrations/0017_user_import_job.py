@@ -0,0 +1,89 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:09
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0016_idempotencykey_reserved_at"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UserImportJob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "file",
+                    models.FileField(
+                        blank=True,
+                        help_text="Удаляется после импорта (содержит пароли в открытом виде)",
+                        upload_to="user_imports/",
+                        verbose_name="CSV-файл:",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "В очереди"),
+                            ("running", "Выполняется"),
+                            ("done", "Завершено"),
+                            ("failed", "Ошибка"),
+                        ],
+                        default="pending",
+                        max_length=20,
+                        verbose_name="Статус:",
+                    ),
+                ),
+                (
+                    "report",
+                    models.JSONField(
+                        blank=True,
+                        help_text="Результат импорта: {'created': ..., 'skipped': ..., 'errors': [...]}",
+                        null=True,
+                        verbose_name="Отчет:",
+                    ),
+                ),
+                ("error", models.TextField(blank=True, verbose_name="Ошибка:")),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="Дата и время создания:"
+                    ),
+                ),
+                (
+                    "finished_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Дата и время завершения:"
+                    ),
+                ),
+                (
+                    "created_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="user_import_jobs",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Администратор:",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Импорт пользователей",
+                "verbose_name_plural": "Импорты пользователей",
+            },
+        ),
+    ]
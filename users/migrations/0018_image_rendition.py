@@ -0,0 +1,78 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:13
+
+from django.db import migrations, models
+
+# Модели и поля с картинками, уменьшенные копии которых уже созданы (users/thumbnails.py)
+THUMBNAIL_FIELDS = (
+    ("users", "CustomUser", "avatar_thumbnails"),
+    ("lms_system", "Course", "preview_thumbnails"),
+    ("lms_system", "Lesson", "preview_thumbnails"),
+)
+
+
+def fill_image_renditions(apps, schema_editor):
+    """Заполняет таблицу ImageRendition по уже созданным копиям из JSON-полей *_thumbnails."""
+    image_rendition = apps.get_model("users", "ImageRendition")
+    renditions = []
+    for app_label, model_name, field_name in THUMBNAIL_FIELDS:
+        model = apps.get_model(app_label, model_name)
+        for thumbnails in model.objects.values_list(field_name, flat=True).iterator():
+            for rendition in (thumbnails or {}).get("renditions", []):
+                renditions.append(image_rendition(name=rendition["name"], source=thumbnails["source"]))
+    image_rendition.objects.bulk_create(renditions, batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lms_system", "0008_preview_db_index"),
+        ("users", "0017_user_import_job"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="customuser",
+            name="avatar",
+            field=models.ImageField(
+                blank=True,
+                db_index=True,
+                help_text="Загрузите аватар",
+                null=True,
+                upload_to="user_avatar",
+                verbose_name="Аватар:",
+            ),
+        ),
+        migrations.CreateModel(
+            name="ImageRendition",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=255, verbose_name="Путь копии:")),
+                (
+                    "source",
+                    models.CharField(
+                        db_index=True,
+                        max_length=255,
+                        verbose_name="Путь исходной картинки:",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Уменьшенная копия картинки",
+                "verbose_name_plural": "Уменьшенные копии картинок",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("name", "source"), name="unique_image_rendition_source"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(fill_image_renditions, migrations.RunPython.noop),
+    ]
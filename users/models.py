@@ -1,5 +1,7 @@
 from django.contrib.auth.models import AbstractUser
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.utils import timezone
 from phonenumber_field.modelfields import PhoneNumberField  # type: ignore
 
 from lms_system.models import Course, Lesson
@@ -29,9 +31,17 @@ class CustomUser(AbstractUser):
         upload_to="user_avatar",
         blank=True,
         null=True,
+        db_index=True,
         verbose_name="Аватар:",
         help_text="Загрузите аватар",
     )
+    # Уменьшенные копии картинки (users/thumbnails.py), создаются задачей Celery после загрузки
+    avatar_thumbnails = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name="Уменьшенные копии аватара:",
+    )
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = []
@@ -59,6 +69,13 @@ class Payments(models.Model):
         ("cash", "Наличные"),
     ]
 
+    # Статусы создания ссылки на оплату в Stripe в асинхронном режиме (STRIPE_CHECKOUT_ASYNC):
+    # - "pending" - платеж создан, Celery-задача еще создает продукт / цену / сессию в Stripe;
+    # - "failed" - Stripe так и не ответил успешно после всех повторных попыток.
+    # После создания сессии в payment_status записывается статус оплаты из Stripe ("unpaid", "paid" и т.д.).
+    CHECKOUT_PENDING = "pending"
+    CHECKOUT_FAILED = "failed"
+
     user = models.ForeignKey(
         to=CustomUser,
         on_delete=models.SET_NULL,  # SET_NULL нужен, чтоб сохранить платеж даже если пользователь удалится в будущем
@@ -129,6 +146,8 @@ class Payments(models.Model):
         max_length=255,
         blank=True,
         null=True,
+        # Индекс нужен для быстрого поиска платежа по ID сессии при обработке webhook-событий от Stripe
+        db_index=True,
         verbose_name="Созданная сессия для получения ссылки в платежной системе Stripe:",
     )
     payment_url = models.URLField(
@@ -138,6 +157,24 @@ class Payments(models.Model):
         verbose_name="Ссылка на оплату продукта:",
     )
 
+    # Поля, от которых зависит вклад платежа в сводную таблицу выручки (PaymentRevenueRollup)
+    REVENUE_FIELDS = (
+        "payment_date",
+        "paid_course_id",
+        "paid_lesson_id",
+        "payment_method",
+        "payment_amount",
+        "payment_status",
+    )
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Запоминает значения полей в момент загрузки из БД (рецепт из документации Django), чтобы при сохранении
+        сигнал мог посчитать, как изменился вклад платежа в сводную таблицу выручки."""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
     def __str__(self):
         """Метод определяет строковое представление объекта. Полезно для отображения объектов в админке/консоли."""
         return f"Платеж от {self.user.email} на сумму {self.payment_amount} / {self.payment_date}"
@@ -145,3 +182,356 @@ class Payments(models.Model):
     class Meta:
         verbose_name = "Платеж"
         verbose_name_plural = "Платежи"
+        # Составные индексы под историю платежей пользователя (PaymentsListCreateAPIView): фильтр по пользователю
+        # (и, опционально, по курсу / уроку / методу платежа) + сортировка и курсор по (payment_date, id)
+        indexes = [
+            models.Index(fields=["user", "payment_date", "id"], name="payments_user_date_idx"),
+            models.Index(fields=["user", "paid_course", "payment_date", "id"], name="payments_user_course_date_idx"),
+            models.Index(fields=["user", "paid_lesson", "payment_date", "id"], name="payments_user_lesson_date_idx"),
+            models.Index(
+                fields=["user", "payment_method", "payment_date", "id"], name="payments_user_method_date_idx"
+            ),
+        ]
+
+
+class StripePrice(models.Model):
+    """Модель StripePrice - это локальный справочник уже созданных в Stripe продуктов и цен.
+    Ключ: (Курс или Урок, сумма в копейках, валюта) -> ID продукта и ID цены в Stripe.
+    Нужен, чтобы при каждой оплате не создавать в Stripe новый Product и новый Price (это 2 лишних HTTP-запроса
+    на каждый платеж и бесконечный рост каталога в Stripe): справочник проверяется до обращения к Stripe и
+    заполняется при первой оплате продукта по такой цене."""
+
+    paid_course = models.ForeignKey(
+        to=Course,
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        related_name="stripe_prices",
+        verbose_name="Курс:",
+    )
+    paid_lesson = models.ForeignKey(
+        to=Lesson,
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        related_name="stripe_prices",
+        verbose_name="Урок:",
+    )
+    unit_amount = models.PositiveIntegerField(
+        verbose_name="Сумма в копейках:",
+    )
+    currency = models.CharField(
+        max_length=3,
+        verbose_name="Валюта:",
+    )
+    stripe_product_id = models.CharField(
+        max_length=255,
+        verbose_name="Продукт в платежной системе Stripe:",
+    )
+    stripe_price_id = models.CharField(
+        max_length=255,
+        verbose_name="Цена в платежной системе Stripe:",
+    )
+
+    def __str__(self):
+        """Метод определяет строковое представление объекта. Полезно для отображения объектов в админке/консоли."""
+        return f"{self.paid_course or self.paid_lesson}: {self.unit_amount / 100} {self.currency}"
+
+    class Meta:
+        verbose_name = "Цена в Stripe"
+        verbose_name_plural = "Цены в Stripe"
+        # Условные уникальные ограничения: для одного Курса (или Урока) может быть только одна цена Stripe на
+        # одну сумму в одной валюте. Они же служат индексами для поиска цены перед обращением к Stripe.
+        constraints = [
+            models.UniqueConstraint(
+                fields=["paid_course", "unit_amount", "currency"],
+                condition=models.Q(paid_course__isnull=False),
+                name="unique_stripe_price_for_course",
+            ),
+            models.UniqueConstraint(
+                fields=["paid_lesson", "unit_amount", "currency"],
+                condition=models.Q(paid_lesson__isnull=False),
+                name="unique_stripe_price_for_lesson",
+            ),
+        ]
+
+
+class StripeWebhookEvent(models.Model):
+    """Модель StripeWebhookEvent хранит ID уже обработанных webhook-событий от Stripe. Stripe гарантирует доставку
+    "как минимум один раз" и может прислать одно и то же событие повторно, поэтому уникальный event_id позволяет
+    обработать каждое событие ровно один раз."""
+
+    event_id = models.CharField(
+        max_length=255,
+        unique=True,
+        verbose_name="ID события в Stripe:",
+    )
+    event_type = models.CharField(
+        max_length=255,
+        verbose_name="Тип события:",
+    )
+    received_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Дата и время получения:",
+    )
+
+    def __str__(self):
+        """Метод определяет строковое представление объекта. Полезно для отображения объектов в админке/консоли."""
+        return f"{self.event_type} ({self.event_id})"
+
+    class Meta:
+        verbose_name = "Событие Stripe"
+        verbose_name_plural = "События Stripe"
+
+
+class StripeSyncCheckpoint(models.Model):
+    """Модель StripeSyncCheckpoint хранит контрольную точку периодической сверки платежей со Stripe: с какой даты
+    создания запрашивать сессии оплаты при следующем запуске (чтобы не выгружать из Stripe всю историю)."""
+
+    name = models.CharField(
+        max_length=100,
+        unique=True,
+        verbose_name="Название сверки:",
+    )
+    created_gte = models.DateTimeField(
+        verbose_name="Сессии, созданные начиная с:",
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name="Дата и время последней сверки:",
+    )
+
+    def __str__(self):
+        """Метод определяет строковое представление объекта. Полезно для отображения объектов в админке/консоли."""
+        return f"{self.name}: с {self.created_gte}"
+
+    class Meta:
+        verbose_name = "Контрольная точка сверки Stripe"
+        verbose_name_plural = "Контрольные точки сверки Stripe"
+
+
+class PaymentRevenueRollup(models.Model):
+    """Модель PaymentRevenueRollup - сводная таблица выручки (день x Курс / Урок x метод платежа). Обновляется
+    инкрементально при создании платежа и смене его статуса (users/signals.py, users/services.py), поэтому отчеты
+    читают заранее посчитанные суммы, а не выполняют SUM(payment_amount) по всей таблице платежей."""
+
+    day = models.DateField(
+        verbose_name="День:",
+    )
+    paid_course = models.ForeignKey(
+        to=Course,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name="revenue_rollups",
+        verbose_name="Курс:",
+    )
+    paid_lesson = models.ForeignKey(
+        to=Lesson,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name="revenue_rollups",
+        verbose_name="Урок:",
+    )
+    payment_method = models.CharField(
+        max_length=100,
+        choices=Payments.METHOD,
+        verbose_name="Метод платежа:",
+    )
+    payments_count = models.IntegerField(
+        default=0,
+        verbose_name="Количество платежей:",
+    )
+    total_amount = models.DecimalField(
+        max_digits=16,
+        decimal_places=2,
+        default=0,
+        verbose_name="Сумма платежей:",
+    )
+    paid_count = models.IntegerField(
+        default=0,
+        verbose_name="Количество оплаченных платежей:",
+    )
+    paid_amount = models.DecimalField(
+        max_digits=16,
+        decimal_places=2,
+        default=0,
+        verbose_name="Сумма оплаченных платежей:",
+    )
+
+    def __str__(self):
+        """Метод определяет строковое представление объекта. Полезно для отображения объектов в админке/консоли."""
+        return f"{self.day} / {self.paid_course or self.paid_lesson} / {self.payment_method}: {self.total_amount}"
+
+    class Meta:
+        verbose_name = "Выручка за день"
+        verbose_name_plural = "Выручка по дням"
+        # Одна строка на день, продукт и метод платежа (как в StripePrice - условные ограничения, т.к. указан либо
+        # Курс, либо Урок). Строки без продукта (продукт удален) не ограничиваются - API выручки их суммирует.
+        constraints = [
+            models.UniqueConstraint(
+                fields=["day", "paid_course", "payment_method"],
+                condition=models.Q(paid_course__isnull=False),
+                name="unique_revenue_rollup_for_course",
+            ),
+            models.UniqueConstraint(
+                fields=["day", "paid_lesson", "payment_method"],
+                condition=models.Q(paid_lesson__isnull=False),
+                name="unique_revenue_rollup_for_lesson",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["day"], name="revenue_rollup_day_idx"),
+        ]
+
+
+class IdempotencyKey(models.Model):
+    """Модель IdempotencyKey хранит ключи идемпотентности (заголовок Idempotency-Key) запросов на создание платежа
+    и первый успешный ответ на них. Повтор запроса с тем же ключом (например, мобильный клиент повторил запрос
+    после таймаута) получает сохраненный ответ, а не создает второй платеж и вторую сессию оплаты в Stripe."""
+
+    user = models.ForeignKey(
+        to=CustomUser,
+        on_delete=models.CASCADE,
+        related_name="idempotency_keys",
+        verbose_name="Пользователь:",
+    )
+    key = models.CharField(
+        max_length=255,
+        verbose_name="Ключ идемпотентности:",
+    )
+    request_fingerprint = models.CharField(
+        max_length=64,
+        verbose_name="Хэш тела запроса:",
+    )
+    response_status = models.PositiveSmallIntegerField(
+        blank=True,
+        null=True,
+        verbose_name="HTTP-статус ответа:",
+        help_text="Пусто, пока первый запрос еще обрабатывается",
+    )
+    response_body = models.JSONField(
+        encoder=DjangoJSONEncoder,
+        blank=True,
+        null=True,
+        verbose_name="Тело ответа:",
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Дата и время первого запроса:",
+    )
+    reserved_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name="Дата и время резервирования:",
+        help_text="Начало обработки запроса, который зарезервировал ключ (аренда на IDEMPOTENCY_KEY_LEASE_SECONDS)",
+    )
+
+    def __str__(self):
+        """Метод определяет строковое представление объекта. Полезно для отображения объектов в админке/консоли."""
+        return f"{self.key} ({self.user_id})"
+
+    class Meta:
+        verbose_name = "Ключ идемпотентности"
+        verbose_name_plural = "Ключи идемпотентности"
+        constraints = [
+            models.UniqueConstraint(fields=["user", "key"], name="unique_idempotency_key_for_user"),
+        ]
+        indexes = [
+            models.Index(fields=["created_at"], name="idempotency_key_created_idx"),
+        ]
+
+
+class UserImportJob(models.Model):
+    """Модель UserImportJob - задание на импорт пользователей из CSV-файла. Запрос администратора только сохраняет
+    файл и ставит задачу в отдельную очередь Celery (USER_IMPORT_QUEUE), а хеширование паролей и запись в БД
+    выполняются в воркере; статус и отчет задания доступны по GET /users/import/<pk>/."""
+
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+    STATUS_CHOICES = [
+        (PENDING, "В очереди"),
+        (RUNNING, "Выполняется"),
+        (DONE, "Завершено"),
+        (FAILED, "Ошибка"),
+    ]
+
+    file = models.FileField(
+        upload_to="user_imports/",
+        blank=True,
+        verbose_name="CSV-файл:",
+        help_text="Удаляется после импорта (содержит пароли в открытом виде)",
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default=PENDING,
+        verbose_name="Статус:",
+    )
+    report = models.JSONField(
+        blank=True,
+        null=True,
+        verbose_name="Отчет:",
+        help_text="Результат импорта: {'created': ..., 'skipped': ..., 'errors': [...]}",
+    )
+    error = models.TextField(
+        blank=True,
+        verbose_name="Ошибка:",
+    )
+    created_by = models.ForeignKey(
+        CustomUser,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name="user_import_jobs",
+        verbose_name="Администратор:",
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Дата и время создания:",
+    )
+    finished_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name="Дата и время завершения:",
+    )
+
+    def __str__(self):
+        """Метод определяет строковое представление объекта. Полезно для отображения объектов в админке/консоли."""
+        return f"Импорт пользователей #{self.pk} ({self.status})"
+
+    class Meta:
+        verbose_name = "Импорт пользователей"
+        verbose_name_plural = "Импорты пользователей"
+
+
+class ImageRendition(models.Model):
+    """Модель ImageRendition - связь уменьшенной копии картинки (users/thumbnails.py) с исходной картинкой.
+    По имени копии нельзя определить исходный файл (ContentAddressedStorage сохраняет копию под хэшем содержимого, и
+    одна копия может принадлежать нескольким картинкам), поэтому проверка доступа к копии (users.media ->
+    is_media_referenced) находит исходные картинки по индексу этой таблицы, а не поиском по JSON-полям копий."""
+
+    # Поиск по имени копии использует индекс ограничения unique_image_rendition_source (name - первый столбец)
+    name = models.CharField(
+        max_length=255,
+        verbose_name="Путь копии:",
+    )
+    source = models.CharField(
+        max_length=255,
+        db_index=True,
+        verbose_name="Путь исходной картинки:",
+    )
+
+    def __str__(self):
+        """Метод определяет строковое представление объекта. Полезно для отображения объектов в админке/консоли."""
+        return f"{self.name} <- {self.source}"
+
+    class Meta:
+        verbose_name = "Уменьшенная копия картинки"
+        verbose_name_plural = "Уменьшенные копии картинок"
+        constraints = [
+            models.UniqueConstraint(fields=["name", "source"], name="unique_image_rendition_source"),
+        ]
@@ -0,0 +1,86 @@
+import base64
+import binascii
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class PaymentsCursorPagination(CursorPagination):
+    """Пагинатор истории платежей по курсору (keyset pagination) на паре полей (payment_date, id).
+    - Следующая страница выбирается условием "(payment_date, id) меньше, чем у последнего платежа страницы" и
+    читается по составному индексу (user, ..., payment_date, id), поэтому время загрузки страницы не зависит от того,
+    насколько далеко клиент пролистал историю (в отличие от OFFSET).
+    - id в курсоре нужен, т.к. payment_date не уникальна (стандартный CursorPagination из DRF в этом случае
+    дополняет курсор смещением).
+    - Сортировка: по умолчанию от новых к старым, параметр ?ordering=payment_date - от старых к новым.
+    - Ссылка есть только на следующую страницу (история листается "вперед", как лента)."""
+
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    ordering = ("-payment_date", "-id")
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Возвращает одну страницу платежей после позиции из курсора (page_size + 1 строк - одним запросом)."""
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.descending = request.query_params.get(api_settings.ORDERING_PARAM) != "payment_date"
+
+        if self.descending:
+            queryset = queryset.order_by("-payment_date", "-id")
+        else:
+            queryset = queryset.order_by("payment_date", "id")
+
+        position = self.decode_position(request)
+        if position:
+            payment_date, pk = position
+            if self.descending:
+                # Первое условие (диапазон по payment_date) ограничивает проход по индексу, второе - отсекает
+                # платежи с той же датой, которые уже были на предыдущей странице
+                queryset = queryset.filter(
+                    Q(payment_date__lte=payment_date),
+                    Q(payment_date__lt=payment_date) | Q(payment_date=payment_date, id__lt=pk),
+                )
+            else:
+                queryset = queryset.filter(
+                    Q(payment_date__gte=payment_date),
+                    Q(payment_date__gt=payment_date) | Q(payment_date=payment_date, id__gt=pk),
+                )
+
+        results = list(queryset[: self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        self.page = results[: self.page_size]
+        return self.page
+
+    def decode_position(self, request):
+        """Разбирает курсор из параметра запроса в пару (payment_date, id).
+        :raise NotFound: Если курсор поврежден (как и стандартный CursorPagination из DRF)."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payment_date, pk = base64.urlsafe_b64decode(encoded.encode("ascii")).decode("ascii").split("|")
+            return datetime.fromisoformat(payment_date), int(pk)
+        except (TypeError, ValueError, UnicodeError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_position(self, payment):
+        """Формирует курсор из (payment_date, id) последнего платежа на странице."""
+        position = f"{payment.payment_date.isoformat()}|{payment.pk}"
+        return base64.urlsafe_b64encode(position.encode("ascii")).decode("ascii")
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return replace_query_param(self.base_url, self.cursor_query_param, self.encode_position(self.page[-1]))
+
+    def get_previous_link(self):
+        return None
+
+    def get_html_context(self):
+        return {"previous_url": None, "next_url": self.get_next_link()}
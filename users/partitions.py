@@ -0,0 +1,250 @@
+import re
+from datetime import date, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from users.models import Payments
+
+# Секционирование (declarative range partitioning) таблицы платежей PostgreSQL по месяцам на поле payment_date:
+# - users_payments - секционированная таблица (PARTITION BY RANGE (payment_date));
+# - users_payments_pГГГГ_ММ - секция за месяц (FROM первое число месяца TO первое число следующего месяца, UTC);
+# - users_payments_default - секция по умолчанию для строк вне созданных месяцев, чтобы INSERT не падал, если
+# периодическая задача не успела создать секцию.
+# Первичный ключ секционированной таблицы обязан включать ключ секционирования, поэтому в БД он (id, payment_date),
+# а для Django первичным ключом остается id (значения id уникальны - они берутся из одной последовательности).
+PAYMENTS_TABLE = Payments._meta.db_table
+PAYMENTS_DEFAULT_PARTITION = f"{PAYMENTS_TABLE}_default"
+PAYMENTS_PARTITION_RE = re.compile(rf"^{PAYMENTS_TABLE}_p(\d{{4}})_(\d{{2}})$")
+
+
+def add_months(month, months):
+    """Сдвигает первое число месяца на указанное количество месяцев (в обе стороны).
+    :param month: Дата - первое число месяца.
+    :param months: Количество месяцев.
+    :return: Дата - первое число месяца.
+    """
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def get_payments_partition_name(month):
+    """Имя секции таблицы платежей за месяц (например, users_payments_p2026_10)."""
+    return f"{PAYMENTS_TABLE}_p{month.year:04d}_{month.month:02d}"
+
+
+def get_current_month():
+    """Первое число текущего месяца (UTC - границы секций тоже в UTC)."""
+    today = timezone.now().astimezone(dt_timezone.utc).date()
+    return today.replace(day=1)
+
+
+def is_payments_partitioned():
+    """Проверяет, что БД - PostgreSQL и таблица платежей уже секционирована (relkind = 'p')."""
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", [PAYMENTS_TABLE])
+        row = cursor.fetchone()
+    return bool(row) and row[0] == "p"
+
+
+def get_payments_partitions():
+    """Возвращает словарь {первое число месяца: имя секции} для присоединенных месячных секций (без секций,
+    отсоединение которых через CONCURRENTLY было прервано - см. detach_old_payments_partitions)."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE pg_inherits.inhparent = to_regclass(%s) AND NOT pg_inherits.inhdetachpending
+            """,
+            [PAYMENTS_TABLE],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    partitions = {}
+    for name in names:
+        match = PAYMENTS_PARTITION_RE.match(name)
+        if match:
+            partitions[date(int(match.group(1)), int(match.group(2)), 1)] = name
+    return partitions
+
+
+def create_payments_partition(cursor, month):
+    """Создает секцию таблицы платежей за месяц (если ее еще нет).
+    Если в секции по умолчанию уже есть строки за этот месяц, PostgreSQL откажет в создании секции - такие строки
+    нужно перенести вручную (это сигнал, что периодическая задача долго не запускалась)."""
+    upper = add_months(month, 1)
+    cursor.execute(
+        f'CREATE TABLE IF NOT EXISTS "{get_payments_partition_name(month)}" PARTITION OF "{PAYMENTS_TABLE}" '
+        f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') TO ('{upper.isoformat()} 00:00:00+00')"
+    )
+
+
+def ensure_payments_partitions(months_ahead=None):
+    """Создает секции таблицы платежей на текущий месяц и на months_ahead месяцев вперед.
+    :param months_ahead: Количество месяцев вперед (по умолчанию PAYMENTS_PARTITIONS_AHEAD).
+    :return: Список имен созданных секций.
+    """
+    months_ahead = settings.PAYMENTS_PARTITIONS_AHEAD if months_ahead is None else months_ahead
+    existing = get_payments_partitions()
+    current = get_current_month()
+    created = []
+    with connection.cursor() as cursor:
+        for offset in range(months_ahead + 1):
+            month = add_months(current, offset)
+            if month not in existing:
+                create_payments_partition(cursor, month)
+                created.append(get_payments_partition_name(month))
+    return created
+
+
+def has_payments_default_partition():
+    """Проверяет, что у секционированной таблицы платежей есть секция по умолчанию (DEFAULT)."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT partdefid <> 0 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)", [PAYMENTS_TABLE]
+        )
+        row = cursor.fetchone()
+    return bool(row and row[0])
+
+
+def detach_old_payments_partitions(retention_months=None):
+    """Отсоединяет секции таблицы платежей старше retention_months месяцев. Отсоединенная секция остается
+    обычной таблицей с тем же именем: ее можно выгрузить в архив (pg_dump -t) и удалить (DROP TABLE) - без долгого
+    DELETE по основной таблице и без раздувания ее индексов.
+    Блокировки:
+    - DETACH PARTITION ... CONCURRENTLY (SHARE UPDATE EXCLUSIVE - чтение и запись в платежи не блокируются)
+    выполняется, только если у таблицы нет секции по умолчанию (PostgreSQL это не поддерживает) и вызов не внутри
+    транзакции (CONCURRENTLY нельзя выполнять в транзакции). Прерванное отсоединение (секция в состоянии
+    "detach pending") завершается через DETACH PARTITION ... FINALIZE при следующем запуске.
+    - Иначе обычный DETACH PARTITION: ACCESS EXCLUSIVE на таблицу платежей и секцию по умолчанию до конца
+    транзакции. Само отсоединение - изменение каталога (миллисекунды), но ALTER TABLE ждет завершения всех запросов
+    к платежам, а новые запросы встают в очередь за ним. Поэтому ожидание ограничено PAYMENTS_PARTITIONS_LOCK_TIMEOUT:
+    при превышении - ошибка, и секция отсоединяется при следующем запуске.
+    :param retention_months: Сколько месяцев хранить (по умолчанию PAYMENTS_PARTITIONS_RETENTION_MONTHS,
+    0 - не отсоединять).
+    :return: Список имен отсоединенных секций.
+    """
+    retention_months = settings.PAYMENTS_PARTITIONS_RETENTION_MONTHS if retention_months is None else retention_months
+    if not retention_months:
+        return []
+
+    oldest_kept = add_months(get_current_month(), -retention_months)
+    concurrently = not connection.in_atomic_block and not has_payments_default_partition()
+    detached = []
+    with connection.cursor() as cursor:
+        if concurrently:
+            cursor.execute(
+                """
+                SELECT child.relname
+                FROM pg_inherits
+                JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+                WHERE pg_inherits.inhparent = to_regclass(%s) AND pg_inherits.inhdetachpending
+                """,
+                [PAYMENTS_TABLE],
+            )
+            for (name,) in cursor.fetchall():
+                cursor.execute(f'ALTER TABLE "{PAYMENTS_TABLE}" DETACH PARTITION "{name}" FINALIZE')
+                detached.append(name)
+
+        for month, name in sorted(get_payments_partitions().items()):
+            if month >= oldest_kept:
+                continue
+            if concurrently:
+                cursor.execute(f'ALTER TABLE "{PAYMENTS_TABLE}" DETACH PARTITION "{name}" CONCURRENTLY')
+            else:
+                with transaction.atomic():
+                    cursor.execute(
+                        "SELECT set_config('lock_timeout', %s, true)", [settings.PAYMENTS_PARTITIONS_LOCK_TIMEOUT]
+                    )
+                    cursor.execute(f'ALTER TABLE "{PAYMENTS_TABLE}" DETACH PARTITION "{name}"')
+            detached.append(name)
+    return detached
+
+
+def maintain_payments_partitions():
+    """Обслуживание секций таблицы платежей (для периодической задачи и команды manage_payment_partitions):
+    создает секции на будущие месяцы и отсоединяет устаревшие.
+    :return: Словарь {"created": [...], "detached": [...]} или None, если таблица не секционирована.
+    """
+    if not is_payments_partitioned():
+        return None
+    return {"created": ensure_payments_partitions(), "detached": detach_old_payments_partitions()}
+
+
+def convert_payments_to_partitioned(months_ahead=None):
+    """Одноразовое преобразование обычной таблицы платежей в секционированную (в одной транзакции, на время
+    переноса данных таблица блокируется - выполнять в окно обслуживания):
+        1. Исходная таблица переименовывается в users_payments_old.
+        2. Создается секционированная таблица с теми же колонками и значениями по умолчанию (LIKE), своя
+        последовательность для id (IDENTITY на секционированных таблицах PostgreSQL до 17 версии не поддерживает)
+        и первичный ключ (id, payment_date).
+        3. Создаются месячные секции от самого старого платежа до months_ahead месяцев вперед и секция по умолчанию.
+        4. Данные переносятся одним INSERT ... SELECT, переносятся внешние ключи и индексы, старая таблица удаляется.
+    :param months_ahead: Количество месяцев вперед (по умолчанию PAYMENTS_PARTITIONS_AHEAD).
+    :return: Количество перенесенных платежей.
+    :raise RuntimeError: Если БД - не PostgreSQL или таблица уже секционирована.
+    """
+    if connection.vendor != "postgresql":
+        raise RuntimeError("Секционирование таблицы платежей поддерживается только в PostgreSQL.")
+    if is_payments_partitioned():
+        raise RuntimeError(f"Таблица {PAYMENTS_TABLE} уже секционирована.")
+
+    table = PAYMENTS_TABLE
+    old_table = f"{table}_old"
+    sequence = f"{table}_id_seq"
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'LOCK TABLE "{table}" IN ACCESS EXCLUSIVE MODE')
+        # Внешние ключи и индексы (кроме первичного ключа) исходной таблицы, чтобы создать их заново
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = %s::regclass "
+            "AND contype = 'f'",
+            [table],
+        )
+        foreign_keys = cursor.fetchall()
+        cursor.execute(
+            "SELECT indexname, indexdef FROM pg_indexes WHERE tablename = %s AND indexname NOT IN "
+            "(SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass AND contype IN ('p', 'u'))",
+            [table, table],
+        )
+        indexes = cursor.fetchall()
+        cursor.execute(f'SELECT MIN(payment_date), COALESCE(MAX(id), 0) FROM "{table}"')
+        oldest, max_id = cursor.fetchone()
+
+        cursor.execute(f'ALTER TABLE "{table}" RENAME TO "{old_table}"')
+        cursor.execute(
+            f'CREATE TABLE "{table}" (LIKE "{old_table}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+            "PARTITION BY RANGE (payment_date)"
+        )
+
+        current = get_current_month()
+        first = oldest.astimezone(dt_timezone.utc).date().replace(day=1) if oldest else current
+        month = min(first, current)
+        last = add_months(current, settings.PAYMENTS_PARTITIONS_AHEAD if months_ahead is None else months_ahead)
+        while month <= last:
+            create_payments_partition(cursor, month)
+            month = add_months(month, 1)
+        cursor.execute(f'CREATE TABLE "{PAYMENTS_DEFAULT_PARTITION}" PARTITION OF "{table}" DEFAULT')
+
+        cursor.execute(f'INSERT INTO "{table}" SELECT * FROM "{old_table}"')
+        moved = cursor.rowcount
+        # Проверки отложенных (DEFERRABLE INITIALLY DEFERRED) внешних ключей, ожидающие конца транзакции, выполняются
+        # сейчас: таблицу с такими событиями триггеров PostgreSQL удалить не даст
+        cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+        # Имена последовательности, индексов и ограничений уникальны в схеме, поэтому создаю их заново только после
+        # удаления старой таблицы. Определения индексов получены до переименования и уже ссылаются на новую таблицу.
+        cursor.execute(f'DROP TABLE "{old_table}"')
+        cursor.execute(f'CREATE SEQUENCE "{sequence}" OWNED BY "{table}".id')
+        cursor.execute("SELECT setval(%s, %s, %s)", [sequence, max_id or 1, bool(max_id)])
+        cursor.execute(f"ALTER TABLE \"{table}\" ALTER COLUMN id SET DEFAULT nextval('\"{sequence}\"')")
+        cursor.execute(f'ALTER TABLE "{table}" ADD CONSTRAINT "{table}_pkey" PRIMARY KEY (id, payment_date)')
+        for name, definition in foreign_keys:
+            cursor.execute(f'ALTER TABLE "{table}" ADD CONSTRAINT "{name}" {definition}')
+        for name, definition in indexes:
+            # Индекс на секционированной таблице автоматически создается во всех секциях
+            cursor.execute(definition)
+    return moved
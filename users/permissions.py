@@ -8,7 +8,13 @@ class IsModerator(BasePermission):
 
     def has_permission(self, request, view):
         """Возвращает True, если пользователь аутентифицирован и состоит в группе "Moderators".
-        Используется в контроллерах для ограничения доступа к операциям создания и удаления уроков/курсов."""
+        Используется в контроллерах для ограничения доступа к операциям создания и удаления уроков/курсов.
+        Если пользователь загружен из снимка в кэше (users/authentication.py), то флаг is_moderator уже посчитан
+        и дополнительный запрос к группам не нужен."""
+
+        is_moderator = getattr(request.user, "is_moderator", None)
+        if is_moderator is not None:
+            return request.user.is_authenticated and is_moderator
 
         return (
             request.user.is_authenticated
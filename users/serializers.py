@@ -2,14 +2,30 @@ from rest_framework import serializers
 from rest_framework_simplejwt.exceptions import AuthenticationFailed
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 
-from users.models import CustomUser, Payments
+from config.timing import TimedSerializerMixin
+from users.models import CustomUser, Payments, UserImportJob
+from users.thumbnails import build_srcset
 
 
-class PaymentsSerializer(serializers.ModelSerializer):
+class ThumbnailSrcsetField(serializers.ReadOnlyField):
+    """Поле сериализатора с уменьшенными копиями картинки в формате srcset по форматам:
+    {"webp": "<url> 160w, <url> 320w, <url> 640w", "jpeg": "..."} (users/thumbnails.py). Списки передают копии
+    в несколько килобайт вместо исходной картинки. null - картинки нет или копии еще создаются задачей Celery.
+    Источник - JSON-поле модели, например: ThumbnailSrcsetField(source="preview_thumbnails")."""
+
+    def to_representation(self, value):
+        return build_srcset(value, self.context.get("request"))
+
+
+class PaymentsSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Класс-сериализатор с использованием класса ModelSerializer для осуществления базовой сериализация в DRF на
     основе модели Payments. Описывает то, какие поля модели Payments будут участвовать в сериализации и
     десериализации."""
 
+    # Названия оплаченного продукта для истории платежей (Курс и Урок подгружаются через select_related)
+    paid_course_title = serializers.CharField(source="paid_course.title", read_only=True, default=None)
+    paid_lesson_title = serializers.CharField(source="paid_lesson.title", read_only=True, default=None)
+
     def validate(self, data):
         """Валидация логики полей платежа: тип оплаты и выбор продукта (курс или урок).
         Это так называемая ранняя валидация еще в сериализаторе поэтому из контроллера PaymentsListCreateAPIView()
@@ -68,12 +84,13 @@ class PaymentsSerializer(serializers.ModelSerializer):
         )
 
 
-class CustomUserSerializer(serializers.ModelSerializer):
+class CustomUserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Класс-сериализатор с использованием класса ModelSerializer для осуществления базовой сериализация в DRF на
     основе модели CustomUser. Описывает то, какие поля модели CustomUser будут участвовать в сериализации и
     десериализации."""
 
     payments = PaymentsSerializer(many=True, read_only=True)
+    avatar_srcset = ThumbnailSrcsetField(source="avatar_thumbnails")
 
     def create(self, validated_data):
         """Переопределяем создание пользователя, чтобы пароль сохранялся БД в хэшированном виде."""
@@ -106,7 +123,8 @@ class CustomUserSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = CustomUser
-        fields = "__all__"
+        # Все поля модели, кроме служебного JSON с уменьшенными копиями аватара (в ответе он в виде avatar_srcset)
+        exclude = ("avatar_thumbnails",)
         # extra_kwargs - это зарезервированное имя в Meta-классе ModelSerializer для настройки конкретных полей,
         # например, ниже указываю что пароль только на ЗАПИСЬ. Т.е. его можно отправить через POST/PUT/PATCH,
         # но оно не будет отображаться в ответе API (GET, LIST и т.п.).
@@ -115,7 +133,44 @@ class CustomUserSerializer(serializers.ModelSerializer):
         }
 
 
-class CustomObtainPairSerializer(TokenObtainPairSerializer):
+class CustomUserImportSerializer(TimedSerializerMixin, serializers.Serializer):
+    """Класс-сериализатор для загрузки CSV-файла при массовом импорте пользователей (не связан с моделью)."""
+
+    file = serializers.FileField(help_text="CSV-файл: email, password, first_name, last_name, phone_number, city")
+
+    def validate_file(self, value):
+        """Проверка, что загружен именно CSV-файл."""
+        if not value.name.lower().endswith(".csv"):
+            raise serializers.ValidationError("Загрузите файл в формате CSV.")
+        return value
+
+
+class UserImportJobSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """Класс-сериализатор задания на импорт пользователей (статус и отчет, файл не отдается)."""
+
+    class Meta:
+        model = UserImportJob
+        fields = ("id", "status", "report", "error", "created_at", "finished_at")
+        read_only_fields = fields
+
+
+class PaymentRevenueSerializer(TimedSerializerMixin, serializers.Serializer):
+    """Класс-сериализатор строк отчета о выручке из сводной таблицы PaymentRevenueRollup (строки уже агрегированы
+    по дню, продукту и методу платежа, поэтому сериализатор не связан с моделью)."""
+
+    day = serializers.DateField()
+    paid_course = serializers.IntegerField(allow_null=True)
+    course_title = serializers.CharField(source="paid_course__title", allow_null=True)
+    paid_lesson = serializers.IntegerField(allow_null=True)
+    lesson_title = serializers.CharField(source="paid_lesson__title", allow_null=True)
+    payment_method = serializers.CharField()
+    payments_count = serializers.IntegerField()
+    total_amount = serializers.DecimalField(max_digits=16, decimal_places=2)
+    paid_count = serializers.IntegerField()
+    paid_amount = serializers.DecimalField(max_digits=16, decimal_places=2)
+
+
+class CustomObtainPairSerializer(TimedSerializerMixin, TokenObtainPairSerializer):
     """Кастомный класс-сериализатор токена наследующийся от TokenObtainPairSerializer, позволяющий вход по email."""
 
     # ВАЖНО! Необходимо указать, что username_field - это будет email.
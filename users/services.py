@@ -1,8 +1,51 @@
-import stripe
+import csv
+import io
+import multiprocessing
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+
+import django
 from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Min, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from phonenumber_field.phonenumber import to_python as to_phone_number  # type: ignore
+
+from config.cpu import get_cpu_count
+from lms_system.models import Course
+from users.models import (
+    CustomUser,
+    PaymentRevenueRollup,
+    Payments,
+    StripePrice,
+    StripeSyncCheckpoint,
+    StripeWebhookEvent,
+)
+from users.stripe_client import get_stripe_client
+
+# Библиотека stripe импортируется внутри функций, которые к ней обращаются: ее импорт занимает около секунды, а этот
+# модуль загружается в каждом процессе (сигналы, контроллеры, задачи Celery). Процессы, которые не работают со
+# Stripe, этот импорт не выполняют (см. команду profile_imports)
+
+# Название контрольной точки периодической сверки платежей со Stripe (StripeSyncCheckpoint.name)
+STRIPE_RECONCILE_CHECKPOINT = "checkout_sessions"
+
+
+def get_stripe_request_options(idempotency_key=None):
+    """Формирует параметры запроса к Stripe. Явный ключ идемпотентности нужен там, где один и тот же вызов может
+    повториться на уровне приложения (например, повтор Celery-задачи), - тогда Stripe вернет уже созданный объект
+    вместо создания дубликата. Если ключ не указан, то при сетевых повторах его генерирует сама библиотека Stripe.
 
-# Подтягиваю из settings.py секретный ключ для сервиса Stripe
-stripe.api_key = settings.SECRET_KEY_FOR_STRIPE
+    :param idempotency_key: Ключ идемпотентности (строка) или None.
+    :return: Словарь options для методов stripe.StripeClient.
+    """
+    return {"idempotency_key": idempotency_key} if idempotency_key else {}
 
 
 def create_stripe_product(paid_product):
@@ -22,68 +65,560 @@ def create_stripe_product(paid_product):
             "Объект должен иметь атрибут 'title' для создания продукта в Stripe"
         )
 
+    import stripe
+
     try:
-        product = stripe.Product.create(name=paid_product.title)
+        product = get_stripe_client().v1.products.create(params={"name": paid_product.title})
         return product.id
     except stripe.error.StripeError as e:
         raise Exception(f"Ошибка при создании продукта в Stripe: {e.user_message}")
 
 
-def create_stripe_price(product_id, payment_amount):
+def convert_to_unit_amount(payment_amount):
+    """Перевод суммы платежа в копейки (Stripe принимает сумму в минимальных единицах валюты).
+    round() нужен из-за погрешности float: например, 19.99 * 100 = 1998.9999..., а int() дал бы 1998.
+
+    :param payment_amount: Сумма платежа в рублях.
+    :return: Сумма в копейках (int).
+    """
+    return int(round(payment_amount * 100))
+
+
+def create_stripe_price(product_id, payment_amount, currency=None):
     """Создание цены продукта в платежной системе Stripe.
     Достаточно в функцию передать только product_id и payment_amount.
 
     :param product_id: ID продукта из Stripe (строка).
     :param payment_amount: Цена продукта, которую потом нужно перевести в копейки обязательно.
+    :param currency: Валюта (по умолчанию STRIPE_CURRENCY из settings.py).
     :return: Для дальнейшего процесса формирования оплаты в return хватит одного price.id. Возвращаем объект
     только тогда, если нам нужно хранить какие-то другие поля (например, currency, unit_amount и т.д.).
     """
+    import stripe
+
     try:
-        price = stripe.Price.create(
-            currency="RUB",
-            unit_amount=int(payment_amount * 100),
-            # В create_price() можно использовать ***product_data={"id": product_id}*** вместо
-            # ***product=product_id***, если нам нужно одновременно создать нового продукта прям сразу тут в цене
-            # без create_product_course(). Но, если продукт уже создан, то нужно использовать ***product=product_id***
-            # вместо product_data.
-            product=product_id,
+        currency = currency or settings.STRIPE_CURRENCY
+        unit_amount = convert_to_unit_amount(payment_amount)
+        price = get_stripe_client().v1.prices.create(
+            params={
+                "currency": currency,
+                "unit_amount": unit_amount,
+                # В create_price() можно использовать ***product_data={"id": product_id}*** вместо
+                # ***product=product_id***, если нам нужно одновременно создать нового продукта прям сразу тут в
+                # цене без create_product_course(). Но, если продукт уже создан, то нужно использовать
+                # ***product=product_id*** вместо product_data.
+                "product": product_id,
+            },
+            # Цена однозначно определяется продуктом, суммой и валютой, поэтому одновременные запросы на одну и ту
+            # же цену получат от Stripe один объект Price
+            options=get_stripe_request_options(f"price-{product_id}-{unit_amount}-{currency}"),
         )
         return price.id
     except stripe.error.StripeError as e:
         raise Exception(f"Ошибка при создании цены в Stripe: {e.user_message}")
 
 
-def create_stripe_session(price_id):
+def create_stripe_session(price_id, idempotency_key=None):
     """Создание сессии для получения ссылки на оплату продукта.
     Достаточно в функцию передать только price_id, а остальное можно захардкодить (quantity=1 и т.д.) и потом изменить,
     когда появится у Пользователя возможность выбора количества оплачиваемых продуктов.
 
     :param price_id: ID цены из Stripe (строка).
+    :param idempotency_key: Ключ идемпотентности (например, на основе ID платежа), чтобы повтор не создал
+    вторую сессию.
     :return session.url, session.id: Для дальнейшего процесса формирования оплаты в return хватит session.id
     и session.url.
     1) session.url - нужно отдать клиенту;
     2) session.id - нужно сохранить в модель для последующей проверки статуса (Session.retrieve).
     """
+    import stripe
+
     try:
-        session = stripe.checkout.Session.create(
-            # Только в продакшене (на хостинге с SSL/HTTPS) можно будет указать https://....
-            success_url="http://127.0.0.1:8000/",
-            line_items=[{"price": price_id, "quantity": 1}],
-            mode="payment",
+        session = get_stripe_client().v1.checkout.sessions.create(
+            params={
+                # Только в продакшене (на хостинге с SSL/HTTPS) можно будет указать https://....
+                "success_url": "http://127.0.0.1:8000/",
+                "line_items": [{"price": price_id, "quantity": 1}],
+                "mode": "payment",
+            },
+            options=get_stripe_request_options(idempotency_key),
         )
         return session.id, session.url
     except stripe.error.StripeError as e:
         raise Exception(f"Ошибка при создании сессии в Stripe: {e.user_message}")
 
 
+def get_or_create_stripe_price(paid_product, payment_amount):
+    """Возвращает ID продукта и ID цены в Stripe для (Курс или Урок, сумма, валюта) из локального справочника
+    StripePrice, а в Stripe обращается только если такой пары еще нет:
+        1. Если цена уже есть в справочнике - запросов в Stripe нет совсем.
+        2. Если для продукта уже есть цена с другой суммой - переиспользую его Product и создаю только новый Price.
+        3. Иначе создаю в Stripe и Product, и Price и сохраняю их в справочник.
+    Если два запроса одновременно создали одну и ту же цену, то уникальное ограничение в БД не даст сохранить
+    дубликат, и обе оплаты используют запись, которая была сохранена первой.
+
+    :param paid_product: Экземпляр модели Course или Lesson.
+    :param payment_amount: Цена продукта.
+    :return: Кортеж (product_id, price_id).
+    """
+    product_field = "paid_course" if isinstance(paid_product, Course) else "paid_lesson"
+    unit_amount = convert_to_unit_amount(payment_amount)
+    currency = settings.STRIPE_CURRENCY
+
+    existing_prices = StripePrice.objects.filter(**{product_field: paid_product})
+    stripe_price = existing_prices.filter(unit_amount=unit_amount, currency=currency).first()
+    if stripe_price:
+        return stripe_price.stripe_product_id, stripe_price.stripe_price_id
+
+    product_id = existing_prices.values_list("stripe_product_id", flat=True).first()
+    if not product_id:
+        product_id = create_stripe_product(paid_product)
+    price_id = create_stripe_price(product_id, payment_amount, currency=currency)
+
+    try:
+        # Точка сохранения (savepoint), чтобы ошибка уникальности не сломала внешнюю транзакцию, если она есть
+        with transaction.atomic():
+            stripe_price = StripePrice.objects.create(
+                **{product_field: paid_product},
+                unit_amount=unit_amount,
+                currency=currency,
+                stripe_product_id=product_id,
+                stripe_price_id=price_id,
+            )
+    except IntegrityError:
+        stripe_price = existing_prices.get(unit_amount=unit_amount, currency=currency)
+    return stripe_price.stripe_product_id, stripe_price.stripe_price_id
+
+
+def create_stripe_checkout(paid_product, payment_amount, idempotency_key=None):
+    """Полный цикл создания ссылки на оплату продукта в Stripe: продукт -> цена -> сессия оплаты.
+    Используется и при синхронном создании платежа (в контроллере), и в Celery-задаче task_create_stripe_checkout.
+    Продукт и цена берутся из справочника StripePrice (get_or_create_stripe_price), поэтому для повторных оплат
+    в Stripe уходит только один запрос - создание сессии.
+
+    :param paid_product: Экземпляр модели Course или Lesson.
+    :param payment_amount: Цена продукта.
+    :param idempotency_key: Ключ идемпотентности для создания сессии оплаты.
+    :return: Кортеж (product_id, price_id, session_id, session_url).
+    """
+    product_id, price_id = get_or_create_stripe_price(paid_product, payment_amount)
+    session_id, session_url = create_stripe_session(price_id, idempotency_key=idempotency_key)
+    return product_id, price_id, session_id, session_url
+
+
 def get_stripe_payment_status(session_id):
     """Получение статуса оплаты по session_id из Stripe.
 
     :param session_id: ID сессии оплаты в Stripe.
     :return: Строка со статусом оплаты (например, 'paid', 'unpaid' и т.д.).
     """
+    import stripe
+
     try:
-        session = stripe.checkout.Session.retrieve(session_id)
+        session = get_stripe_client().v1.checkout.sessions.retrieve(session_id)
         return session.payment_status
     except stripe.error.StripeError as e:
         raise Exception(f"Ошибка при проверке статуса в Stripe: {e.user_message}")
+
+
+# Поля платежа для only(), которых достаточно, чтобы посчитать вклад платежа в сводную таблицу выручки
+PAYMENT_REVENUE_ONLY_FIELDS = (
+    "payment_date",
+    "paid_course",
+    "paid_lesson",
+    "payment_method",
+    "payment_amount",
+    "payment_status",
+)
+# Счетчики сводной таблицы выручки (порядок совпадает с порядком значений во вкладе платежа)
+PAYMENT_REVENUE_COUNTERS = ("payments_count", "total_amount", "paid_count", "paid_amount")
+
+
+def get_payment_revenue_values(payment):
+    """Возвращает значения полей платежа, от которых зависит его вклад в сводную таблицу выручки.
+    :param payment: Объект Payments.
+    :return: Словарь {поле: значение} по Payments.REVENUE_FIELDS.
+    """
+    return {field: getattr(payment, field) for field in Payments.REVENUE_FIELDS}
+
+
+def get_payment_revenue_contribution(values):
+    """Вклад одного платежа в сводную таблицу выручки.
+    :param values: Значения полей платежа (см. get_payment_revenue_values) или None (платежа нет).
+    :return: Кортеж (ключ строки (день, ID курса, ID урока, метод платежа), значения счетчиков
+    (количество, сумма, количество оплаченных, сумма оплаченных)) или None.
+    """
+    if not values or values.get("payment_date") is None:
+        return None
+    key = (
+        timezone.localdate(values["payment_date"]),
+        values["paid_course_id"],
+        values["paid_lesson_id"],
+        values["payment_method"],
+    )
+    amount = Decimal(str(values["payment_amount"]))
+    if values["payment_status"] == "paid":
+        return key, (1, amount, 1, amount)
+    return key, (1, amount, 0, Decimal(0))
+
+
+def update_payment_revenue_rollups(changes):
+    """Инкрементально обновляет сводную таблицу выручки PaymentRevenueRollup по изменениям платежей.
+    - Разница "новый вклад - старый вклад" считается в Python и суммируется по строкам сводной таблицы, поэтому
+    на каждую затронутую строку - один UPDATE с F-выражениями (без гонок между воркерами).
+    - Если строки еще нет, то она создается (при гонке с другим воркером - повторный UPDATE).
+
+    :param changes: Итерируемый объект пар (старые значения, новые значения) полей платежа. Для нового платежа
+    старые значения - None, для удаленного платежа новые значения - None.
+    """
+    deltas = defaultdict(lambda: [0, Decimal(0), 0, Decimal(0)])
+    for old_values, new_values in changes:
+        for values, sign in ((old_values, -1), (new_values, 1)):
+            contribution = get_payment_revenue_contribution(values)
+            if contribution:
+                key, counters = contribution
+                for index, value in enumerate(counters):
+                    deltas[key][index] += sign * value
+
+    with transaction.atomic():
+        for (day, paid_course_id, paid_lesson_id, payment_method), delta in deltas.items():
+            if not any(delta):
+                continue
+            lookup = {
+                "day": day,
+                "paid_course_id": paid_course_id,
+                "paid_lesson_id": paid_lesson_id,
+                "payment_method": payment_method,
+            }
+            rollup_id = PaymentRevenueRollup.objects.filter(**lookup).values_list("pk", flat=True).first()
+            if rollup_id is None:
+                try:
+                    with transaction.atomic():
+                        PaymentRevenueRollup.objects.create(**lookup, **dict(zip(PAYMENT_REVENUE_COUNTERS, delta)))
+                    continue
+                except IntegrityError:
+                    rollup_id = PaymentRevenueRollup.objects.filter(**lookup).values_list("pk", flat=True).first()
+            PaymentRevenueRollup.objects.filter(pk=rollup_id).update(
+                **{counter: F(counter) + value for counter, value in zip(PAYMENT_REVENUE_COUNTERS, delta)}
+            )
+
+
+def rebuild_payment_revenue_rollups(batch_size=1000):
+    """Полностью пересчитывает сводную таблицу выручки одним агрегирующим запросом по таблице платежей (например,
+    после первого развертывания или загрузки платежей через bulk_create / loaddata без сигналов).
+    :param batch_size: Размер пачки для bulk_create().
+    :return: Количество строк в сводной таблице.
+    """
+    rows = (
+        Payments.objects.filter(payment_date__isnull=False)
+        .annotate(day=TruncDate("payment_date"))
+        .values("day", "paid_course", "paid_lesson", "payment_method")
+        .annotate(
+            payments_count=Count("pk"),
+            total_amount=Sum("payment_amount"),
+            paid_count=Count("pk", filter=Q(payment_status="paid")),
+            paid_amount=Sum("payment_amount", filter=Q(payment_status="paid")),
+        )
+        .order_by()
+    )
+    rollups = [
+        PaymentRevenueRollup(
+            day=row["day"],
+            paid_course_id=row["paid_course"],
+            paid_lesson_id=row["paid_lesson"],
+            payment_method=row["payment_method"],
+            payments_count=row["payments_count"],
+            total_amount=Decimal(str(row["total_amount"])),
+            paid_count=row["paid_count"],
+            paid_amount=Decimal(str(row["paid_amount"] or 0)),
+        )
+        for row in rows
+    ]
+    with transaction.atomic():
+        PaymentRevenueRollup.objects.all().delete()
+        PaymentRevenueRollup.objects.bulk_create(rollups, batch_size=batch_size)
+    return len(rollups)
+
+
+def construct_stripe_webhook_event(payload, signature):
+    """Проверка подписи webhook-запроса от Stripe и разбор события.
+    Stripe подписывает тело запроса секретом STRIPE_WEBHOOK_SECRET (заголовок Stripe-Signature), поэтому без
+    проверки подписи кто угодно мог бы отправить на наш эндпоинт "оплату".
+
+    :param payload: Тело запроса (bytes) - строго в исходном виде, без разбора JSON.
+    :param signature: Значение заголовка Stripe-Signature.
+    :return: Объект stripe.Event.
+    :raise ValueError: Если тело не является корректным JSON или подпись неверна.
+    """
+    import stripe
+
+    try:
+        return stripe.Webhook.construct_event(payload, signature, settings.STRIPE_WEBHOOK_SECRET)
+    except stripe.error.SignatureVerificationError as e:
+        raise ValueError(f"Неверная подпись webhook-запроса Stripe: {e}")
+
+
+def apply_stripe_webhook_event(event):
+    """Применяет webhook-событие Stripe к платежам: для событий checkout.session.* записывает в
+    Payments.payment_status статус оплаты из сессии (поиск по индексированному полю stripe_session_id).
+    - Событие с уже обработанным ID пропускается (уникальный StripeWebhookEvent.event_id). Запись события
+    и обновление платежа выполняются в одной транзакции, поэтому событие не будет "потеряно" при ошибке.
+    - Статус "paid" не перезаписывается другим статусом, если события пришли не по порядку.
+
+    :param event: Объект события Stripe (stripe.Event или словарь того же формата).
+    :return: True, если событие обработано, и False, если это повтор уже обработанного события.
+    """
+    try:
+        with transaction.atomic():
+            StripeWebhookEvent.objects.create(event_id=event["id"], event_type=event["type"])
+
+            if event["type"].startswith("checkout.session."):
+                session = event["data"]["object"]
+                payments = Payments.objects.filter(stripe_session_id=session["id"]).exclude(
+                    payment_status=session["payment_status"]
+                )
+                if session["payment_status"] != "paid":
+                    payments = payments.exclude(payment_status="paid")
+                # Старые значения нужны для сводной таблицы выручки (update() не вызывает сигналы)
+                changed = list(payments.select_for_update().only(*PAYMENT_REVENUE_ONLY_FIELDS))
+                Payments.objects.filter(pk__in=[payment.pk for payment in changed]).update(
+                    payment_status=session["payment_status"]
+                )
+                update_payment_revenue_rollups(
+                    (payment._loaded_values, {**payment._loaded_values, "payment_status": session["payment_status"]})
+                    for payment in changed
+                )
+    except IntegrityError:
+        return False
+    return True
+
+
+def list_stripe_checkout_sessions(created_gte, starting_after=None, limit=None):
+    """Получение одной страницы списка сессий оплаты из Stripe (от новых к старым).
+
+    :param created_gte: Unix-время: вернуть только сессии, созданные начиная с этого момента.
+    :param starting_after: ID последней сессии предыдущей страницы (курсор для следующей страницы).
+    :param limit: Размер страницы (по умолчанию STRIPE_RECONCILE_PAGE_SIZE).
+    :return: Объект списка Stripe (поля data и has_more).
+    """
+    params = {"created": {"gte": created_gte}, "limit": limit or settings.STRIPE_RECONCILE_PAGE_SIZE}
+    if starting_after:
+        params["starting_after"] = starting_after
+    import stripe
+
+    try:
+        return get_stripe_client().v1.checkout.sessions.list(params=params)
+    except stripe.error.StripeError as e:
+        raise Exception(f"Ошибка при получении списка сессий оплаты в Stripe: {e.user_message}")
+
+
+def reconcile_stripe_payments(limit=None):
+    """Сверка статусов платежей со Stripe пачками: проходит по страницам списка сессий оплаты, созданных с момента
+    контрольной точки (StripeSyncCheckpoint), и обновляет Payments.payment_status у платежей, статус которых
+    изменился (например, webhook-событие не дошло, а клиент больше не проверял статус).
+    - На каждую страницу сессий - один SQL-запрос с IN по stripe_session_id (без оплаченных платежей: статус "paid"
+    не перезаписывается другим статусом, как и в apply_stripe_webhook_event). Статус сравнивается до записи, и
+    bulk_update() сохраняет только платежи с изменившимся статусом.
+    - При первом запуске сверка начинается с даты самого старого неоплаченного платежа (с перекрытием ниже).
+    - Новая контрольная точка - время запуска минус STRIPE_RECONCILE_OVERLAP_MINUTES: небольшое перекрытие с
+    прошлым проходом на расхождение часов с Stripe и сессии, созданные во время прохода. Поздние изменения статуса
+    уже просмотренных сессий приходят webhook-событиями checkout.session.*, поэтому каждая сверка не просматривает
+    заново сессии за сутки. Точка сохраняется только после успешного прохода всех страниц.
+
+    :param limit: Размер страницы (по умолчанию STRIPE_RECONCILE_PAGE_SIZE).
+    :return: Количество платежей с обновленным статусом.
+    """
+    started_at = timezone.now()
+    checkpoint = StripeSyncCheckpoint.objects.filter(name=STRIPE_RECONCILE_CHECKPOINT).first()
+    overlap = timedelta(minutes=settings.STRIPE_RECONCILE_OVERLAP_MINUTES)
+    if checkpoint:
+        created_gte = checkpoint.created_gte
+    else:
+        # Сессия создается в Stripe раньше, чем сохраняется платеж, поэтому беру перекрытие и тут
+        oldest = (
+            Payments.objects.filter(stripe_session_id__isnull=False)
+            .exclude(payment_status="paid")
+            .aggregate(oldest=Min("payment_date"))["oldest"]
+        )
+        created_gte = min(oldest or started_at, started_at) - overlap
+
+    updated = 0
+    starting_after = None
+    while True:
+        page = list_stripe_checkout_sessions(int(created_gte.timestamp()), starting_after, limit)
+        statuses = {session.id: session.payment_status for session in page.data}
+
+        changed = []
+        payments = (
+            Payments.objects.filter(stripe_session_id__in=statuses)
+            .exclude(payment_status="paid")
+            .only("stripe_session_id", *PAYMENT_REVENUE_ONLY_FIELDS)
+        )
+        for payment in payments:
+            new_status = statuses[payment.stripe_session_id]
+            if payment.payment_status != new_status:
+                payment.payment_status = new_status
+                changed.append(payment)
+        if changed:
+            with transaction.atomic():
+                Payments.objects.bulk_update(changed, ["payment_status"])
+                # bulk_update() не вызывает сигналы, поэтому сводную таблицу выручки обновляю явно
+                update_payment_revenue_rollups(
+                    (payment._loaded_values, get_payment_revenue_values(payment)) for payment in changed
+                )
+            updated += len(changed)
+
+        if not page.has_more or not page.data:
+            break
+        starting_after = page.data[-1].id
+
+    StripeSyncCheckpoint.objects.update_or_create(
+        name=STRIPE_RECONCILE_CHECKPOINT,
+        defaults={"created_gte": started_at - overlap},
+    )
+    return updated
+
+
+# Поля CustomUser, которые можно передать в CSV-файле для массового импорта пользователей (первая строка - заголовок).
+USER_IMPORT_FIELDS = ("email", "password", "first_name", "last_name", "phone_number", "city")
+
+
+def hash_passwords(passwords, workers=None):
+    """Хэширование списка паролей в пуле процессов.
+    Хэширование пароля (PBKDF2) - это чисто вычислительная (CPU-bound) операция, поэтому потоки из-за GIL не помогут,
+    а процессы загружают все ядра сервера. Для маленьких списков (меньше USER_IMPORT_POOL_THRESHOLD) пул не создается,
+    так как запуск процессов стоит дороже, чем само хэширование.
+    - initializer=django.setup нужен, чтобы в дочерних процессах были загружены настройки Django (PASSWORD_HASHERS):
+    процесс, запущенный способом spawn, ничего не наследует от родителя, кроме переменных окружения.
+    - chunksize отправляет пароли в процессы пачками, чтобы не гонять каждый пароль отдельным сообщением
+    (примерно 4 пачки на процесс).
+    - дочерние процессы запускаются способом spawn (новый интерпретатор), а не fork-ом: импорт выполняется в воркере
+    Celery, и fork процесса с потоками и открытыми соединениями с БД / пулами psycopg 3 небезопасен. Сами процессы
+    в БД не обращаются.
+    :param passwords: Список паролей в открытом виде.
+    :param workers: Количество процессов (по умолчанию USER_IMPORT_HASH_WORKERS или количество CPU, доступных
+    контейнеру - config.cpu.get_cpu_count()).
+    :return: Список хэшей паролей в том же порядке.
+    """
+    if len(passwords) < settings.USER_IMPORT_POOL_THRESHOLD:
+        return [make_password(password) for password in passwords]
+
+    workers = workers or settings.USER_IMPORT_HASH_WORKERS or get_cpu_count()
+    chunksize = max(1, len(passwords) // (workers * 4))
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=django.setup,
+    ) as executor:
+        return list(executor.map(make_password, passwords, chunksize=chunksize))
+
+
+def validate_user_import_rows(rows):
+    """Валидация строк CSV-файла перед массовым импортом пользователей (без хэширования и без записи в БД).
+    - email нормализуется так же, как в CustomUserManager.create_user() и проверяется стандартным валидатором Django;
+    - дубликаты email внутри файла пропускаются;
+    - уже существующие в БД email отсекаются одним SQL-запросом (IN) на всю пачку, чтобы не тратить время
+    на хэширование паролей для пользователей, которые все равно не будут созданы;
+    - телефон (если указан) проверяется библиотекой phonenumbers.
+    :param rows: Список словарей (строки CSV-файла).
+    :return: Кортеж (список валидных строк, список ошибок вида {"line": ..., "email": ..., "error": ...}).
+    """
+    valid_rows = []
+    errors = []
+    seen_emails = set()
+
+    # Нумерация строк с 2, так как первая строка CSV-файла - это заголовок
+    for line, row in enumerate(rows, start=2):
+        email = CustomUser.objects.normalize_email((row.get("email") or "").strip())
+        try:
+            validate_email(email)
+        except ValidationError:
+            errors.append({"line": line, "email": email, "error": "Некорректный email."})
+            continue
+        if email in seen_emails:
+            errors.append({"line": line, "email": email, "error": "Email повторяется в файле."})
+            continue
+        phone_number = (row.get("phone_number") or "").strip()
+        if phone_number and not to_phone_number(phone_number).is_valid():
+            errors.append({"line": line, "email": email, "error": "Некорректный телефон."})
+            continue
+        seen_emails.add(email)
+        valid_row = {field: (row.get(field) or "").strip() for field in USER_IMPORT_FIELDS}
+        valid_row.update(email=email, line=line)
+        valid_rows.append(valid_row)
+
+    existing_emails = set(
+        CustomUser.objects.filter(email__in=seen_emails).values_list("email", flat=True)
+    )
+    for row in valid_rows:
+        if row["email"] in existing_emails:
+            errors.append({"line": row["line"], "email": row["email"], "error": "Пользователь уже существует."})
+
+    return [row for row in valid_rows if row["email"] not in existing_emails], errors
+
+
+def import_users_from_csv(csv_file, workers=None):
+    """Массовый импорт пользователей (например, корпоративной группы студентов) из CSV-файла.
+    Шаги:
+        1. Читает CSV-файл (заголовок: email, password, first_name, last_name, phone_number, city).
+        2. Валидирует строки пачкой (validate_user_import_rows).
+        3. Хэширует пароли в пуле процессов (hash_passwords). Если пароль не указан, то пользователю ставится
+        "непригодный" пароль (как set_unusable_password()) - он сможет задать пароль позже, а импорт не тратит время
+        на хэширование.
+        4. Записывает пользователей в БД через bulk_create(ignore_conflicts=True) пачками по USER_IMPORT_BATCH_SIZE.
+        ignore_conflicts=True защищает от ошибки, если такой email успели зарегистрировать во время импорта.
+        5. Проверяет, какие пользователи действительно созданы: bulk_create(ignore_conflicts=True) не сообщает, какие
+        строки пропущены, поэтому пользователи с импортированными email читаются из БД и сравниваются по хэшу
+        пароля (у каждого хэша своя соль, "непригодный" пароль тоже случайный). Email, зарегистрированные во время
+        импорта, попадают в пропущенные.
+    Важно: bulk_create() не вызывает save() и сигналы post_save (для новых пользователей это не нужно).
+    :param csv_file: Файловый объект CSV (текстовый или бинарный в UTF-8).
+    :param workers: Количество процессов для хэширования паролей.
+    :return: Отчет - словарь {"created": ..., "skipped": ..., "errors": [...]}.
+    """
+    content = csv_file.read()
+    if isinstance(content, bytes):
+        # utf-8-sig убирает BOM, который добавляет Excel при сохранении в CSV
+        content = content.decode("utf-8-sig")
+    rows = list(csv.DictReader(io.StringIO(content)))
+
+    valid_rows, errors = validate_user_import_rows(rows)
+
+    rows_with_password = [row for row in valid_rows if row["password"]]
+    hashed_passwords = hash_passwords([row["password"] for row in rows_with_password], workers=workers)
+    for row, hashed_password in zip(rows_with_password, hashed_passwords):
+        row["password"] = hashed_password
+
+    users = [
+        CustomUser(
+            email=row["email"],
+            # make_password(None) возвращает "непригодный" пароль без хэширования
+            password=row["password"] or make_password(None),
+            first_name=row["first_name"],
+            last_name=row["last_name"],
+            phone_number=row["phone_number"] or None,
+            city=row["city"] or None,
+        )
+        for row in valid_rows
+    ]
+    CustomUser.objects.bulk_create(users, batch_size=settings.USER_IMPORT_BATCH_SIZE, ignore_conflicts=True)
+
+    created = 0
+    batch_size = settings.USER_IMPORT_BATCH_SIZE
+    for start in range(0, len(users), batch_size):
+        batch = users[start:start + batch_size]
+        passwords = dict(
+            CustomUser.objects.filter(email__in=[user.email for user in batch]).values_list("email", "password")
+        )
+        for user, row in zip(batch, valid_rows[start:start + batch_size]):
+            if passwords.get(user.email) == user.password:
+                created += 1
+            else:
+                error = "Пользователь зарегистрирован во время импорта."
+                errors.append({"line": row["line"], "email": user.email, "error": error})
+
+    return {
+        "created": created,
+        "skipped": len(errors),
+        "errors": errors,
+    }
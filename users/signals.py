@@ -0,0 +1,88 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from users.authentication import invalidate_user_snapshots
+from users.models import CustomUser, Payments
+from users.services import PAYMENT_REVENUE_ONLY_FIELDS, get_payment_revenue_values, update_payment_revenue_rollups
+from users.tasks import task_generate_thumbnails
+from users.thumbnails import thumbnails_outdated
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def invalidate_user_snapshot_on_change(sender, instance, **kwargs):
+    """Сигнал для удаления из кэша снимка пользователя (см. users/authentication.py), если объект CustomUser был
+    сохранен (например, изменился is_active / is_staff) или удален. Так CachedJWTAuthentication при следующем запросе
+    загрузит актуальные данные из БД, а не будет ждать окончания TTL снимка.
+    :param sender: Модель, которая отправила сигнал.
+    :param instance: Конкретный объект CustomUser, который был сохранён / удален.
+    :param kwargs: Дополнительные параметры, которые Django передаёт в сигнал.
+    """
+    invalidate_user_snapshots([instance.pk])
+
+
+@receiver(post_save, sender=CustomUser)
+def generate_avatar_thumbnails(sender, instance, update_fields, **kwargs):
+    """Сигнал для создания уменьшенных копий аватара (users.tasks.task_generate_thumbnails) после загрузки, замены
+    или удаления аватара. Задача ставится в очередь после фиксации транзакции, чтобы воркер Celery увидел новый файл.
+    Сохранения без аватара в update_fields (например, last_login при входе) пропускаются.
+    :param sender: Модель, которая отправила сигнал.
+    :param instance: Конкретный объект CustomUser, который был сохранён.
+    :param update_fields: Список полей, переданных в save(update_fields=...), или None.
+    :param kwargs: Дополнительные параметры, которые Django передаёт в сигнал.
+    """
+    if update_fields is not None and "avatar" not in update_fields:
+        return
+    if thumbnails_outdated(instance, "avatar"):
+        transaction.on_commit(partial(task_generate_thumbnails.delay, sender._meta.label, instance.pk, "avatar"))
+
+
+@receiver(m2m_changed, sender=CustomUser.groups.through)
+def invalidate_user_snapshot_on_groups_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """Сигнал для удаления из кэша снимка пользователя при изменении его групп (в снимке хранится флаг is_moderator).
+    - reverse=False - группы меняются со стороны пользователя (user.groups.add(...)), instance - это пользователь.
+    - reverse=True - пользователи меняются со стороны группы (group.user_set.add(...)), pk_set - это ID пользователей.
+    Для group.user_set.clear() Django не передает pk_set, поэтому список пользователей группы собираю до очистки
+    (pre_clear).
+    """
+    if not reverse and action in ("post_add", "post_remove", "post_clear"):
+        invalidate_user_snapshots([instance.pk])
+    elif reverse and action in ("post_add", "post_remove"):
+        invalidate_user_snapshots(pk_set)
+    elif reverse and action == "pre_clear":
+        invalidate_user_snapshots(instance.user_set.values_list("pk", flat=True))
+
+
+@receiver(post_save, sender=Payments)
+def update_revenue_rollup_on_payment_save(sender, instance, created, update_fields, **kwargs):
+    """Сигнал для инкрементального обновления сводной таблицы выручки (PaymentRevenueRollup) при создании платежа
+    и при изменении его статуса / суммы / продукта / метода.
+    - Старые значения полей берутся из instance._loaded_values (запоминаются в Payments.from_db()).
+    - Если сохраняются только поля, не влияющие на выручку (например, ссылка на оплату), то сигнал ничего не делает.
+    :param sender: Модель, которая отправила сигнал.
+    :param instance: Конкретный объект Payments, который был сохранён.
+    :param created: True, если объект был создан.
+    :param update_fields: Список полей, переданных в save(update_fields=...), или None.
+    :param kwargs: Дополнительные параметры, которые Django передаёт в сигнал.
+    """
+    if update_fields is not None and not set(update_fields) & set(PAYMENT_REVENUE_ONLY_FIELDS):
+        return
+
+    new_values = get_payment_revenue_values(instance)
+    old_values = None if created else {**new_values, **getattr(instance, "_loaded_values", {})}
+    update_payment_revenue_rollups([(old_values, new_values)])
+    # Следующее сохранение этого же объекта считает разницу уже от текущих значений
+    instance._loaded_values = {**getattr(instance, "_loaded_values", {}), **new_values}
+
+
+@receiver(post_delete, sender=Payments)
+def update_revenue_rollup_on_payment_delete(sender, instance, **kwargs):
+    """Сигнал для вычитания удаленного платежа из сводной таблицы выручки (PaymentRevenueRollup).
+    :param sender: Модель, которая отправила сигнал.
+    :param instance: Конкретный объект Payments, который был удален.
+    :param kwargs: Дополнительные параметры, которые Django передаёт в сигнал.
+    """
+    update_payment_revenue_rollups([(get_payment_revenue_values(instance), None)])
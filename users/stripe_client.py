@@ -0,0 +1,80 @@
+import os
+from functools import cache
+
+from django.conf import settings
+
+# Клиент Stripe создается один раз на процесс. ID процесса запоминается, чтобы после fork (gunicorn с preload_app,
+# prefork-воркеры Celery) дочерний процесс создал свой клиент, а не использовал сокеты родительского процесса.
+_stripe_client = None
+_stripe_client_pid = None
+
+
+def build_requests_session():
+    """Создает HTTP-сессию requests с пулом keep-alive соединений к Stripe. Повторные запросы идут через уже
+    открытое TCP+TLS соединение, без нового рукопожатия на каждый вызов API.
+    Повторы на уровне requests (max_retries) отключены - повторами с ключами идемпотентности управляет сам
+    клиент Stripe (max_network_retries).
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.STRIPE_POOL_MAXSIZE, max_retries=0)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+@cache
+def get_pooled_requests_client_class():
+    """Класс HTTP-клиента для библиотеки Stripe на основе RequestsClient, у которого в каждом потоке своя
+    HTTP-сессия с настроенным пулом соединений (build_requests_session). Сессия requests не гарантирует
+    потокобезопасность, поэтому одну сессию на все потоки (например, при gunicorn --threads) не использую.
+    Класс создается при первом вызове: импорт библиотеки stripe занимает около секунды (сотни модулей API), и
+    процессы, которые не обращаются к Stripe (большинство задач Celery, команды manage.py), его не выполняют.
+    """
+    import stripe
+
+    class PooledRequestsClient(stripe.RequestsClient):
+        def request(self, method, url, headers, post_data=None):
+            if getattr(self._thread_local, "session", None) is None:
+                self._thread_local.session = build_requests_session()
+            return super().request(method, url, headers, post_data)
+
+    return PooledRequestsClient
+
+
+def get_stripe_client():
+    """Возвращает клиент Stripe для текущего процесса (создает его при первом вызове).
+    Настройки (settings.py):
+        - SECRET_KEY_FOR_STRIPE - секретный ключ;
+        - STRIPE_CONNECT_TIMEOUT / STRIPE_READ_TIMEOUT - таймауты соединения и чтения ответа (по умолчанию
+        библиотека Stripe ждет ответ до 80 секунд и занимает все это время воркер gunicorn);
+        - STRIPE_MAX_NETWORK_RETRIES - количество повторов при сетевых ошибках / 409 / 5xx. Для POST-запросов
+        библиотека сама добавляет заголовок Idempotency-Key, поэтому повтор не создаст дубликат объекта;
+        - STRIPE_API_BASE - адрес API (например, локальная заглушка users/stripe_stub.py для тестов и бенчмарков).
+    :return: Объект stripe.StripeClient.
+    """
+    global _stripe_client, _stripe_client_pid
+
+    if _stripe_client is None or _stripe_client_pid != os.getpid():
+        import stripe
+
+        http_client = get_pooled_requests_client_class()(
+            timeout=(settings.STRIPE_CONNECT_TIMEOUT, settings.STRIPE_READ_TIMEOUT),
+        )
+        _stripe_client = stripe.StripeClient(
+            settings.SECRET_KEY_FOR_STRIPE or "",
+            http_client=http_client,
+            max_network_retries=settings.STRIPE_MAX_NETWORK_RETRIES,
+            base_addresses={"api": settings.STRIPE_API_BASE} if settings.STRIPE_API_BASE else {},
+        )
+        _stripe_client_pid = os.getpid()
+    return _stripe_client
+
+
+def reset_stripe_client():
+    """Сбрасывает клиент Stripe (например, в тестах после изменения STRIPE_API_BASE)."""
+    global _stripe_client, _stripe_client_pid
+    _stripe_client = None
+    _stripe_client_pid = None
@@ -0,0 +1,177 @@
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlparse
+
+
+class StripeStubState:
+    """Хранилище объектов локальной заглушки Stripe (в памяти процесса) и счетчик запросов по эндпоинтам."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+        self.objects = {}
+        self.idempotent_responses = {}
+        self.requests_count = {}
+
+    def next_id(self, prefix):
+        """Генерирует ID объекта в формате Stripe (например, prod_stub_1)."""
+        return f"{prefix}_stub_{next(self.ids)}"
+
+
+class StripeStubHandler(BaseHTTPRequestHandler):
+    """Обработчик HTTP-запросов локальной заглушки Stripe API. Реализует только те эндпоинты, которые использует
+    проект (users/services.py):
+        - POST /v1/products - создание продукта;
+        - POST /v1/prices - создание цены;
+        - POST /v1/checkout/sessions - создание сессии оплаты;
+        - GET /v1/checkout/sessions/<id> - получение сессии оплаты;
+        - GET /v1/checkout/sessions - список сессий оплаты (параметры created[gte], limit, starting_after).
+    Поддерживает заголовок Idempotency-Key: повторный запрос с тем же ключом возвращает тот же ответ."""
+
+    # HTTP/1.1 нужен для keep-alive соединений (как у настоящего Stripe), иначе пул соединений клиента не проверить
+    protocol_version = "HTTP/1.1"
+    server_version = "StripeStub/1.0"
+
+    def log_message(self, format, *args):
+        """Отключаю вывод каждого запроса в консоль (мешает при нагрузочном тестировании)."""
+
+    @property
+    def state(self):
+        return self.server.state
+
+    def send_json(self, status, payload):
+        """Отправляет JSON-ответ клиенту."""
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_not_found(self):
+        """Ответ в формате ошибки Stripe для неизвестного объекта / эндпоинта."""
+        self.send_json(
+            404,
+            {"error": {"type": "invalid_request_error", "message": f"Unrecognized request URL ({self.path})"}},
+        )
+
+    def count_request(self, endpoint):
+        """Считает запрос к эндпоинту и имитирует сетевую задержку Stripe (атрибут сервера latency, в секундах)."""
+        with self.state.lock:
+            self.state.requests_count[endpoint] = self.state.requests_count.get(endpoint, 0) + 1
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+    def do_GET(self):
+        """Получение сессии оплаты по ID или списка сессий оплаты."""
+        url = urlparse(self.path)
+        path = url.path
+        if path == "/v1/checkout/sessions":
+            self.count_request("GET /v1/checkout/sessions")
+            return self.send_json(200, self.build_session_list(dict(parse_qsl(url.query))))
+        if path.startswith("/v1/checkout/sessions/"):
+            self.count_request("GET /v1/checkout/sessions/<id>")
+            session = self.state.objects.get(path.rsplit("/", 1)[-1])
+            if session:
+                return self.send_json(200, session)
+        return self.send_not_found()
+
+    def do_POST(self):
+        """Создание продукта, цены или сессии оплаты (тело запроса - application/x-www-form-urlencoded)."""
+        length = int(self.headers.get("Content-Length") or 0)
+        params = dict(parse_qsl(self.rfile.read(length).decode("utf-8")))
+        path = urlparse(self.path).path
+
+        builders = {
+            "/v1/products": self.build_product,
+            "/v1/prices": self.build_price,
+            "/v1/checkout/sessions": self.build_session,
+        }
+        if path not in builders:
+            return self.send_not_found()
+        self.count_request(f"POST {path}")
+
+        idempotency_key = self.headers.get("Idempotency-Key")
+        with self.state.lock:
+            if idempotency_key and idempotency_key in self.state.idempotent_responses:
+                payload = self.state.idempotent_responses[idempotency_key]
+            else:
+                payload = builders[path](params)
+                self.state.objects[payload["id"]] = payload
+                if idempotency_key:
+                    self.state.idempotent_responses[idempotency_key] = payload
+        return self.send_json(200, payload)
+
+    def build_session_list(self, params):
+        """Страница списка сессий оплаты в формате Stripe: от новых к старым, курсор starting_after - ID последней
+        сессии предыдущей страницы."""
+        created_gte = int(params.get("created[gte]") or 0)
+        limit = int(params.get("limit") or 10)
+        with self.state.lock:
+            sessions = [
+                session
+                for session in self.state.objects.values()
+                if session["object"] == "checkout.session" and session["created"] >= created_gte
+            ]
+        # ID заглушки содержат порядковый номер, поэтому по нему можно отсортировать сессии "от новых к старым"
+        sessions.sort(key=lambda session: (session["created"], int(session["id"].rsplit("_", 1)[-1])), reverse=True)
+        if params.get("starting_after"):
+            ids = [session["id"] for session in sessions]
+            sessions = sessions[ids.index(params["starting_after"]) + 1:]
+        return {
+            "object": "list",
+            "url": "/v1/checkout/sessions",
+            "has_more": len(sessions) > limit,
+            "data": sessions[:limit],
+        }
+
+    def build_product(self, params):
+        return {
+            "id": self.state.next_id("prod"),
+            "object": "product",
+            "name": params.get("name"),
+            "active": True,
+            "created": int(time.time()),
+        }
+
+    def build_price(self, params):
+        return {
+            "id": self.state.next_id("price"),
+            "object": "price",
+            "product": params.get("product"),
+            "currency": (params.get("currency") or "").lower(),
+            "unit_amount": int(params.get("unit_amount") or 0),
+            "active": True,
+            "created": int(time.time()),
+        }
+
+    def build_session(self, params):
+        session_id = self.state.next_id("cs_test")
+        return {
+            "id": session_id,
+            "object": "checkout.session",
+            "mode": params.get("mode"),
+            "status": "open",
+            "payment_status": "unpaid",
+            "success_url": params.get("success_url"),
+            "url": f"https://checkout.stripe.com/c/pay/{session_id}",
+            "created": int(time.time()),
+        }
+
+
+def create_stripe_stub_server(host="127.0.0.1", port=12111, latency=0):
+    """Создает (но не запускает) HTTP-сервер локальной заглушки Stripe API.
+    Для использования в проекте нужно указать STRIPE_API_BASE=http://<host>:<port> (см. users/stripe_client.py).
+    :param host: Адрес, на котором слушает сервер.
+    :param port: Порт (0 - выбрать свободный порт автоматически, удобно для тестов).
+    :param latency: Задержка ответа на каждый запрос в секундах (имитация сети до настоящего Stripe в бенчмарках).
+    :return: Объект ThreadingHTTPServer с атрибутом state (объекты и счетчики запросов).
+    """
+    server = ThreadingHTTPServer((host, port), StripeStubHandler)
+    server.daemon_threads = True
+    server.state = StripeStubState()
+    server.latency = latency
+    return server
@@ -0,0 +1,456 @@
+import io
+import json
+import math
+import random
+from array import array
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from itertools import accumulate, islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Max
+
+from lms_system.models import Course, Lesson, Subscription
+from users.models import CustomUser, Payments
+from users.partitions import add_months, create_payments_partition, get_payments_partitions, is_payments_partitioned
+from users.services import rebuild_payment_revenue_rollups
+
+# Генератор синтетических данных для нагрузочного тестирования (команда generate_load_data).
+# Данные похожи на настоящие по распределениям, а не по содержимому:
+# - аудитория растет: пользователей, курсов и платежей за последние месяцы больше, чем в начале периода;
+# - ID возрастают вместе с датой создания (как при обычной работе приложения), платежи пользователя - после его
+# регистрации, поэтому пагинация по дате и секции платежей по месяцам заполняются как в продакшене;
+# - популярность курсов - распределение Ципфа (несколько хитов и длинный хвост), активность пользователей и
+# количество уроков в курсе - логнормальные;
+# - один и тот же seed и end_date дают одни и те же данные (у каждой таблицы свой генератор случайных чисел).
+
+CITIES = (
+    ("Москва", 30),
+    ("Санкт-Петербург", 14),
+    ("Новосибирск", 4),
+    ("Екатеринбург", 4),
+    ("Казань", 3.5),
+    ("Нижний Новгород", 3),
+    ("Челябинск", 3),
+    ("Самара", 3),
+    ("Ростов-на-Дону", 3),
+    ("Уфа", 3),
+    ("Краснодар", 3),
+    ("Пермь", 2.5),
+    ("Воронеж", 2.5),
+    ("Красноярск", 2.5),
+    ("Минск", 2),
+    ("Алматы", 2),
+)
+MALE_NAMES = ("Александр", "Дмитрий", "Максим", "Сергей", "Андрей", "Алексей", "Иван", "Михаил")
+FEMALE_NAMES = ("Анна", "Мария", "Елена", "Ольга", "Наталья", "Екатерина", "Татьяна", "Дарья")
+# Фамилии в мужской форме, женская форма - с окончанием "а"
+LAST_NAMES = (
+    "Иванов", "Смирнов", "Кузнецов", "Попов", "Васильев", "Петров", "Соколов", "Михайлов", "Новиков", "Федоров",
+    "Морозов", "Волков", "Алексеев", "Лебедев", "Семенов", "Егоров",
+)
+TOPICS = (
+    "Python", "Django", "Django REST Framework", "PostgreSQL", "Docker", "Celery", "Redis", "Git", "Linux",
+    "Алгоритмы", "SQL", "Асинхронный Python", "Тестирование", "DevOps", "Машинное обучение", "Анализ данных",
+)
+LEVELS = ("для начинающих", "основы", "практикум", "продвинутый уровень", "интенсив", "с нуля до junior")
+
+# Доля платежей переводом (Stripe) и распределение статусов оплаты переводом
+TRANSFER_SHARE = 0.85
+TRANSFER_STATUSES = (("paid", 85), ("unpaid", 12), (Payments.CHECKOUT_FAILED, 3))
+# Доля платежей за курс (остальные - за отдельный урок)
+COURSE_PAYMENT_SHARE = 0.6
+
+
+def sorted_fractions(rng, count):
+    """Возрастающая последовательность count случайных чисел из [0, 1) - то же, что отсортированная равномерная
+    выборка, но по одному числу за раз без хранения выборки в памяти (порядковые статистики от максимума:
+    максимум из n равномерных чисел - U ** (1 / n))."""
+    high = 1.0
+    for remaining in range(count, 0, -1):
+        high *= rng.random() ** (1 / remaining)
+        yield 1 - high
+
+
+def allocate(total, weights, limit=None):
+    """Распределяет total между элементами пропорционально весам: целые количества, в сумме ровно total.
+    :param limit: Максимум на элемент - излишек достается элементам с наибольшим весом, у которых есть место.
+    """
+    weight_sum = sum(weights)
+    counts = []
+    cumulative = 0.0
+    previous = 0
+    for index, weight in enumerate(weights):
+        cumulative += weight
+        current = total if index == len(weights) - 1 else round(total * cumulative / weight_sum)
+        counts.append(current - previous)
+        previous = current
+
+    if limit is not None:
+        overflow = sum(max(0, count - limit) for count in counts)
+        counts = [min(count, limit) for count in counts]
+        for index in sorted(range(len(counts)), key=weights.__getitem__, reverse=True):
+            if not overflow:
+                break
+            added = min(limit - counts[index], overflow)
+            counts[index] += added
+            overflow -= added
+    return counts
+
+
+def weighted_index(rng, cum_weights, size=None):
+    """Случайный индекс с вероятностью по весам (cum_weights - накопленные веса) среди первых size элементов."""
+    size = len(cum_weights) if size is None else size
+    return bisect_right(cum_weights, rng.random() * cum_weights[size - 1], 0, size - 1)
+
+
+def to_copy_value(value):
+    """Значение поля в текстовом формате COPY PostgreSQL."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    elif isinstance(value, dict):
+        value = json.dumps(value, ensure_ascii=False)
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+@contextmanager
+def explicit_timestamps(model):
+    """Отключает auto_now / auto_now_add у полей модели на время bulk_create(): иначе Django заменит
+    сгенерированные даты текущим временем."""
+    fields = [field for field in model._meta.concrete_fields if getattr(field, "auto_now_add", False)
+              or getattr(field, "auto_now", False)]
+    flags = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in flags:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class SyntheticDataGenerator:
+    """Генерирует пользователей, курсы, уроки, подписки и платежи (в этом порядке - следующие таблицы ссылаются на
+    предыдущие) и записывает их пачками: в PostgreSQL - через COPY (в разы быстрее INSERT), в остальных БД - через
+    bulk_create(). Новые строки добавляются к существующим (ID продолжают текущие), сигналы post_save не
+    отправляются (уменьшенные копии, сводная таблица выручки) - сводная таблица пересчитывается в конце.
+    """
+
+    def __init__(self, seed=0, end_date=None, days=730, batch_size=10000, password="password123", use_copy=None,
+                 log=None):
+        """
+        :param seed: Seed генераторов случайных чисел.
+        :param end_date: Последний день периода данных (по умолчанию сегодня, UTC).
+        :param days: Длина периода данных в днях.
+        :param batch_size: Размер пачки для COPY / bulk_create.
+        :param password: Пароль всех пользователей (хэшируется один раз).
+        :param use_copy: Запись через COPY (по умолчанию - если БД PostgreSQL).
+        :param log: Функция для вывода прогресса (например, self.stdout.write команды).
+        """
+        self.seed = seed
+        end_date = end_date or datetime.now(dt_timezone.utc).date()
+        self.end = datetime.combine(end_date + timedelta(days=1), time.min, tzinfo=dt_timezone.utc)
+        self.start = self.end - timedelta(days=days)
+        self.span = (self.end - self.start).total_seconds()
+        self.batch_size = batch_size
+        self.password = password
+        self.use_copy = self.supports_copy() if use_copy is None else use_copy
+        self.log = log or (lambda message: None)
+
+    @staticmethod
+    def supports_copy():
+        return connection.vendor == "postgresql"
+
+    def get_rng(self, table):
+        """Отдельный генератор случайных чисел для каждой таблицы: изменение объема одной таблицы не меняет
+        данные остальных."""
+        return random.Random(f"{self.seed}:{table}")
+
+    def get_datetime(self, fraction):
+        """Дата внутри периода по доле периода (0 - начало, 1 - конец)."""
+        return self.start + timedelta(seconds=fraction * self.span)
+
+    @staticmethod
+    def next_id(model):
+        return (model.objects.aggregate(max_id=Max("pk"))["max_id"] or 0) + 1
+
+    def generate(self, users, courses, lessons, subscriptions, payments):
+        """Генерирует данные и возвращает словарь {таблица: количество созданных строк} (и количество строк
+        пересчитанной сводной таблицы выручки - revenue_rollups, если созданы платежи)."""
+        if (courses or subscriptions or payments) and not users:
+            raise ValueError("Курсы, подписки и платежи ссылаются на пользователей: укажите их количество.")
+        if (lessons or subscriptions or payments) and not courses:
+            raise ValueError("Уроки, подписки и платежи ссылаются на курсы: укажите их количество.")
+        if subscriptions > users * courses:
+            raise ValueError("Подписок больше, чем пар пользователь-курс (на курс подписываются один раз).")
+
+        report = {}
+        report["users"] = self.generate_users(users)
+        report["courses"] = self.generate_courses(courses)
+        report["lessons"] = self.generate_lessons(lessons)
+        report["subscriptions"] = self.generate_subscriptions(subscriptions)
+        report["payments"] = self.generate_payments(payments)
+        if report["payments"]:
+            report["revenue_rollups"] = rebuild_payment_revenue_rollups(self.batch_size)
+        return report
+
+    def generate_users(self, count):
+        """Пользователи: регистрация растет со временем, у каждого логнормальная активность (подписки, платежи)."""
+        rng = self.get_rng("users")
+        first_id = self.next_id(CustomUser)
+        password = make_password(self.password)
+        cities, city_weights = zip(*CITIES)
+        city_cum_weights = list(accumulate(city_weights))
+
+        # Для подписок и платежей: ID, время регистрации и накопленные веса активности пользователей
+        self.first_user_id = first_id
+        self.user_joined = array("d")
+        self.user_cum_activity = array("d")
+
+        def rows():
+            activity = 0.0
+            for offset, fraction in enumerate(sorted_fractions(rng, count)):
+                user_id = first_id + offset
+                # Рост аудитории: плотность регистраций растет к концу периода (квадратный корень доли)
+                joined = math.sqrt(fraction)
+                activity += rng.lognormvariate(0, 1)
+                self.user_joined.append(joined)
+                self.user_cum_activity.append(activity)
+
+                is_female = rng.random() < 0.5
+                first_name = rng.choice(FEMALE_NAMES if is_female else MALE_NAMES)
+                last_name = rng.choice(LAST_NAMES) + ("а" if is_female else "")
+                date_joined = self.get_datetime(joined)
+                last_login = self.get_datetime(joined + (1 - joined) * rng.random()) if rng.random() < 0.8 else None
+                phone = f"+79{rng.randrange(10 ** 9):09d}" if rng.random() < 0.6 else None
+                city = rng.choices(cities, cum_weights=city_cum_weights)[0] if rng.random() < 0.7 else None
+                yield (
+                    user_id, password, last_login, False, first_name, last_name,
+                    f"user{user_id}@loadtest.example.com", False, rng.random() < 0.97, date_joined, phone, city,
+                    None, {},
+                )
+
+        fields = (
+            "id", "password", "last_login", "is_superuser", "first_name", "last_name", "email", "is_staff",
+            "is_active", "date_joined", "phone_number", "city", "avatar", "avatar_thumbnails",
+        )
+        return self.write(CustomUser, fields, rows())
+
+    def generate_courses(self, count):
+        """Курсы: авторы - 1% пользователей, популярность по Ципфу, цена - логнормальная (от 990 до 149 990)."""
+        rng = self.get_rng("courses")
+        first_id = self.next_id(Course)
+        # Авторы (индексы пользователей) по возрастанию - то есть и по времени регистрации
+        users_count = len(self.user_joined)
+        authors = sorted(rng.sample(range(users_count), max(1, users_count // 100))) if count else []
+        authors_joined = [self.user_joined[author] for author in authors]
+
+        # Популярность: ранги курсов в случайном порядке, вес 1 / ранг ** 1.1
+        ranks = list(range(1, count + 1))
+        rng.shuffle(ranks)
+        self.first_course_id = first_id
+        self.course_created = array("d")
+        self.course_cum_popularity = array("d", accumulate(1 / rank ** 1.1 for rank in ranks))
+        self.course_prices = array("d")
+        self.course_owners = array("q")
+
+        def rows():
+            for offset, fraction in enumerate(sorted_fractions(rng, count)):
+                course_id = first_id + offset
+                created = math.sqrt(fraction)
+                price = min(149990, max(990, round(rng.lognormvariate(math.log(9000), 0.6), -3) - 10))
+                # Автор зарегистрирован раньше, чем создал курс (если таких нет - самый первый автор)
+                registered = bisect_right(authors_joined, created)
+                owner = self.first_user_id + authors[rng.randrange(registered) if registered else 0]
+                self.course_created.append(created)
+                self.course_prices.append(price)
+                self.course_owners.append(owner)
+
+                topic = rng.choice(TOPICS)
+                created_at = self.get_datetime(created)
+                yield (
+                    course_id, created_at, created_at + timedelta(seconds=(self.span * (1 - created)) * rng.random()),
+                    f"{topic}: {rng.choice(LEVELS)} #{course_id}", None, {},
+                    f"Курс по теме {topic}. " * rng.randint(1, 5), owner,
+                )
+
+        fields = ("id", "created_at", "updated_at", "title", "preview", "preview_thumbnails", "description", "owner")
+        return self.write(Course, fields, rows())
+
+    def generate_lessons(self, count):
+        """Уроки: количество в курсе логнормальное, уроки курса идут подряд по ID (блок на курс)."""
+        rng = self.get_rng("lessons")
+        first_id = self.next_id(Lesson)
+        courses_count = len(self.course_created)
+        if count:
+            per_course = allocate(count, [rng.lognormvariate(0, 0.8) for _ in range(courses_count)])
+        else:
+            per_course = [0] * courses_count
+        self.first_lesson_id = first_id
+        # Начало блока уроков каждого курса (смещение от first_lesson_id), последний элемент - количество уроков
+        self.course_lesson_offsets = array("q", accumulate(per_course, initial=0))
+
+        def rows():
+            lesson_id = first_id
+            for course_index, lessons_count in enumerate(per_course):
+                course_id = self.first_course_id + course_index
+                created = self.course_created[course_index]
+                for fraction in sorted_fractions(rng, lessons_count):
+                    lesson_created = created + (1 - created) * fraction
+                    created_at = self.get_datetime(lesson_created)
+                    yield (
+                        lesson_id, created_at, created_at, course_id, f"Урок {lesson_id} курса #{course_id}",
+                        "Конспект урока и ссылки на материалы.", None, {},
+                        f"https://youtube.com/watch?v=lt{lesson_id:09d}", self.course_owners[course_index],
+                    )
+                    lesson_id += 1
+
+        fields = (
+            "id", "created_at", "updated_at", "course", "title", "description", "preview", "preview_thumbnails",
+            "video_url", "owner",
+        )
+        return self.write(Lesson, fields, rows())
+
+    def generate_subscriptions(self, count):
+        """Подписки: количество у пользователя - по его активности, курсы - по популярности, без повторов."""
+        rng = self.get_rng("subscriptions")
+        first_id = self.next_id(Subscription)
+        courses_count = len(self.course_created)
+        activity = [
+            current - previous for previous, current in zip([0.0, *self.user_cum_activity], self.user_cum_activity)
+        ]
+        per_user = allocate(count, activity, limit=courses_count) if count else []
+        course_indexes = range(courses_count)
+
+        def rows():
+            subscription_id = first_id
+            for user_index, subscriptions_count in enumerate(per_user):
+                if subscriptions_count > courses_count // 2:
+                    chosen = set(rng.sample(course_indexes, subscriptions_count))
+                else:
+                    chosen = set()
+                    while len(chosen) < subscriptions_count:
+                        chosen.update(
+                            rng.choices(
+                                course_indexes,
+                                cum_weights=self.course_cum_popularity,
+                                k=subscriptions_count - len(chosen),
+                            )
+                        )
+                for course_index in sorted(chosen):
+                    yield subscription_id, self.first_course_id + course_index, self.first_user_id + user_index
+                    subscription_id += 1
+
+        return self.write(Subscription, ("id", "course", "user"), rows())
+
+    def generate_payments(self, count):
+        """Платежи: время растет вместе с ID, пользователь - по активности среди уже зарегистрированных, продукт -
+        курс (по популярности) или урок популярного курса. Сводная таблица выручки пересчитывается в конце."""
+        rng = self.get_rng("payments")
+        first_id = self.next_id(Payments)
+        statuses, status_weights = zip(*TRANSFER_STATUSES)
+        status_cum_weights = list(accumulate(status_weights))
+        self.ensure_partitions()
+
+        def rows():
+            for offset, fraction in enumerate(sorted_fractions(rng, count)):
+                payment_id = first_id + offset
+                moment = math.sqrt(fraction)
+                # Платит только уже зарегистрированный пользователь, покупает только уже созданный курс
+                users_before = max(1, bisect_left(self.user_joined, moment))
+                user_id = self.first_user_id + weighted_index(rng, self.user_cum_activity, users_before)
+                courses_before = max(1, bisect_left(self.course_created, moment))
+                course_index = weighted_index(rng, self.course_cum_popularity, courses_before)
+
+                lesson_id = None
+                first_lesson = self.course_lesson_offsets[course_index]
+                lessons = self.course_lesson_offsets[course_index + 1] - first_lesson
+                amount = self.course_prices[course_index]
+                if lessons and rng.random() >= COURSE_PAYMENT_SHARE:
+                    lesson_id = self.first_lesson_id + first_lesson + rng.randrange(lessons)
+                    amount = max(190, round(amount / 10, -1) - 10)
+                course_id = None if lesson_id else self.first_course_id + course_index
+
+                payment = [payment_id, user_id, self.get_datetime(moment), course_id, lesson_id, float(amount)]
+                if rng.random() < TRANSFER_SHARE:
+                    product = f"lesson{lesson_id}" if lesson_id else f"course{course_id}"
+                    session_id = f"cs_test_lt{payment_id:014d}"
+                    payment += [
+                        "transfer", rng.choices(statuses, cum_weights=status_cum_weights)[0], f"prod_lt_{product}",
+                        f"price_lt_{product}_{int(amount)}", session_id,
+                        f"https://checkout.stripe.com/c/pay/{session_id}",
+                    ]
+                else:
+                    payment += ["cash", "paid", None, None, None, None]
+                yield payment
+
+        fields = (
+            "id", "user", "payment_date", "paid_course", "paid_lesson", "payment_amount", "payment_method",
+            "payment_status", "stripe_product_id", "stripe_price_id", "stripe_session_id", "payment_url",
+        )
+        return self.write(Payments, fields, rows())
+
+    def ensure_partitions(self):
+        """Создает месячные секции таблицы платежей на весь период данных (если таблица секционирована), чтобы
+        платежи не попали в секцию по умолчанию. Если в секции по умолчанию уже есть строки за месяц, секция не
+        создается (см. users.partitions.create_payments_partition)."""
+        if not is_payments_partitioned():
+            return
+        existing = get_payments_partitions()
+        month = self.start.date().replace(day=1)
+        while month < self.end.date():
+            if month not in existing:
+                try:
+                    with transaction.atomic(), connection.cursor() as cursor:
+                        create_payments_partition(cursor, month)
+                except DatabaseError as e:
+                    self.log(f"Секция платежей за {month:%Y-%m} не создана: {e}")
+            month = add_months(month, 1)
+
+    def write(self, model, fields, rows):
+        """Записывает строки (кортежи значений в порядке fields) пачками по batch_size.
+        :return: Количество записанных строк."""
+        total = 0
+        rows = iter(rows)
+        while batch := list(islice(rows, self.batch_size)):
+            if self.use_copy:
+                self.copy_batch(model, fields, batch)
+            else:
+                with explicit_timestamps(model):
+                    model.objects.bulk_create(
+                        [model(**{model._meta.get_field(name).attname: value for name, value in zip(fields, row)})
+                         for row in batch]
+                    )
+            total += len(batch)
+            self.log(f"{model._meta.db_table}: {total}")
+
+        if total and self.use_copy:
+            # ID записаны явно, поэтому последовательность ID нужно сдвинуть за последнее значение
+            with connection.cursor() as cursor:
+                for sql in connection.ops.sequence_reset_sql(no_style(), [model]):
+                    cursor.execute(sql)
+        return total
+
+    @staticmethod
+    def copy_batch(model, fields, batch):
+        """Записывает пачку строк через COPY ... FROM STDIN (текстовый формат)."""
+        quote_name = connection.ops.quote_name
+        columns = ", ".join(quote_name(model._meta.get_field(name).column) for name in fields)
+        sql = f"COPY {quote_name(model._meta.db_table)} ({columns}) FROM STDIN"
+        data = "".join("\t".join(map(to_copy_value, row)) + "\n" for row in batch)
+        with connection.cursor() as cursor:
+            raw_cursor = cursor.cursor
+            if hasattr(raw_cursor, "copy_expert"):
+                # psycopg2
+                raw_cursor.copy_expert(sql, io.StringIO(data))
+            else:
+                # psycopg 3
+                with raw_cursor.copy(sql) as copy:
+                    copy.write(data)
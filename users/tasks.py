@@ -1,9 +1,15 @@
 from datetime import timedelta
 
 from celery import shared_task  # type: ignore
+from django.apps import apps
 from django.utils import timezone
 
-from users.models import CustomUser
+from users.authentication import invalidate_user_snapshots
+from users.idempotency import delete_expired_idempotency_keys
+from users.models import CustomUser, Payments, UserImportJob
+from users.partitions import maintain_payments_partitions
+from users.services import create_stripe_checkout, import_users_from_csv, reconcile_stripe_payments
+from users.thumbnails import update_thumbnails
 
 
 @shared_task()
@@ -12,6 +18,130 @@ def task_deactivate_inactive_users():
     не заходил более месяца, блокировать его с помощью флага is_active."""
     month_ago = timezone.now() - timedelta(days=30)  # Определяю какая дата была на этот момент ровно 30 дней назад
     users_for_deactivate = CustomUser.objects.filter(last_login__lt=month_ago, is_active=True)  # Получаю QuerySet
+    # Запоминаю ID пользователей до обновления, так как update() не вызывает сигналы post_save, а снимки этих
+    # пользователей нужно удалить из кэша аутентификации (иначе заблокированные пользователи будут проходить
+    # аутентификацию до окончания TTL снимка).
+    user_ids = list(users_for_deactivate.values_list("pk", flat=True))
     # Массовое обновление на уровне БД в один SQL-запрос. Обновление касается всех строк, которые подходят
     # под условия QuerySet-а:
-    users_for_deactivate.update(is_active=False)
+    CustomUser.objects.filter(pk__in=user_ids).update(is_active=False)
+    invalidate_user_snapshots(user_ids)
+
+
+@shared_task(bind=True, max_retries=3)
+def task_create_stripe_checkout(self, payment_id):
+    """Celery-задача: создает в Stripe продукт, цену и сессию оплаты для платежа и сохраняет ссылку на оплату.
+    Используется в асинхронном режиме (STRIPE_CHECKOUT_ASYNC=True), чтобы три последовательных HTTP-запроса в Stripe
+    выполнялись не в воркере gunicorn во время запроса клиента, а в воркере Celery.
+    Шаги:
+        1. Получает платеж по ID (вместе с курсом / уроком одним SQL-запросом).
+        2. Если ссылка на оплату уже есть (например, задача запущена повторно), то ничего не делает.
+        3. Создает объекты в Stripe и сохраняет их ID, ссылку на оплату и статус "unpaid".
+        4. При ошибке повторяет попытку через 10 секунд (максимум 3 раза), а после последней попытки
+        помечает платеж статусом "failed".
+    :param payment_id: ID созданного платежа."""
+    payment = Payments.objects.select_related("paid_course", "paid_lesson").get(pk=payment_id)
+    if payment.payment_url:
+        return
+
+    try:
+        product_id, price_id, session_id, session_url = create_stripe_checkout(
+            payment.paid_course or payment.paid_lesson,
+            payment.payment_amount,
+            # При повторе задачи Stripe вернет уже созданную сессию, а не создаст вторую ссылку на оплату
+            idempotency_key=f"checkout-session-payment-{payment.pk}",
+        )
+    except Exception as e:
+        if self.request.retries >= self.max_retries:
+            Payments.objects.filter(pk=payment_id).update(payment_status=Payments.CHECKOUT_FAILED)
+            raise
+        raise self.retry(exc=e, countdown=10)
+
+    payment.stripe_product_id = product_id
+    payment.stripe_price_id = price_id
+    payment.stripe_session_id = session_id
+    payment.payment_url = session_url
+    # Новая сессия в Stripe всегда создается со статусом оплаты "unpaid"
+    payment.payment_status = "unpaid"
+    payment.save(
+        update_fields=[
+            "stripe_product_id",
+            "stripe_price_id",
+            "stripe_session_id",
+            "payment_url",
+            "payment_status",
+        ]
+    )
+
+
+@shared_task()
+def task_reconcile_stripe_payments():
+    """Celery-задача (periodic, см. CELERY_BEAT_SCHEDULE): сверяет статусы платежей со Stripe пачками по страницам
+    списка сессий оплаты, чтобы статус не оставался пустым / "unpaid", если webhook-событие не дошло, а клиент
+    больше не запрашивал /payment/<pk>/status/.
+    :return: Количество платежей с обновленным статусом."""
+    return reconcile_stripe_payments()
+
+
+@shared_task()
+def task_delete_expired_idempotency_keys():
+    """Celery-задача (periodic, см. CELERY_BEAT_SCHEDULE): удаляет ключи идемпотентности старше
+    IDEMPOTENCY_KEY_TTL_HOURS вместе с сохраненными ответами.
+    :return: Количество удаленных ключей."""
+    return delete_expired_idempotency_keys()
+
+
+@shared_task()
+def task_maintain_payments_partitions():
+    """Celery-задача (periodic, см. CELERY_BEAT_SCHEDULE): создает секции таблицы платежей на будущие месяцы и
+    отсоединяет секции старше PAYMENTS_PARTITIONS_RETENTION_MONTHS (если таблица секционирована).
+    :return: Словарь {"created": [...], "detached": [...]} или None."""
+    return maintain_payments_partitions()
+
+
+@shared_task()
+def task_generate_thumbnails(model_label, pk, field_name):
+    """Celery-задача: создает уменьшенные копии (WebP / JPEG шириной THUMBNAIL_WIDTHS) загруженной картинки и
+    сохраняет их пути в JSON-поле <field_name>_thumbnails. Ставится в очередь сигналами post_save после загрузки,
+    замены или удаления картинки (users/signals.py, lms_system/signals.py).
+    :param model_label: Модель в формате "app_label.ModelName" (например, "lms_system.Course").
+    :param pk: ID объекта.
+    :param field_name: Имя поля с картинкой (avatar, preview)."""
+    instance = apps.get_model(model_label)._default_manager.filter(pk=pk).first()
+    if instance is None:
+        return
+    update_thumbnails(instance, field_name)
+
+
+@shared_task()
+def task_import_users(job_id):
+    """Celery-задача: импортирует пользователей из CSV-файла задания UserImportJob (см. CustomUserImportAPIView).
+    Направляется в отдельную очередь USER_IMPORT_QUEUE (CELERY_TASK_ROUTES), которую обслуживает воркер
+    с --pool=solo (сервис celery_import в docker-compose.yml): процессы пула prefork - демоны и не могут запускать
+    пул процессов для хэширования паролей (hash_passwords), а долгий импорт не занимает воркеры основной очереди.
+    Шаги:
+        1. Помечает задание статусом "running".
+        2. Импортирует пользователей (import_users_from_csv) и сохраняет отчет со статусом "done"
+        (или текст ошибки со статусом "failed").
+        3. Удаляет CSV-файл: в нем пароли в открытом виде.
+    :param job_id: ID задания на импорт."""
+    job = UserImportJob.objects.filter(pk=job_id, status=UserImportJob.PENDING).first()
+    if job is None:
+        return
+    UserImportJob.objects.filter(pk=job_id).update(status=UserImportJob.RUNNING)
+
+    try:
+        with job.file.open("rb") as csv_file:
+            report = import_users_from_csv(csv_file)
+    except Exception as e:
+        UserImportJob.objects.filter(pk=job_id).update(
+            status=UserImportJob.FAILED, error=str(e), finished_at=timezone.now()
+        )
+        raise
+    else:
+        UserImportJob.objects.filter(pk=job_id).update(
+            status=UserImportJob.DONE, report=report, finished_at=timezone.now()
+        )
+    finally:
+        job.file.delete(save=False)
+        UserImportJob.objects.filter(pk=job_id).update(file="")
@@ -1,3 +1,1076 @@
-# from django.test import TestCase
+import hashlib
+import hmac
+import json
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from io import BytesIO, StringIO
+from unittest import skipUnless
+from unittest.mock import MagicMock, patch
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase, APITransactionTestCase
+from PIL import Image
+from rest_framework_simplejwt.tokens import AccessToken
+
+from config.warmup import warmup_application
+from lms_system.models import Course, Lesson, Subscription
+from lms_system.views import SubscriptionToggleAPIView
+from users.models import (
+    CustomUser,
+    IdempotencyKey,
+    ImageRendition,
+    PaymentRevenueRollup,
+    Payments,
+    StripeSyncCheckpoint,
+    StripeWebhookEvent,
+    UserImportJob,
+)
+from users.partitions import (
+    add_months,
+    convert_payments_to_partitioned,
+    create_payments_partition,
+    detach_old_payments_partitions,
+    ensure_payments_partitions,
+    get_payments_partition_name,
+    get_payments_partitions,
+    has_payments_default_partition,
+    is_payments_partitioned,
+    maintain_payments_partitions,
+)
+from users.services import (
+    apply_stripe_webhook_event,
+    create_stripe_checkout,
+    hash_passwords,
+    rebuild_payment_revenue_rollups,
+)
+from users.stripe_client import reset_stripe_client
+from users.stripe_stub import create_stripe_stub_server
+from users.tasks import task_deactivate_inactive_users, task_reconcile_stripe_payments
+from users.throttles import TokenBucketThrottle
+from users.thumbnails import delete_thumbnails
+from users.views import PaymentsListCreateAPIView, StripePaymentStatusAPIView
+
+
+class CachedJWTAuthenticationTestCase(APITestCase):
+    """Тесты, которые будут проверять аутентификацию по JWT-токену через снимок пользователя в кэше."""
+
+    def setUp(self):
+        """Метод для подготовки тестовых данных и настроек перед выполнением тестов в тестовом классе."""
+        # Кэш в памяти процесса общий для всех тестов, поэтому очищаю его перед каждым тестом
+        cache.clear()
+        self.user = CustomUser.objects.create_user(
+            email="user_1_for_tests@gmail.com", password="123qwe"
+        )
+        # Аутентификация через настоящий токен (а не force_authenticate), чтобы отработал класс аутентификации
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}")
+        self.url = reverse("lms:course-list")
+
+    def test_repeated_requests_do_not_query_users_table(self):
+        """Тест проверки, что после первого запроса пользователь берется из кэша без запросов в users_customuser."""
+        self.client.get(self.url)  # Первый запрос - снимок пользователя попадает в кэш
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(
+            any(CustomUser._meta.db_table in query["sql"] for query in queries.captured_queries)
+        )
+
+    def test_deactivated_user_is_rejected(self):
+        """Тест проверки, что после блокировки пользователя Celery-задачей его снимок удаляется из кэша (401)."""
+        self.client.get(self.url)  # Снимок пользователя попадает в кэш
+        CustomUser.objects.filter(pk=self.user.pk).update(last_login=timezone.now() - timedelta(days=31))
+        task_deactivate_inactive_users()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class TokenBucketThrottleTestCase(APITestCase):
+    """Тесты, которые будут проверять ограничение частоты запросов к "дорогим" контроллерам."""
+
+    def setUp(self):
+        """Метод для подготовки тестовых данных и настроек перед выполнением тестов в тестовом классе."""
+        cache.clear()
+        self.url = reverse("users:login")
+        self.data = {"email": "not_exists@gmail.com", "password": "123qwe"}
+
+    def test_login_is_throttled_after_bucket_is_empty(self):
+        """Тест проверки, что после исчерпания токенов в ведре логин возвращает 429 и заголовок Retry-After."""
+        capacity, _ = TokenBucketThrottle().parse_rate(TokenBucketThrottle.THROTTLE_RATES["login"])
+        for _ in range(capacity):
+            response = self.client.post(self.url, self.data, format="json")
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        response = self.client.post(self.url, self.data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn("Retry-After", response)
+
+
+class CustomUserImportAPITestCase(APITestCase):
+    """Тесты, которые будут проверять массовый импорт пользователей из CSV-файла."""
+
+    def setUp(self):
+        """Метод для подготовки тестовых данных и настроек перед выполнением тестов в тестовом классе."""
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        media_settings = override_settings(MEDIA_ROOT=media_root.name)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+        self.staff = CustomUser.objects.create_user(
+            email="staff_for_tests@gmail.com", password="123qwe", is_staff=True
+        )
+        self.client.force_authenticate(user=self.staff)
+        self.url = reverse("users:user-import")
+
+    def import_csv(self, content):
+        """Загружает CSV-файл, выполняет отложенную задачу импорта (в тестах Celery работает синхронно) и
+        возвращает ответ на загрузку и задание на импорт."""
+        file = SimpleUploadedFile("students.csv", content.encode("utf-8"), content_type="text/csv")
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url, {"file": file}, format="multipart")
+        return response, UserImportJob.objects.get(pk=response.data["id"])
+
+    def test_import_users_from_csv(self):
+        """Тест импорта: запрос возвращает 202 с заданием, задача Celery создает валидные строки, а дубликаты,
+        существующие и некорректные email пропускаются (отчет - в статусе задания)."""
+        content = (
+            "email,password,first_name,city\n"
+            "student_1@gmail.com,123qwe,Иван,Москва\n"
+            "student_2@gmail.com,,Елена,\n"
+            "student_1@gmail.com,123qwe,Иван,Москва\n"
+            "not-an-email,123qwe,,\n"
+            "staff_for_tests@gmail.com,123qwe,,\n"
+        )
+        response, job = self.import_csv(content)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data["status"], UserImportJob.PENDING)
+        self.assertEqual(response["Location"], reverse("users:user-import-status", args=[job.pk]))
+
+        status_response = self.client.get(response["Location"])
+        self.assertEqual(status_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(status_response.data["status"], UserImportJob.DONE)
+        self.assertEqual(status_response.data["report"]["created"], 2)
+        self.assertEqual(status_response.data["report"]["skipped"], 3)
+        self.assertTrue(CustomUser.objects.get(email="student_1@gmail.com").check_password("123qwe"))
+        self.assertFalse(CustomUser.objects.get(email="student_2@gmail.com").has_usable_password())
+        # CSV-файл с паролями в открытом виде удаляется после импорта
+        self.assertFalse(job.file)
+
+    def test_import_is_forbidden_for_non_staff(self):
+        """Тест проверки, что импорт и статус импорта недоступны обычному пользователю (403 - Forbidden)."""
+        job = UserImportJob.objects.create(created_by=self.staff)
+        self.client.force_authenticate(user=CustomUser.objects.create_user(email="user@gmail.com", password="1"))
+        response = self.client.post(self.url, {}, format="multipart")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        response = self.client.get(reverse("users:user-import-status", args=[job.pk]))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_import_reports_emails_registered_during_import(self):
+        """Тест проверки, что email, зарегистрированный во время импорта (между валидацией и записью в БД), не
+        считается созданным, а попадает в пропущенные с причиной."""
+
+        def hash_and_register(passwords, workers=None):
+            CustomUser.objects.create_user(email="student_1@gmail.com", password="registered")
+            return [make_password(password) for password in passwords]
+
+        content = "email,password\nstudent_1@gmail.com,123qwe\nstudent_2@gmail.com,123qwe\n"
+        with patch("users.services.hash_passwords", side_effect=hash_and_register):
+            response, job = self.import_csv(content)
+        self.assertEqual(job.report["created"], 1)
+        self.assertEqual(job.report["skipped"], 1)
+        self.assertEqual(job.report["errors"][0]["email"], "student_1@gmail.com")
+        self.assertTrue(CustomUser.objects.get(email="student_1@gmail.com").check_password("registered"))
+
+    def test_failed_import_is_reported(self):
+        """Тест проверки, что ошибка импорта сохраняется в задании со статусом "failed", а файл удаляется."""
+        with patch("users.tasks.import_users_from_csv", side_effect=ValueError("Файл поврежден")):
+            with self.assertRaises(ValueError):
+                self.import_csv("email,password\nstudent_1@gmail.com,123qwe\n")
+        job = UserImportJob.objects.get()
+        self.assertEqual(job.status, UserImportJob.FAILED)
+        self.assertEqual(job.error, "Файл поврежден")
+        self.assertFalse(job.file)
+
+    def test_hash_passwords_in_process_pool(self):
+        """Тест хэширования паролей в пуле процессов: порядок хэшей совпадает с порядком паролей."""
+        passwords = [f"password_{number}" for number in range(25)]
+        hashed_passwords = hash_passwords(passwords, workers=2)
+        self.assertEqual(len(hashed_passwords), len(passwords))
+        self.assertTrue(check_password(passwords[-1], hashed_passwords[-1]))
+
+
+@override_settings(STRIPE_CHECKOUT_ASYNC=True)
+class AsyncStripeCheckoutTestCase(APITestCase):
+    """Тесты, которые будут проверять асинхронное создание ссылки на оплату в Stripe через Celery-задачу."""
+
+    def setUp(self):
+        """Метод для подготовки тестовых данных и настроек перед выполнением тестов в тестовом классе."""
+        cache.clear()
+        self.user = CustomUser.objects.create_user(email="user_1_for_tests@gmail.com", password="123qwe")
+        self.client.force_authenticate(user=self.user)
+        self.course = Course.objects.create(title="Какой-то тестовый курс", owner=self.user)
+        self.data = {"paid_course": self.course.pk, "payment_amount": 1000, "payment_method": "transfer"}
+
+    @patch("users.tasks.create_stripe_checkout")
+    def test_payment_is_created_pending_and_filled_by_task(self, mock_checkout):
+        """Тест проверки, что платеж создается со статусом "pending", а ссылку на оплату заполняет Celery-задача."""
+        mock_checkout.return_value = ("prod_1", "price_1", "cs_1", "https://checkout.stripe.com/c/pay/cs_1")
+
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            response = self.client.post(reverse("users:payment-list-create"), self.data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["payment_status"], Payments.CHECKOUT_PENDING)
+        self.assertIsNone(response.data["payment_url"])
+
+        status_url = reverse("users:payment-check-status", args=[response.data["id"]])
+        self.assertEqual(self.client.get(status_url).data["payment_status"], Payments.CHECKOUT_PENDING)
+
+        # Выполняю отложенный запуск задачи (в тестах Celery работает синхронно - CELERY_TASK_ALWAYS_EAGER)
+        for callback in callbacks:
+            callback()
+        payment = Payments.objects.get(pk=response.data["id"])
+        self.assertEqual(payment.payment_status, "unpaid")
+        self.assertEqual(payment.stripe_session_id, "cs_1")
+        self.assertEqual(payment.payment_url, "https://checkout.stripe.com/c/pay/cs_1")
+
+
+@override_settings(SECRET_KEY_FOR_STRIPE="sk_test_stub")
+class StripeStubTestCase(APITestCase):
+    """Базовый класс тестов, которые работают с Stripe через локальную заглушку Stripe API (users/stripe_stub.py)."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Запускаю заглушку Stripe на свободном порту в отдельном потоке на время всех тестов класса."""
+        super().setUpClass()
+        cls.stub = create_stripe_stub_server(port=0)
+        threading.Thread(target=cls.stub.serve_forever, daemon=True).start()
+        host, port = cls.stub.server_address[:2]
+        cls.stub_settings = override_settings(STRIPE_API_BASE=f"http://{host}:{port}", STRIPE_MAX_NETWORK_RETRIES=0)
+        cls.stub_settings.enable()
+        reset_stripe_client()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.stub.shutdown()
+        cls.stub.server_close()
+        cls.stub_settings.disable()
+        reset_stripe_client()
+        super().tearDownClass()
+
+
+class StripePriceReuseTestCase(StripeStubTestCase):
+    """Тесты, которые будут проверять переиспользование продуктов и цен из справочника StripePrice и ключи
+    идемпотентности."""
+
+    def setUp(self):
+        """Метод для подготовки тестовых данных и настроек перед выполнением тестов в тестовом классе."""
+        self.course = Course.objects.create(title="Какой-то тестовый курс")
+        self.stub.state.requests_count.clear()
+
+    def test_product_and_price_are_created_once(self):
+        """Тест проверки, что для повторной оплаты в Stripe создается только новая сессия, а для новой суммы -
+        только новая цена (продукт переиспользуется)."""
+        first = create_stripe_checkout(self.course, 1000)
+        second = create_stripe_checkout(self.course, 1000)
+        third = create_stripe_checkout(self.course, 1500)
+
+        self.assertEqual(first[:2], second[:2])
+        self.assertEqual(first[0], third[0])
+        self.assertNotEqual(first[1], third[1])
+        self.assertEqual(self.stub.state.requests_count["POST /v1/products"], 1)
+        self.assertEqual(self.stub.state.requests_count["POST /v1/prices"], 2)
+        self.assertEqual(self.stub.state.requests_count["POST /v1/checkout/sessions"], 3)
+
+    def test_session_idempotency_key(self):
+        """Тест проверки, что повтор с тем же ключом идемпотентности возвращает ту же сессию оплаты."""
+        first = create_stripe_checkout(self.course, 1000, idempotency_key="checkout-session-payment-1")
+        second = create_stripe_checkout(self.course, 1000, idempotency_key="checkout-session-payment-1")
+        self.assertEqual(first, second)
+
+
+@override_settings(STRIPE_WEBHOOK_SECRET="whsec_test")
+class StripeWebhookTestCase(APITestCase):
+    """Тесты, которые будут проверять обновление статуса платежа webhook-событиями Stripe."""
+
+    def setUp(self):
+        """Метод для подготовки тестовых данных и настроек перед выполнением тестов в тестовом классе."""
+        cache.clear()
+        self.user = CustomUser.objects.create_user(email="user_1_for_tests@gmail.com", password="123qwe")
+        self.payment = Payments.objects.create(
+            user=self.user,
+            payment_amount=1000,
+            payment_method="transfer",
+            stripe_session_id="cs_test_1",
+            payment_status="unpaid",
+        )
+        self.url = reverse("users:payment-webhook")
+
+    def post_event(self, event_id, secret="whsec_test"):
+        """Отправляет событие checkout.session.completed с подписью в формате заголовка Stripe-Signature."""
+        payload = json.dumps(
+            {
+                "id": event_id,
+                "object": "event",
+                "type": "checkout.session.completed",
+                "data": {"object": {"id": "cs_test_1", "object": "checkout.session", "payment_status": "paid"}},
+            }
+        )
+        timestamp = int(time.time())
+        signature = hmac.new(secret.encode(), f"{timestamp}.{payload}".encode(), hashlib.sha256).hexdigest()
+        return self.client.post(
+            self.url, payload, content_type="application/json", HTTP_STRIPE_SIGNATURE=f"t={timestamp},v1={signature}"
+        )
+
+    def test_webhook_updates_payment_status_once(self):
+        """Тест проверки, что событие обновляет статус платежа, а повторная доставка того же события игнорируется."""
+        response = self.post_event("evt_1")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data["processed"])
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.payment_status, "paid")
+
+        response = self.post_event("evt_1")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.data["processed"])
+        self.assertEqual(StripeWebhookEvent.objects.count(), 1)
+
+    def test_webhook_with_wrong_signature(self):
+        """Тест проверки, что событие с неверной подписью отклоняется (400 - Bad Request)."""
+        response = self.post_event("evt_1", secret="whsec_wrong")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.payment_status, "unpaid")
+
+    @patch("users.views.get_stripe_payment_status")
+    def test_status_is_read_locally(self, mock_status):
+        """Тест проверки, что при настроенных webhook-событиях проверка статуса не обращается к Stripe."""
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(reverse("users:payment-check-status", args=[self.payment.pk]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["payment_status"], "unpaid")
+        mock_status.assert_not_called()
+
+
+@override_settings(STRIPE_RECONCILE_PAGE_SIZE=2)
+class StripeReconciliationTestCase(StripeStubTestCase):
+    """Тесты, которые будут проверять периодическую сверку статусов платежей со Stripe пачками."""
+
+    def setUp(self):
+        """Метод для подготовки тестовых данных и настроек перед выполнением тестов в тестовом классе."""
+        course = Course.objects.create(title="Какой-то тестовый курс")
+        self.payments = []
+        for _ in range(3):
+            session_id = create_stripe_checkout(course, 1000)[2]
+            self.payments.append(
+                Payments.objects.create(
+                    paid_course=course, payment_amount=1000, payment_method="transfer", stripe_session_id=session_id
+                )
+            )
+        self.stub.state.requests_count.clear()
+
+    def test_statuses_are_updated_page_by_page(self):
+        """Тест проверки, что статусы обновляются по страницам списка сессий (один IN-запрос на страницу),
+        а после сверки сохраняется контрольная точка."""
+        self.stub.state.objects[self.payments[0].stripe_session_id]["payment_status"] = "paid"
+        self.stub.state.objects[self.payments[2].stripe_session_id]["payment_status"] = "paid"
+
+        with CaptureQueriesContext(connection) as queries:
+            updated = task_reconcile_stripe_payments()
+
+        self.assertEqual(updated, 3)
+        statuses = [Payments.objects.get(pk=payment.pk).payment_status for payment in self.payments]
+        self.assertEqual(statuses, ["paid", "unpaid", "paid"])
+        self.assertEqual(self.stub.state.requests_count["GET /v1/checkout/sessions"], 2)
+        self.assertEqual(sum('"stripe_session_id" IN' in query["sql"] for query in queries.captured_queries), 2)
+        self.assertTrue(StripeSyncCheckpoint.objects.exists())
+
+    def test_unchanged_statuses_are_not_saved(self):
+        """Тест проверки, что повторная сверка без изменений в Stripe не записывает платежи, а контрольная точка
+        отстает от времени запуска только на перекрытие STRIPE_RECONCILE_OVERLAP_MINUTES."""
+        task_reconcile_stripe_payments()
+        started_at = timezone.now()
+
+        with CaptureQueriesContext(connection) as queries:
+            updated = task_reconcile_stripe_payments()
+
+        self.assertEqual(updated, 0)
+        self.assertFalse(
+            any(query["sql"].startswith(f'UPDATE "{Payments._meta.db_table}"') for query in queries.captured_queries)
+        )
+        checkpoint = StripeSyncCheckpoint.objects.get().created_gte
+        overlap = timedelta(minutes=settings.STRIPE_RECONCILE_OVERLAP_MINUTES)
+        self.assertLessEqual(started_at - overlap, checkpoint)
+        self.assertLess(checkpoint, timezone.now() - overlap + timedelta(seconds=1))
+
+
+class AsyncPaymentViewsTestCase(StripeStubTestCase):
+    """Тесты, которые будут проверять асинхронные контроллеры (users/async_views.py) для запуска через ASGI."""
+
+    def setUp(self):
+        """Метод для подготовки тестовых данных и настроек перед выполнением тестов в тестовом классе."""
+        self.user = CustomUser.objects.create_user(email="async@example.com", password="123qwe")
+        self.course = Course.objects.create(title="Какой-то тестовый курс")
+        self.client.force_authenticate(user=self.user)
+
+    def test_views_are_async(self):
+        """Тест проверки, что Django определяет контроллеры как асинхронные (обработчики через async def), а
+        полностью синхронный список / создание платежей остается синхронным."""
+        self.assertFalse(PaymentsListCreateAPIView.view_is_async)
+        self.assertTrue(StripePaymentStatusAPIView.view_is_async)
+        self.assertTrue(SubscriptionToggleAPIView.view_is_async)
+
+    def test_payment_status_is_requested_from_stripe(self):
+        """Тест проверки, что асинхронный контроллер получает статус из Stripe и сохраняет его в БД."""
+        session_id = create_stripe_checkout(self.course, 1000)[2]
+        payment = Payments.objects.create(
+            user=self.user,
+            paid_course=self.course,
+            payment_amount=1000,
+            payment_method="transfer",
+            stripe_session_id=session_id,
+        )
+        self.stub.state.objects[session_id]["payment_status"] = "paid"
+
+        response = self.client.get(reverse("users:payment-check-status", args=[payment.pk]))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["payment_status"], "paid")
+        payment.refresh_from_db()
+        self.assertEqual(payment.payment_status, "paid")
+
+    def test_errors_are_handled_like_sync_views(self):
+        """Тест проверки, что аутентификация, 404 и 405 работают так же, как в синхронных контроллерах."""
+        response = self.client.get(reverse("users:payment-check-status", args=[999]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        response = self.client.delete(reverse("users:payment-list-create"))
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+        self.client.force_authenticate(user=None)
+        response = self.client.get(reverse("users:payment-list-create"))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PaymentRevenueRollupTestCase(APITestCase):
+    """Тесты, которые будут проверять инкрементальное обновление сводной таблицы выручки и API отчета."""
+
+    def setUp(self):
+        """Метод для подготовки тестовых данных и настроек перед выполнением тестов в тестовом классе."""
+        self.staff = CustomUser.objects.create_user(email="staff_for_tests@gmail.com", password="1", is_staff=True)
+        self.client.force_authenticate(user=self.staff)
+        self.course = Course.objects.create(title="Какой-то тестовый курс")
+        self.payments = [
+            Payments.objects.create(
+                paid_course=self.course,
+                payment_amount=amount,
+                payment_method=method,
+                stripe_session_id=f"cs_test_{number}",
+                payment_status="unpaid",
+            )
+            for number, (amount, method) in enumerate([(1000, "transfer"), (500, "transfer"), (300, "cash")])
+        ]
+        self.url = reverse("users:payment-revenue")
+
+    def get_report(self):
+        """Возвращает отчет о выручке в виде {метод платежа: строка отчета}."""
+        response = self.client.get(self.url, {"paid_course": self.course.pk})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return {row["payment_method"]: row for row in response.data}
+
+    def test_rollup_follows_payment_changes(self):
+        """Тест проверки, что сводная таблица обновляется при создании, оплате (webhook) и удалении платежа."""
+        apply_stripe_webhook_event(
+            {
+                "id": "evt_1",
+                "type": "checkout.session.completed",
+                "data": {"object": {"id": "cs_test_0", "payment_status": "paid"}},
+            }
+        )
+        report = self.get_report()
+        self.assertEqual(report["transfer"]["payments_count"], 2)
+        self.assertEqual(report["transfer"]["total_amount"], "1500.00")
+        self.assertEqual(report["transfer"]["paid_count"], 1)
+        self.assertEqual(report["transfer"]["paid_amount"], "1000.00")
+        self.assertEqual(report["transfer"]["course_title"], self.course.title)
+        self.assertEqual(report["cash"]["total_amount"], "300.00")
+
+        self.payments[1].delete()
+        self.assertEqual(self.get_report()["transfer"]["total_amount"], "1000.00")
+
+    def test_rebuild_matches_incremental_rollup(self):
+        """Тест проверки, что полный пересчет сводной таблицы дает те же суммы, что и инкрементальное обновление."""
+        payment = Payments.objects.get(pk=self.payments[2].pk)
+        payment.payment_status = "paid"
+        payment.save()
+        incremental = self.get_report()
+
+        self.assertEqual(rebuild_payment_revenue_rollups(), 2)
+        self.assertEqual(self.get_report(), incremental)
+        self.assertEqual(PaymentRevenueRollup.objects.count(), 2)
+
+
+class PaymentsHistoryPaginationTestCase(APITestCase):
+    """Тесты, которые будут проверять пагинацию истории платежей по курсору (payment_date, id)."""
+
+    def setUp(self):
+        """Метод для подготовки тестовых данных и настроек перед выполнением тестов в тестовом классе."""
+        self.user = CustomUser.objects.create_user(email="user_1_for_tests@gmail.com", password="123qwe")
+        self.client.force_authenticate(user=self.user)
+        self.course = Course.objects.create(title="Какой-то тестовый курс")
+        payments = [
+            Payments.objects.create(user=self.user, paid_course=self.course, payment_amount=100, payment_method="cash")
+            for _ in range(5)
+        ]
+        # Одинаковая дата у нескольких платежей - курсор должен различать их по id
+        same_date = timezone.now() - timedelta(days=1)
+        Payments.objects.filter(pk__in=[payment.pk for payment in payments[1:4]]).update(payment_date=same_date)
+        self.expected_ids = list(
+            Payments.objects.filter(user=self.user).order_by("-payment_date", "-id").values_list("pk", flat=True)
+        )
+
+    def test_pages_follow_cursor_without_gaps(self):
+        """Тест проверки, что страницы по курсору содержат все платежи без пропусков и повторов, а количество
+        SQL-запросов на страницу не растет."""
+        ids = []
+        url = reverse("users:payment-list-create") + "?page_size=2"
+        queries_per_page = []
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            queries_per_page.append(len(queries))
+            ids.extend(payment["id"] for payment in response.data["results"])
+            url = response.data["next"]
+
+        self.assertEqual(ids, self.expected_ids)
+        self.assertEqual(len(set(queries_per_page)), 1)
+        self.assertEqual(response.data["results"][0]["paid_course_title"], self.course.title)
+
+    def test_invalid_cursor(self):
+        """Тест проверки, что поврежденный курсор возвращает 404 - Not Found."""
+        response = self.client.get(reverse("users:payment-list-create"), {"cursor": "broken"})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class IdempotentPaymentCreateTestCase(APITestCase):
+    """Тесты, которые будут проверять идемпотентное создание платежа по заголовку Idempotency-Key."""
+
+    def setUp(self):
+        """Метод для подготовки тестовых данных и настроек перед выполнением тестов в тестовом классе."""
+        cache.clear()
+        self.user = CustomUser.objects.create_user(email="user_1_for_tests@gmail.com", password="123qwe")
+        self.client.force_authenticate(user=self.user)
+        self.course = Course.objects.create(title="Какой-то тестовый курс", owner=self.user)
+        self.url = reverse("users:payment-list-create")
+        self.data = {"paid_course": self.course.pk, "payment_amount": 1000, "payment_method": "transfer"}
+
+    @patch("users.views.create_stripe_checkout")
+    def test_retry_replays_first_response(self, mock_checkout):
+        """Тест проверки, что повтор с тем же ключом возвращает первый ответ без нового платежа и запросов в Stripe,
+        а тот же ключ с другим телом запроса отклоняется (422)."""
+        mock_checkout.return_value = ("prod_1", "price_1", "cs_1", "https://checkout.stripe.com/c/pay/cs_1")
+
+        first = self.client.post(self.url, self.data, format="json", HTTP_IDEMPOTENCY_KEY="key-1")
+        second = self.client.post(self.url, self.data, format="json", HTTP_IDEMPOTENCY_KEY="key-1")
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second["Idempotent-Replayed"], "true")
+        self.assertEqual(Payments.objects.count(), 1)
+        mock_checkout.assert_called_once()
+
+        other = self.client.post(
+            self.url, {**self.data, "payment_amount": 500}, format="json", HTTP_IDEMPOTENCY_KEY="key-1"
+        )
+        self.assertEqual(other.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+    @patch("users.views.create_stripe_checkout")
+    def test_failed_request_releases_key(self, mock_checkout):
+        """Тест проверки, что после ошибки первого запроса ключ освобождается и повтор создает платеж."""
+        mock_checkout.side_effect = [
+            Exception("Stripe недоступен"),
+            ("prod_1", "price_1", "cs_1", "https://checkout.stripe.com/c/pay/cs_1"),
+        ]
+        with self.assertRaises(Exception):
+            self.client.post(self.url, self.data, format="json", HTTP_IDEMPOTENCY_KEY="key-1")
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+        response = self.client.post(self.url, self.data, format="json", HTTP_IDEMPOTENCY_KEY="key-1")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Payments.objects.count(), 1)
+
+    @patch("users.views.create_stripe_checkout")
+    def test_stale_reservation_is_taken_over(self, mock_checkout):
+        """Тест проверки, что ключ, зарезервированный упавшим запросом (ответ не сохранен), после аренды
+        IDEMPOTENCY_KEY_LEASE_SECONDS забирает повтор, а свежее резервирование по-прежнему дает 409."""
+        mock_checkout.return_value = ("prod_1", "price_1", "cs_1", "https://checkout.stripe.com/c/pay/cs_1")
+        first = self.client.post(self.url, self.data, format="json", HTTP_IDEMPOTENCY_KEY="key-1")
+        record = IdempotencyKey.objects.get()
+        IdempotencyKey.objects.filter(pk=record.pk).update(response_status=None, response_body=None)
+
+        in_progress = self.client.post(self.url, self.data, format="json", HTTP_IDEMPOTENCY_KEY="key-1")
+        self.assertEqual(in_progress.status_code, status.HTTP_409_CONFLICT)
+
+        IdempotencyKey.objects.filter(pk=record.pk).update(reserved_at=timezone.now() - timedelta(minutes=5))
+        retry = self.client.post(self.url, self.data, format="json", HTTP_IDEMPOTENCY_KEY="key-1")
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn("Idempotent-Replayed", retry)
+        self.assertNotEqual(retry.data["id"], first.data["id"])
+        self.assertEqual(IdempotencyKey.objects.get().response_body["id"], retry.data["id"])
+
+    @patch("users.views.create_stripe_checkout")
+    def test_replay_is_not_throttled(self, mock_checkout):
+        """Тест проверки, что повторы с сохраненным ответом не расходуют токены ограничения частоты запросов,
+        а новый платеж после исчерпания токенов получает 429."""
+        mock_checkout.return_value = ("prod_1", "price_1", "cs_1", "https://checkout.stripe.com/c/pay/cs_1")
+        with patch("users.throttles.TokenBucketThrottle.THROTTLE_RATES", {"payment": "1/min"}):
+            first = self.client.post(self.url, self.data, format="json", HTTP_IDEMPOTENCY_KEY="key-1")
+            for _ in range(3):
+                replay = self.client.post(self.url, self.data, format="json", HTTP_IDEMPOTENCY_KEY="key-1")
+                self.assertEqual(replay.status_code, status.HTTP_201_CREATED)
+                self.assertEqual(replay.data, first.data)
+            other = self.client.post(self.url, self.data, format="json", HTTP_IDEMPOTENCY_KEY="key-2")
+        self.assertEqual(other.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+
+class PaymentsPartitionsTestCase(APITestCase):
+    """Тесты, которые будут проверять вспомогательные функции секционирования таблицы платежей по месяцам."""
+
+    def test_month_arithmetic_and_partition_names(self):
+        """Тест проверки сдвига месяцев через границу года и имен месячных секций."""
+        self.assertEqual(add_months(date(2026, 11, 1), 3), date(2027, 2, 1))
+        self.assertEqual(add_months(date(2026, 1, 1), -1), date(2025, 12, 1))
+        self.assertEqual(get_payments_partition_name(date(2026, 2, 1)), "users_payments_p2026_02")
+
+    def test_maintenance_skips_not_partitioned_table(self):
+        """Тест проверки, что для несекционированной таблицы (и не PostgreSQL) обслуживание секций ничего не делает."""
+        self.assertIsNone(maintain_payments_partitions())
+
+    def test_create_partition_sql(self):
+        """Тест проверки SQL создания месячной секции: границы - первые числа месяцев в UTC, через границу года."""
+        cursor = MagicMock()
+        create_payments_partition(cursor, date(2026, 12, 1))
+        cursor.execute.assert_called_once_with(
+            'CREATE TABLE IF NOT EXISTS "users_payments_p2026_12" PARTITION OF "users_payments" '
+            "FOR VALUES FROM ('2026-12-01 00:00:00+00') TO ('2027-01-01 00:00:00+00')"
+        )
+
+    @override_settings(PAYMENTS_PARTITIONS_AHEAD=1)
+    @patch("users.partitions.get_current_month", return_value=date(2026, 10, 1))
+    @patch("users.partitions.is_payments_partitioned", return_value=False)
+    def test_convert_to_partitioned_sql(self, *mocks):
+        """Тест проверки последовательности SQL при преобразовании таблицы в секционированную (без PostgreSQL:
+        курсор записывает запросы): секции от месяца самого старого платежа до месяца вперед, перенос данных,
+        последовательность id, первичный ключ (id, payment_date), внешние ключи и индексы."""
+        cursor = MagicMock(rowcount=5)
+        cursor.fetchall.side_effect = [
+            [("users_payments_user_id_fk", "FOREIGN KEY (user_id) REFERENCES users_customuser(id)")],
+            [("payments_user_date_idx", "CREATE INDEX payments_user_date_idx ON public.users_payments (user_id)")],
+        ]
+        cursor.fetchone.return_value = (datetime(2026, 8, 20, 23, 0, tzinfo=dt_timezone.utc), 42)
+        connection_mock = MagicMock(vendor="postgresql")
+        connection_mock.cursor.return_value.__enter__.return_value = cursor
+        with patch("users.partitions.connection", connection_mock):
+            self.assertEqual(convert_payments_to_partitioned(), 5)
+
+        statements = [call.args[0] for call in cursor.execute.call_args_list]
+        expected = [
+            'LOCK TABLE "users_payments" IN ACCESS EXCLUSIVE MODE',
+            'ALTER TABLE "users_payments" RENAME TO "users_payments_old"',
+            'CREATE TABLE "users_payments" (LIKE "users_payments_old" INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+            "PARTITION BY RANGE (payment_date)",
+            'CREATE TABLE IF NOT EXISTS "users_payments_p2026_08" PARTITION OF "users_payments" '
+            "FOR VALUES FROM ('2026-08-01 00:00:00+00') TO ('2026-09-01 00:00:00+00')",
+            'CREATE TABLE IF NOT EXISTS "users_payments_p2026_09" PARTITION OF "users_payments" '
+            "FOR VALUES FROM ('2026-09-01 00:00:00+00') TO ('2026-10-01 00:00:00+00')",
+            'CREATE TABLE IF NOT EXISTS "users_payments_p2026_10" PARTITION OF "users_payments" '
+            "FOR VALUES FROM ('2026-10-01 00:00:00+00') TO ('2026-11-01 00:00:00+00')",
+            'CREATE TABLE IF NOT EXISTS "users_payments_p2026_11" PARTITION OF "users_payments" '
+            "FOR VALUES FROM ('2026-11-01 00:00:00+00') TO ('2026-12-01 00:00:00+00')",
+            'CREATE TABLE "users_payments_default" PARTITION OF "users_payments" DEFAULT',
+            'INSERT INTO "users_payments" SELECT * FROM "users_payments_old"',
+            "SET CONSTRAINTS ALL IMMEDIATE",
+            'DROP TABLE "users_payments_old"',
+            'CREATE SEQUENCE "users_payments_id_seq" OWNED BY "users_payments".id',
+            "SELECT setval(%s, %s, %s)",
+            "ALTER TABLE \"users_payments\" ALTER COLUMN id SET DEFAULT nextval('\"users_payments_id_seq\"')",
+            'ALTER TABLE "users_payments" ADD CONSTRAINT "users_payments_pkey" PRIMARY KEY (id, payment_date)',
+            'ALTER TABLE "users_payments" ADD CONSTRAINT "users_payments_user_id_fk" '
+            "FOREIGN KEY (user_id) REFERENCES users_customuser(id)",
+            "CREATE INDEX payments_user_date_idx ON public.users_payments (user_id)",
+        ]
+        # Первые запросы после LOCK - чтение внешних ключей, индексов и диапазона данных
+        self.assertEqual([statements[0], *statements[4:]], expected)
+        # Последовательность продолжается после самого большого перенесенного id
+        setval = cursor.execute.call_args_list[statements.index("SELECT setval(%s, %s, %s)")]
+        self.assertEqual(setval.args[1], ["users_payments_id_seq", 42, True])
+
+
+@skipUnless(connection.vendor == "postgresql", "Секционирование таблицы платежей поддерживается только в PostgreSQL")
+class PaymentsPartitionsPostgreSQLTestCase(APITestCase):
+    """Тесты, которые будут проверять преобразование таблицы платежей в секционированную и создание секций
+    в настоящей БД PostgreSQL (в остальных БД пропускаются)."""
+
+    @override_settings(PAYMENTS_PARTITIONS_AHEAD=2, PAYMENTS_PARTITIONS_RETENTION_MONTHS=0)
+    def test_convert_and_maintain_partitions(self):
+        """Тест проверки: данные переносятся в секции, новые платежи получают следующий id, обслуживание создает
+        секции вперед, платеж за месяц без секции попадает в секцию по умолчанию, а старая секция отсоединяется
+        (обычный DETACH PARTITION: есть секция по умолчанию и вызов внутри транзакции теста)."""
+        user = CustomUser.objects.create_user(email="partitions@gmail.com", password="123qwe")
+        old_payment = Payments.objects.create(user=user, payment_amount=100, payment_method="cash")
+        Payments.objects.filter(pk=old_payment.pk).update(payment_date=timezone.now() - timedelta(days=70))
+
+        self.assertEqual(convert_payments_to_partitioned(), 1)
+        self.assertTrue(is_payments_partitioned())
+        self.assertTrue(has_payments_default_partition())
+        partitions = get_payments_partitions()
+        old_month = Payments.objects.get(pk=old_payment.pk).payment_date.astimezone(dt_timezone.utc).date()
+        old_month = old_month.replace(day=1)
+        self.assertIn(old_month, partitions)
+        current_month = timezone.now().astimezone(dt_timezone.utc).date().replace(day=1)
+        self.assertLessEqual({add_months(current_month, offset) for offset in range(3)}, set(partitions))
+
+        new_payment = Payments.objects.create(user=user, payment_amount=200, payment_method="cash")
+        self.assertGreater(new_payment.pk, old_payment.pk)
+        self.assertEqual(Payments.objects.count(), 2)
+        self.assertEqual(maintain_payments_partitions(), {"created": [], "detached": []})
+        # Секции на месяцы дальше PAYMENTS_PARTITIONS_AHEAD присоединяются к таблице
+        self.assertEqual(
+            ensure_payments_partitions(months_ahead=3),
+            [get_payments_partition_name(add_months(current_month, 3))],
+        )
+
+        far_future = timezone.now() + timedelta(days=3650)
+        Payments.objects.filter(pk=new_payment.pk).update(payment_date=far_future)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT COUNT(*) FROM "users_payments_default"')
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+        with CaptureQueriesContext(connection) as queries:
+            detached = detach_old_payments_partitions(retention_months=1)
+        self.assertIn(partitions[old_month], detached)
+        self.assertFalse(any("CONCURRENTLY" in query["sql"] for query in queries.captured_queries))
+        self.assertNotIn(old_month, get_payments_partitions())
+        # Отсоединенная секция - обычная таблица со старыми платежами, в таблице платежей их больше нет
+        self.assertFalse(Payments.objects.filter(pk=old_payment.pk).exists())
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(*) FROM "{partitions[old_month]}"')
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+
+@skipUnless(connection.vendor == "postgresql", "Секционирование таблицы платежей поддерживается только в PostgreSQL")
+class PaymentsPartitionsConcurrentDetachTestCase(APITransactionTestCase):
+    """Тесты, которые будут проверять отсоединение секций через DETACH PARTITION ... CONCURRENTLY. CONCURRENTLY нельзя
+    выполнять в транзакции, поэтому нужен APITransactionTestCase (изменения схемы не откатываются - таблица платежей
+    пересоздается после теста)."""
+
+    def setUp(self):
+        """Метод для подготовки тестовых данных и настроек перед выполнением тестов в тестовом классе."""
+        self.addCleanup(self.restore_payments_table)
+        user = CustomUser.objects.create_user(email="partitions@gmail.com", password="123qwe")
+        self.old_payment = Payments.objects.create(user=user, payment_amount=100, payment_method="cash")
+        Payments.objects.filter(pk=self.old_payment.pk).update(payment_date=timezone.now() - timedelta(days=70))
+        convert_payments_to_partitioned(months_ahead=1)
+        self.partitions = get_payments_partitions()
+
+    def restore_payments_table(self):
+        """Возвращает обычную (не секционированную) таблицу платежей по модели для следующих тестов."""
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS "{Payments._meta.db_table}" CASCADE')
+            for name in self.partitions.values():
+                cursor.execute(f'DROP TABLE IF EXISTS "{name}"')
+        with connection.schema_editor() as editor:
+            editor.create_model(Payments)
+
+    def test_partition_is_detached_concurrently_without_default_partition(self):
+        """Тест проверки, что без секции по умолчанию и вне транзакции секция отсоединяется через CONCURRENTLY."""
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TABLE "users_payments_default"')
+        self.assertFalse(has_payments_default_partition())
+
+        with CaptureQueriesContext(connection) as queries:
+            detached = detach_old_payments_partitions(retention_months=1)
+
+        old_month = min(self.partitions)
+        self.assertIn(self.partitions[old_month], detached)
+        self.assertTrue(any("CONCURRENTLY" in query["sql"] for query in queries.captured_queries))
+        self.assertNotIn(old_month, get_payments_partitions())
+        self.assertFalse(Payments.objects.filter(pk=self.old_payment.pk).exists())
+
+
+class ProtectedMediaTestCase(APITestCase):
+    """Тесты, которые будут проверять выдачу загруженных файлов с проверкой доступа (ProtectedMediaAPIView)."""
+
+    def setUp(self):
+        """Метод для подготовки тестовых данных и настроек перед выполнением тестов в тестовом классе."""
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        media_settings = override_settings(MEDIA_ROOT=media_root.name)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+        self.user = CustomUser.objects.create_user(email="media@example.com", password="123qwe")
+        self.user.avatar = SimpleUploadedFile("avatar.png", b"png-bytes", content_type="image/png")
+        self.user.save()
+        self.url = reverse("protected-media", args=[self.user.avatar.name])
+        self.client.force_authenticate(user=self.user)
+
+    def test_file_is_served_by_django_without_nginx(self):
+        """Тест проверки, что без X-Accel-Redirect файл отдает Django."""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(b"".join(response.streaming_content), b"png-bytes")
+        self.assertEqual(response["Content-Type"], "image/png")
+        self.assertIn("private", response["Cache-Control"])
+
+    @override_settings(MEDIA_X_ACCEL_REDIRECT=True)
+    def test_file_is_delegated_to_nginx(self):
+        """Тест проверки, что за nginx Django возвращает только заголовок X-Accel-Redirect без содержимого файла."""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["X-Accel-Redirect"], f"/protected-media/{self.user.avatar.name}")
+        self.assertEqual(response.content, b"")
+
+    def test_access_is_checked(self):
+        """Тест проверки, что файл недоступен анонимно, а файлы без объекта и пути вне папки - 404."""
+        self.client.force_authenticate(user=None)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.client.force_authenticate(user=self.user)
+        for path in ("user_avatar/other.png", "user_avatar/../user_avatar/avatar.png", "private/avatar.png"):
+            response = self.client.get(reverse("protected-media", args=[path]))
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+@override_settings(THUMBNAIL_WIDTHS=[160, 320, 640], THUMBNAIL_FORMATS=["webp", "jpeg"])
+class AvatarThumbnailsTestCase(APITestCase):
+    """Тесты, которые будут проверять создание уменьшенных копий картинок (users/thumbnails.py,
+    task_generate_thumbnails) на примере аватара пользователя."""
+
+    def setUp(self):
+        """Метод для подготовки тестовых данных и настроек перед выполнением тестов в тестовом классе."""
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        media_settings = override_settings(MEDIA_ROOT=media_root.name)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+        self.user = CustomUser.objects.create_user(email="thumbnails@example.com", password="123qwe")
+        self.client.force_authenticate(user=self.user)
+
+    def upload_avatar(self, name, size=(1000, 500), color=(255, 0, 0, 128)):
+        """Загружает аватар-картинку PNG и выполняет задачу создания копий (после фиксации транзакции)."""
+        buffer = BytesIO()
+        Image.new("RGBA", size, color).save(buffer, format="PNG")
+        self.user.avatar = SimpleUploadedFile(name, buffer.getvalue(), content_type="image/png")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        self.user.refresh_from_db()
+        return self.user.avatar_thumbnails
+
+    def test_thumbnails_are_generated_after_upload(self):
+        """Тест проверки, что после загрузки создаются копии всех ширин и форматов, а API отдает их в srcset."""
+        thumbnails = self.upload_avatar("аватар.png")
+        self.assertEqual(thumbnails["source"], self.user.avatar.name)
+        self.assertEqual(len(thumbnails["renditions"]), 6)
+        for rendition in thumbnails["renditions"]:
+            with default_storage.open(rendition["name"]) as f, Image.open(f) as image:
+                self.assertEqual(image.width, rendition["width"])
+                self.assertEqual(image.format, rendition["format"].upper())
+
+        response = self.client.get(reverse("users:user-detail", args=[self.user.pk]))
+        srcset = response.data["avatar_srcset"]
+        self.assertEqual(set(srcset), {"webp", "jpeg"})
+        self.assertTrue(srcset["webp"].endswith("640w"))
+        self.assertNotIn("avatar_thumbnails", response.data)
+
+        # Копии отдаются так же, как и сам аватар (после проверки доступа)
+        response = self.client.get(reverse("protected-media", args=[thumbnails["renditions"][0]["name"]]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_thumbnails_are_replaced_with_avatar(self):
+        """Тест проверки, что при замене аватара старые копии удаляются, а картинка не увеличивается."""
+        old_thumbnails = self.upload_avatar("first.png")
+        new_thumbnails = self.upload_avatar("second.png", size=(200, 100), color=(0, 0, 255, 255))
+
+        for rendition in old_thumbnails["renditions"]:
+            self.assertFalse(default_storage.exists(rendition["name"]))
+        self.assertEqual({rendition["width"] for rendition in new_thumbnails["renditions"]}, {160})
+
+    def test_shared_thumbnails_are_kept_while_picture_is_used(self):
+        """Тест проверки, что копии одинаковой картинки двух пользователей (одни и те же файлы в
+        ContentAddressedStorage) не удаляются при замене аватара одним из них и по-прежнему отдаются другому."""
+        other_user = CustomUser.objects.create_user(email="thumbnails_2@example.com", password="123qwe")
+        thumbnails = self.upload_avatar("first.png")
+        other_user.avatar = self.user.avatar.name
+        other_user.save(update_fields=["avatar"])
+        rendition_name = thumbnails["renditions"][0]["name"]
+        self.assertTrue(ImageRendition.objects.filter(name=rendition_name, source=thumbnails["source"]).exists())
+
+        self.upload_avatar("second.png", size=(200, 100), color=(0, 0, 255, 255))
+        self.assertTrue(default_storage.exists(rendition_name))
+        self.client.force_authenticate(user=other_user)
+        response = self.client.get(reverse("protected-media", args=[rendition_name]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # Когда картинку заменил и второй пользователь, копии и их связи с картинкой удаляются
+        other_user.avatar = self.user.avatar.name
+        other_user.save(update_fields=["avatar"])
+        delete_thumbnails(default_storage, thumbnails)
+        self.assertFalse(default_storage.exists(rendition_name))
+        self.assertFalse(ImageRendition.objects.filter(source=thumbnails["source"]).exists())
+
+
+class ContentAddressedStorageTestCase(APITestCase):
+    """Тесты, которые будут проверять хранение загруженных файлов под хэшем содержимого
+    (config.storage.ContentAddressedStorage)."""
+
+    def setUp(self):
+        """Метод для подготовки тестовых данных и настроек перед выполнением тестов в тестовом классе."""
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        media_settings = override_settings(MEDIA_ROOT=media_root.name)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+        self.users = [
+            CustomUser.objects.create_user(email=f"storage_{number}@example.com", password="123qwe")
+            for number in range(2)
+        ]
+        for number, user in enumerate(self.users):
+            user.avatar = SimpleUploadedFile(f"Моя аватарка {number}.PNG", b"same-bytes", content_type="image/png")
+            user.save()
+
+    def test_identical_files_are_stored_once(self):
+        """Тест проверки, что одинаковые файлы сохраняются один раз под хэшем содержимого."""
+        digest = hashlib.sha256(b"same-bytes").hexdigest()
+        expected_name = f"user_avatar/{digest[:2]}/{digest}.png"
+        self.assertEqual([user.avatar.name for user in self.users], [expected_name, expected_name])
+        self.assertEqual(default_storage.listdir(f"user_avatar/{digest[:2]}")[1], [f"{digest}.png"])
+
+    def test_content_addressed_files_are_cached_forever(self):
+        """Тест проверки, что файл с именем по хэшу отдается с бессрочным кэшированием в браузере."""
+        self.client.force_authenticate(user=self.users[0])
+        response = self.client.get(reverse("protected-media", args=[self.users[0].avatar.name]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Cache-Control"], "private, max-age=31536000, immutable")
+
+
+class OpenAPISchemaTestCase(APITestCase):
+    """Тесты, которые будут проверять документацию API с готовой схемой OpenAPI (config/openapi.py)."""
+
+    def test_schema_is_served_with_etag(self):
+        """Тест проверки, что схема отдается в формате JSON, а повторный запрос с ETag получает 304."""
+        response = self.client.get(reverse("openapi-schema"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("/api/lesson/", json.loads(response.content)["paths"])
+
+        response = self.client.get(reverse("openapi-schema"), HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_docs_pages_do_not_generate_schema(self):
+        """Тест проверки, что страницы Swagger UI и ReDoc не генерируют схему, а загружают ее с openapi.json."""
+        with patch("drf_yasg.generators.OpenAPISchemaGenerator.get_schema") as get_schema:
+            for name in ("schema-swagger-ui", "schema-redoc"):
+                response = self.client.get(reverse(name))
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertIn(reverse("openapi-schema"), response.content.decode())
+        get_schema.assert_not_called()
+
+    def test_build_command_writes_schema(self):
+        """Тест проверки, что команда build_openapi_schema сохраняет схему в файл."""
+        with tempfile.TemporaryDirectory() as directory:
+            output = f"{directory}/openapi.json"
+            call_command("build_openapi_schema", output=output, stdout=StringIO())
+            with open(output) as f:
+                self.assertIn("/api/courses/", json.load(f)["paths"])
+
+
+class ProfileImportsTestCase(APITestCase):
+    """Тесты, которые будут проверять команду profile_imports и отложенный импорт тяжелых зависимостей."""
+
+    def test_web_process_does_not_import_stripe(self):
+        """Тест проверки, что воркер gunicorn при запуске не импортирует stripe и кодеки drf_yasg (с валидаторами
+        схемы) - они импортируются при первом обращении к Stripe и при генерации схемы."""
+        out = StringIO()
+        call_command("profile_imports", processes=["web"], top=1000, stdout=out)
+        report = out.getvalue()
+        self.assertIn("web: импорт", report)
+        self.assertIn("мс  users.signals", report)
+        self.assertNotIn("мс  stripe", report)
+        self.assertNotIn("мс  drf_yasg.codecs", report)
+
+    def test_warmup_preloads_stripe(self):
+        """Тест проверки, что прогрев мастер-процесса gunicorn загружает stripe, чтобы воркеры получили библиотеку
+        после fork готовой, а не импортировали ее на первом платеже."""
+        with patch("config.warmup.get_pooled_requests_client_class") as get_client_class:
+            warmup_application()
+        get_client_class.assert_called_once_with()
+
+
+class GenerateLoadDataTestCase(APITestCase):
+    """Тесты, которые будут проверять команду generate_load_data (синтетические данные для нагрузочного
+    тестирования)."""
+
+    volumes = {"users": 60, "courses": 6, "lessons": 40, "subscriptions": 150, "payments": 300}
+
+    def generate(self, seed=7):
+        call_command(
+            "generate_load_data", **self.volumes, seed=seed, end_date=date(2025, 6, 30), days=365, batch_size=50,
+            method="bulk", stdout=StringIO(),
+        )
+        return list(
+            Payments.objects.order_by("id").values_list(
+                "user__email", "payment_date", "paid_course__title", "paid_lesson__title", "payment_amount",
+                "payment_method", "payment_status",
+            )
+        )
+
+    def test_generate_load_data(self):
+        """Тест проверки количества строк, связей и распределения дат по периоду."""
+        self.generate()
+        self.assertEqual(CustomUser.objects.count(), 60)
+        self.assertEqual(Course.objects.count(), 6)
+        self.assertEqual(Lesson.objects.count(), 40)
+        self.assertEqual(Subscription.objects.count(), 150)
+        self.assertEqual(Payments.objects.count(), 300)
+        self.assertEqual(
+            Subscription.objects.values("user", "course").distinct().count(), Subscription.objects.count()
+        )
+
+        payments = list(Payments.objects.select_related("user").order_by("id"))
+        dates = [payment.payment_date for payment in payments]
+        self.assertEqual(dates, sorted(dates))
+        self.assertGreaterEqual(dates[0].date(), date(2024, 7, 1))
+        self.assertLessEqual(dates[-1].date(), date(2025, 6, 30))
+        for payment in payments:
+            self.assertLessEqual(payment.user.date_joined, payment.payment_date)
+            self.assertTrue(bool(payment.paid_course_id) != bool(payment.paid_lesson_id))
+        # Сводная таблица выручки пересчитана после загрузки платежей
+        self.assertEqual(
+            sum(PaymentRevenueRollup.objects.values_list("payments_count", flat=True)), Payments.objects.count()
+        )
+
+    def test_generate_load_data_is_reproducible(self):
+        """Тест проверки, что один и тот же seed дает одни и те же данные, а другой seed - другие."""
+        first = self.generate()
+        for model in (Payments, Subscription, Lesson, Course, CustomUser):
+            model.objects.all().delete()
+        self.assertEqual(self.generate(), first)
+
+        for model in (Payments, Subscription, Lesson, Course, CustomUser):
+            model.objects.all().delete()
+        self.assertNotEqual(self.generate(seed=8), first)
@@ -0,0 +1,107 @@
+import time
+
+from django.core.cache import cache, caches
+from django_redis import get_redis_connection
+from django_redis.cache import RedisCache
+from rest_framework.throttling import SimpleRateThrottle
+
+# Lua-скрипт для атомарного списания токена из "ведра" (token bucket) прямо на стороне Redis. Атомарность нужна,
+# потому что запросы одного клиента одновременно обрабатывают разные воркеры gunicorn, и при схеме "прочитал -
+# посчитал - записал" из Python два воркера могли бы списать один и тот же токен.
+# Возвращает {1 или 0 (разрешен ли запрос), сколько секунд ждать до следующего токена (строкой, т.к. Lua
+# обрезает дробные числа при возврате в Redis)}.
+TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local refill_rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local ttl = tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'timestamp')
+local tokens = tonumber(state[1]) or capacity
+local timestamp = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - timestamp) * refill_rate)
+local allowed = 0
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    wait = (1 - tokens) / refill_rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'timestamp', now)
+redis.call('EXPIRE', KEYS[1], ttl)
+return {allowed, tostring(wait)}
+"""
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """Класс-ограничитель частоты запросов (throttling) по алгоритму "ведро с токенами" (token bucket).
+    - В ведре помещается num_requests токенов (допустимый "всплеск" запросов), каждый запрос забирает один токен.
+    - Токены восстанавливаются равномерно: num_requests штук за период (например, "5/min" - 1 токен раз в 12 секунд).
+    - Если токенов нет, то DRF вернет клиенту 429 Too Many Requests с заголовком Retry-After.
+    Настройка per view: в контроллере указывается атрибут "throttle_scope", а частота берется из
+    REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"][throttle_scope]. Если у контроллера нет throttle_scope, то ограничений
+    нет.
+    Настройка per user/IP: для авторизованного пользователя ведро свое у каждого пользователя, а для анонимного -
+    у каждого IP-адреса.
+    Состояние ведер хранится в кэше Django: если кэш в Redis (CACHE_REDIS_URL), то ведра общие для всех воркеров, а
+    иначе - в памяти процесса (LocMemCache)."""
+
+    scope_attr = "throttle_scope"
+    cache_format = "throttle_bucket_%(scope)s_%(ident)s"
+
+    def __init__(self):
+        """Переопределяю __init__(), так как scope (и частота) становятся известны только в allow_request() из
+        контроллера (аналогично ScopedRateThrottle из DRF)."""
+        self.wait_seconds = None
+
+    def allow_request(self, request, view):
+        """Возвращает True, если в ведре клиента есть токен для этого запроса."""
+        self.scope = getattr(view, self.scope_attr, None)
+        if not self.scope:
+            return True
+
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        allowed, self.wait_seconds = self.consume_token(self.key, self.num_requests, self.duration)
+        return allowed
+
+    def get_cache_key(self, request, view):
+        """Формирует ключ ведра: ID пользователя для авторизованных запросов или IP-адрес для анонимных."""
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {"scope": self.scope, "ident": ident}
+
+    def consume_token(self, key, capacity, duration):
+        """Списывает один токен из ведра.
+        :param key: Ключ ведра в кэше.
+        :param capacity: Вместимость ведра (сколько запросов допускается подряд).
+        :param duration: Период в секундах, за который ведро полностью восстанавливается.
+        :return: Кортеж (разрешен ли запрос, сколько секунд ждать до следующего токена).
+        """
+        refill_rate = capacity / duration
+        now = time.time()
+
+        if isinstance(caches["default"], RedisCache):
+            connection = get_redis_connection("default")
+            allowed, wait = connection.eval(
+                TOKEN_BUCKET_LUA, 1, cache.make_key(key), capacity, refill_rate, now, duration
+            )
+            return bool(int(allowed)), float(wait)
+
+        tokens, timestamp = cache.get(key, (capacity, now))
+        tokens = min(capacity, tokens + max(0.0, now - timestamp) * refill_rate)
+        if tokens >= 1:
+            cache.set(key, (tokens - 1, now), duration)
+            return True, 0.0
+        cache.set(key, (tokens, now), duration)
+        return False, (1 - tokens) / refill_rate
+
+    def wait(self):
+        """Возвращает время (в секундах) до появления следующего токена - DRF отдаст его в заголовке Retry-After."""
+        return self.wait_seconds
@@ -0,0 +1,163 @@
+import hashlib
+import logging
+import posixpath
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import Q
+from PIL import Image, ImageOps
+
+from users.models import ImageRendition
+
+logger = logging.getLogger(__name__)
+
+# Параметры сохранения для каждого формата уменьшенных копий (THUMBNAIL_FORMATS)
+THUMBNAIL_SAVE_OPTIONS = {
+    "webp": {"format": "WEBP", "method": 4},
+    "jpeg": {"format": "JPEG", "optimize": True, "progressive": True},
+}
+
+
+def get_thumbnails_field_name(field_name):
+    """Имя JSON-поля модели, в котором хранятся уменьшенные копии картинки из поля field_name
+    (avatar -> avatar_thumbnails, preview -> preview_thumbnails)."""
+    return f"{field_name}_thumbnails"
+
+
+def thumbnails_outdated(instance, field_name):
+    """Проверяет, что уменьшенные копии не соответствуют текущей картинке: картинку загрузили, заменили или удалили.
+    Используется в сигналах post_save, чтобы запускать задачу только после изменения картинки."""
+    thumbnails = getattr(instance, get_thumbnails_field_name(field_name)) or {}
+    return (getattr(instance, field_name).name or "") != thumbnails.get("source", "")
+
+
+def get_thumbnail_name(source_name, width, image_format):
+    """Путь уменьшенной копии: <папка upload_to>/thumbnails/<хэш пути картинки>_<ширина>w.<формат>.
+    В имени только латиница и цифры (в исходном имени могут быть пробелы и кириллица), а новая картинка получает
+    новые имена копий - старые копии можно кэшировать в браузере, не боясь получить устаревшую картинку.
+    ContentAddressedStorage сохраняет копию под хэшем содержимого в этой же папке (<папка>/thumbnails/<хэш>.<формат>).
+    """
+    folder = source_name.split("/", 1)[0] if "/" in source_name else ""
+    digest = hashlib.sha256(source_name.encode()).hexdigest()[:16]
+    extension = "jpg" if image_format == "jpeg" else image_format
+    return posixpath.join(folder, "thumbnails", f"{digest}_{width}w.{extension}")
+
+
+def render_thumbnail(image, width, image_format):
+    """Уменьшает картинку до ширины width (с сохранением пропорций) и возвращает байты файла в формате image_format.
+    У JPEG нет прозрачности, поэтому прозрачный фон заменяется белым."""
+    height = max(1, round(image.height * width / image.width))
+    thumbnail = image.resize((width, height), Image.Resampling.LANCZOS)
+    if image_format == "jpeg" and thumbnail.mode != "RGB":
+        rgba = thumbnail.convert("RGBA")
+        thumbnail = Image.new("RGB", rgba.size, (255, 255, 255))
+        thumbnail.paste(rgba, mask=rgba.getchannel("A"))
+    elif thumbnail.mode not in ("RGB", "RGBA"):
+        thumbnail = thumbnail.convert("RGBA")
+
+    buffer = BytesIO()
+    thumbnail.save(buffer, quality=settings.THUMBNAIL_QUALITY, **THUMBNAIL_SAVE_OPTIONS[image_format])
+    return buffer.getvalue()
+
+
+def create_thumbnails(file):
+    """Создает уменьшенные копии картинки для каждой ширины из THUMBNAIL_WIDTHS и каждого формата из
+    THUMBNAIL_FORMATS. Ширины больше исходной пропускаются (картинка не увеличивается), но если исходная картинка
+    уже всех ширин, создается одна копия ее ширины. Связь копий с картинкой записывается в ImageRendition
+    (для проверки доступа к копиям, users.media -> is_media_referenced).
+    :param file: Файл картинки из ImageField (FieldFile).
+    :return: Словарь {"source": путь картинки, "renditions": [{"width", "format", "name"}, ...]}.
+    """
+    with file.open("rb"), Image.open(file) as original:
+        # Поворот по EXIF (фото с телефона), после resize метаданные EXIF не сохраняются
+        image = ImageOps.exif_transpose(original)
+        image.load()
+
+    widths = [width for width in sorted(settings.THUMBNAIL_WIDTHS) if width < image.width] or [image.width]
+    renditions = []
+    for width in widths:
+        for image_format in settings.THUMBNAIL_FORMATS:
+            content = render_thumbnail(image, width, image_format)
+            name = file.storage.save(get_thumbnail_name(file.name, width, image_format), ContentFile(content))
+            renditions.append({"width": width, "format": image_format, "name": name})
+    ImageRendition.objects.bulk_create(
+        [ImageRendition(name=rendition["name"], source=file.name) for rendition in renditions],
+        ignore_conflicts=True,
+    )
+    return {"source": file.name, "renditions": renditions}
+
+
+def delete_thumbnails(storage, thumbnails, keep=()):
+    """Удаляет файлы уменьшенных копий из хранилища, если на них больше не ссылается ни один объект: хранилище
+    config.storage.ContentAddressedStorage сохраняет одинаковые файлы один раз, и одна копия может принадлежать
+    нескольким объектам (одна картинка в превью многих уроков).
+    - Если исходная картинка все еще загружена в другой объект, то ее копии нужны ему - ничего не удаляется.
+    - Иначе удаляются связи копий с этой картинкой (ImageRendition), а файл копии удаляется, если он не является
+    копией другой используемой картинки.
+    :param keep: Имена файлов, которые нельзя удалять (новые копии этого же объекта).
+    """
+    # users.media импортирует этот модуль, поэтому импорт внутри функции
+    from users.media import is_media_referenced
+
+    thumbnails = thumbnails or {}
+    names = [rendition["name"] for rendition in thumbnails.get("renditions", []) if rendition["name"] not in keep]
+    if not names or is_media_referenced(thumbnails["source"]):
+        return
+    ImageRendition.objects.filter(source=thumbnails["source"]).delete()
+    for name in names:
+        if not is_media_referenced(name):
+            storage.delete(name)
+
+
+def update_thumbnails(instance, field_name):
+    """Пересоздает уменьшенные копии картинки объекта (задача users.tasks.task_generate_thumbnails).
+    - Для пустого поля копии не создаются.
+    - Копии записываются через update() только если картинка объекта не изменилась, пока создавались копии.
+    Иначе новые копии удаляются - для новой картинки уже поставлена своя задача.
+    - После записи удаляются старые копии, на которые больше никто не ссылается.
+    - update() не вызывает post_save, поэтому задача не запускается повторно.
+    :return: Сохраненный словарь уменьшенных копий или None, если картинка изменилась.
+    """
+    file = getattr(instance, field_name)
+    thumbnails_field_name = get_thumbnails_field_name(field_name)
+    old_thumbnails = getattr(instance, thumbnails_field_name)
+
+    thumbnails = {}
+    if file:
+        try:
+            thumbnails = create_thumbnails(file)
+        except OSError as e:
+            # Файла нет или это не картинка - копий не будет, но и повторять задачу бессмысленно
+            logger.warning(f"Не удалось создать уменьшенные копии {file.name}: {e}")
+            thumbnails = {"source": file.name, "renditions": []}
+
+    queryset = type(instance)._default_manager.filter(pk=instance.pk)
+    if file:
+        queryset = queryset.filter(**{field_name: file.name})
+    else:
+        queryset = queryset.filter(Q(**{field_name: ""}) | Q(**{f"{field_name}__isnull": True}))
+    if not queryset.update(**{thumbnails_field_name: thumbnails}):
+        delete_thumbnails(file.storage, thumbnails)
+        return None
+    new_names = {rendition["name"] for rendition in thumbnails.get("renditions", [])}
+    delete_thumbnails(file.storage, old_thumbnails, keep=new_names)
+    setattr(instance, thumbnails_field_name, thumbnails)
+    return thumbnails
+
+
+def build_srcset(thumbnails, request=None):
+    """Значение для атрибута srcset тега <img> / <source> по каждому формату:
+    {"webp": "<url> 160w, <url> 320w", "jpeg": "..."}. Браузер сам выбирает копию нужной ширины.
+    :param thumbnails: Словарь уменьшенных копий из JSON-поля модели.
+    :param request: Запрос для абсолютных адресов (как у ImageField в DRF).
+    :return: Словарь srcset по форматам или None, если копий нет (картинку не загрузили или копии еще создаются).
+    """
+    srcset = {}
+    for rendition in (thumbnails or {}).get("renditions", []):
+        url = default_storage.url(rendition["name"])
+        if request is not None:
+            url = request.build_absolute_uri(url)
+        srcset.setdefault(rendition["format"], []).append(f"{url} {rendition['width']}w")
+    return {image_format: ", ".join(items) for image_format, items in srcset.items()} or None
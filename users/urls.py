@@ -5,11 +5,15 @@ from users.views import (
     CustomTokenObtainPairView,
     CustomUserCreateAPIView,
     CustomUserDestroyAPIView,
+    CustomUserImportAPIView,
+    CustomUserImportStatusAPIView,
     CustomUserListAPIView,
     CustomUserRetrieveUpdateAPIView,
+    PaymentRevenueListAPIView,
     PaymentsListCreateAPIView,
     PaymentsRetrieveUpdateDestroyAPIView,
     StripePaymentStatusAPIView,
+    StripeWebhookAPIView,
 )
 
 app_name = "users"
@@ -19,9 +23,13 @@ urlpatterns = [
     path("token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
     path("register/", CustomUserCreateAPIView.as_view(), name="user-register"),
     path("users/", CustomUserListAPIView.as_view(), name="user-list"),
+    path("users/import/", CustomUserImportAPIView.as_view(), name="user-import"),
+    path("users/import/<int:pk>/", CustomUserImportStatusAPIView.as_view(), name="user-import-status"),
     path("users/<int:pk>/", CustomUserRetrieveUpdateAPIView.as_view(), name="user-detail"),
     path("users/<int:pk>/delete/", CustomUserDestroyAPIView.as_view(), name="user-delete"),
     path("payment/", PaymentsListCreateAPIView.as_view(), name="payment-list-create"),
+    path("payment/revenue/", PaymentRevenueListAPIView.as_view(), name="payment-revenue"),
+    path("payment/webhook/", StripeWebhookAPIView.as_view(), name="payment-webhook"),
     path("payment/<int:pk>/", PaymentsRetrieveUpdateDestroyAPIView.as_view(), name="payment-detail-delete"),
     path("payment/<int:pk>/status/", StripePaymentStatusAPIView.as_view(), name="payment-check-status"),
 ]
@@ -1,25 +1,39 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch, Sum
+from django.urls import reverse
 from django_filters.rest_framework import DjangoFilterBackend
 
 from rest_framework import generics, serializers
 from rest_framework import status as drf_status
 from rest_framework.views import APIView
 from rest_framework.filters import OrderingFilter
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.parsers import MultiPartParser
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework_simplejwt.views import TokenObtainPairView
 
-from users.models import CustomUser, Payments
+from users.async_views import AsyncAPIViewMixin
+from users.idempotency import IdempotentCreateMixin
+from users.media import build_media_response, is_media_referenced
+from users.models import CustomUser, PaymentRevenueRollup, Payments, UserImportJob
+from users.paginators import PaymentsCursorPagination
 from users.serializers import (
     CustomObtainPairSerializer,
+    CustomUserImportSerializer,
     CustomUserSerializer,
+    PaymentRevenueSerializer,
     PaymentsSerializer,
+    UserImportJobSerializer,
 )
 from users.services import (
-    create_stripe_price,
-    create_stripe_product,
-    create_stripe_session,
+    apply_stripe_webhook_event,
+    construct_stripe_webhook_event,
+    create_stripe_checkout,
     get_stripe_payment_status,
 )
+from users.tasks import task_create_stripe_checkout, task_import_users
 
 
 class CustomUserListAPIView(generics.ListAPIView):
@@ -27,7 +41,11 @@ class CustomUserListAPIView(generics.ListAPIView):
     Доступно: аутентифицированным пользователям."""
 
     permission_classes = [IsAuthenticated]
-    queryset = CustomUser.objects.all()
+    # Платежи всех пользователей списка (с Курсами и Уроками) загружаются одним дополнительным SQL-запросом,
+    # а не отдельным запросом на каждого пользователя
+    queryset = CustomUser.objects.prefetch_related(
+        Prefetch("payments", queryset=Payments.objects.select_related("paid_course", "paid_lesson"))
+    ).all()
     serializer_class = CustomUserSerializer
 
 
@@ -38,6 +56,44 @@ class CustomUserCreateAPIView(generics.CreateAPIView):
     permission_classes = [AllowAny]
     queryset = CustomUser.objects.all()
     serializer_class = CustomUserSerializer
+    # Ограничение частоты регистраций (каждый запрос - это хэширование пароля), см. users/throttles.py
+    throttle_scope = "register"
+
+
+class CustomUserImportAPIView(APIView):
+    """Класс-контроллер на основе низкоуровневого APIView для массового импорта пользователей из CSV-файла
+    (например, корпоративной группы студентов). Запрос только сохраняет файл в задании UserImportJob и ставит
+    задачу Celery task_import_users в отдельную очередь (USER_IMPORT_QUEUE): хэширование тысяч паролей занимает
+    минуты и не должно выполняться в воркере gunicorn (GUNICORN_TIMEOUT). Статус и отчет задания - в
+    CustomUserImportStatusAPIView.
+    Доступно: только сотрудникам (is_staff)."""
+
+    permission_classes = [IsAdminUser]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request):
+        """Принимает CSV-файл в поле "file" (multipart/form-data), создает задание на импорт и возвращает
+        202 Accepted с ID задания (ссылка на статус - в заголовке Location)."""
+        serializer = CustomUserImportSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        job = UserImportJob.objects.create(file=serializer.validated_data["file"], created_by=request.user)
+        # Задача ставится в очередь после фиксации транзакции, чтобы воркер точно увидел задание и файл
+        transaction.on_commit(lambda: task_import_users.delay(job.pk))
+        return Response(
+            UserImportJobSerializer(job).data,
+            status=drf_status.HTTP_202_ACCEPTED,
+            headers={"Location": reverse("users:user-import-status", args=[job.pk])},
+        )
+
+
+class CustomUserImportStatusAPIView(generics.RetrieveAPIView):
+    """Класс-контроллер на основе базового Generic-класса для получения статуса и отчета задания на импорт
+    пользователей: pending / running / done (отчет: сколько создано, сколько пропущено и почему) / failed.
+    Доступно: только сотрудникам (is_staff)."""
+
+    permission_classes = [IsAdminUser]
+    queryset = UserImportJob.objects.all()
+    serializer_class = UserImportJobSerializer
 
 
 class CustomUserRetrieveUpdateAPIView(generics.RetrieveUpdateAPIView):
@@ -47,8 +103,11 @@ class CustomUserRetrieveUpdateAPIView(generics.RetrieveUpdateAPIView):
     2) Редактировать профиль пользователя может только сам пользователь."""
 
     # Оптимизация работы - использование prefetch_related("payments"), что подтянет платежи одним SQL-запросом.
-    # Это ускорит загрузку профиля, потому что платежи загрузятся за один SQL-запрос.
-    queryset = CustomUser.objects.prefetch_related("payments").all()
+    # Это ускорит загрузку профиля, потому что платежи загрузятся за один SQL-запрос (вместе с Курсами и Уроками
+    # для названий оплаченных продуктов).
+    queryset = CustomUser.objects.prefetch_related(
+        Prefetch("payments", queryset=Payments.objects.select_related("paid_course", "paid_lesson"))
+    ).all()
     serializer_class = CustomUserSerializer
     permission_classes = [IsAuthenticated]
 
@@ -84,15 +143,21 @@ class CustomTokenObtainPairView(TokenObtainPairView):
 
     permission_classes = [AllowAny]
     serializer_class = CustomObtainPairSerializer
+    # Ограничение частоты попыток входа (каждый запрос - это проверка хэша пароля), см. users/throttles.py
+    throttle_scope = "login"
 
 
-class PaymentsListCreateAPIView(generics.ListCreateAPIView):
+class PaymentsListCreateAPIView(IdempotentCreateMixin, generics.ListCreateAPIView):
     """Класс-контроллер на основе базового Generic-класса для получения списка платежей и создания нового платежа:
         - GET: Возвращает список всех платежей пользователя.
         - POST: Создаёт платёж на продукт (Course или Lesson) и генерирует ссылку на оплату через Stripe.
     Важно:
     - Поля Stripe ("stripe_product_id", "stripe_price_id", "stripe_session_id", "payment_url") заполняются автоматом.
     - Пользователь подставляется из "request.user".
+    - POST с заголовком Idempotency-Key идемпотентен: повтор возвращает первый ответ (см. users/idempotency.py).
+    - Контроллер синхронный: list() / create() (фильтры, пагинация, ключ идемпотентности, запросы в Stripe) целиком
+    синхронные, и обертка async def + sync_to_async ничего не дает - под ASGI Django сам выполняет синхронный
+    контроллер в потоке. Чтобы запрос не ждал Stripe, есть режим STRIPE_CHECKOUT_ASYNC (задача Celery).
     """
 
     queryset = Payments.objects.all()
@@ -111,17 +176,31 @@ class PaymentsListCreateAPIView(generics.ListCreateAPIView):
     )
     # Сортировка по дате оплаты
     ordering_fields = ["payment_date"]
+    # Пагинация по курсору (payment_date, id) - длинная история платежей читается страницами по индексу
+    pagination_class = PaymentsCursorPagination
+    # Ограничение частоты создания платежей (каждый платеж - это запросы в Stripe), см. users/throttles.py
+    throttle_scope = "payment"
+
+    def get_throttles(self):
+        """Ограничение частоты применяется только к созданию платежа (POST), а получение списка (GET) не ограничено."""
+        if self.request.method == "POST":
+            return super().get_throttles()
+        return []
 
     def get_queryset(self):
-        """Метод ограничивает список платежей только платежами текущего пользователя при выполнении GET-запроса."""
-        return Payments.objects.filter(user=self.request.user)
+        """Метод ограничивает список платежей только платежами текущего пользователя при выполнении GET-запроса.
+        Курс и Урок (для их названий в ответе) подгружаются тем же SQL-запросом через select_related."""
+        return Payments.objects.filter(user=self.request.user).select_related("paid_course", "paid_lesson")
 
     def perform_create(self, serializer):
         """Создание платежа с интеграцией к платёжной системе Stripe (если указан соответствующий payment_method).
         - Создаётся продукт в Stripe (по .title в объекте продукта);
         - Создаётся цена (в копейках);
         - Создаётся сессия оплаты и сохраняется "payment_url".
-        - Все поля Stripe сохраняются в объект Payments."""
+        - Все поля Stripe сохраняются в объект Payments.
+        В асинхронном режиме (STRIPE_CHECKOUT_ASYNC=True) платеж сразу сохраняется со статусом "pending", а объекты
+        в Stripe создает Celery-задача task_create_stripe_checkout. Клиент получает "payment_url", когда опрашивает
+        статус платежа (/payment/<pk>/status/)."""
         user = self.request.user
         paid_course = serializer.validated_data.get("paid_course")
         paid_lesson = serializer.validated_data.get("paid_lesson")
@@ -131,16 +210,20 @@ class PaymentsListCreateAPIView(generics.ListCreateAPIView):
         # 1) Stripe-интеграция нужна только если указан метод оплаты "=transfer"
         if payment_method == "transfer":
 
-            # Интеграция со Stripe
-            if paid_course:
-                product_id = create_stripe_product(paid_course)
-            elif paid_lesson:
-                product_id = create_stripe_product(paid_lesson)
-            else:
+            if not paid_course and not paid_lesson:
                 raise serializers.ValidationError("Не указан оплачиваемый Курс или Урок.")
 
-            price_id = create_stripe_price(product_id, payment_amount)
-            session_id, session_url = create_stripe_session(price_id)
+            # Асинхронный режим: запрос клиента не ждет ответов от Stripe
+            if settings.STRIPE_CHECKOUT_ASYNC:
+                payment = serializer.save(user=user, payment_status=Payments.CHECKOUT_PENDING)
+                # Задачу запускаю только после фиксации транзакции, иначе воркер Celery может не найти платеж в БД
+                transaction.on_commit(lambda: task_create_stripe_checkout.delay(payment.pk))
+                return
+
+            # Интеграция со Stripe
+            product_id, price_id, session_id, session_url = create_stripe_checkout(
+                paid_course or paid_lesson, payment_amount
+            )
 
             # Сохранение результатов в БД
             serializer.save(
@@ -163,27 +246,111 @@ class PaymentsRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView
     serializer_class = PaymentsSerializer
 
 
-class StripePaymentStatusAPIView(APIView):
-    """Проверка статуса оплаты по session_id (или payment_id)."""
+class PaymentRevenueListAPIView(generics.ListAPIView):
+    """Класс-контроллер на основе базового Generic-класса для отчета о выручке по дням, продуктам (Курс / Урок) и
+    методам платежа. Читает заранее посчитанную сводную таблицу PaymentRevenueRollup, а не таблицу платежей.
+    Доступно: только сотрудникам (is_staff).
+    Фильтры: day__gte / day__lte (период), paid_course, paid_lesson, payment_method."""
+
+    permission_classes = [IsAdminUser]
+    serializer_class = PaymentRevenueSerializer
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = {
+        "day": ["gte", "lte"],
+        "paid_course": ["exact"],
+        "paid_lesson": ["exact"],
+        "payment_method": ["exact"],
+    }
+
+    def get_queryset(self):
+        """Строки сводной таблицы с одинаковым ключом (например, после удаления продукта) суммируются в запросе."""
+        return (
+            PaymentRevenueRollup.objects.values(
+                "day", "paid_course", "paid_course__title", "paid_lesson", "paid_lesson__title", "payment_method"
+            )
+            .annotate(
+                payments_count=Sum("payments_count"),
+                total_amount=Sum("total_amount"),
+                paid_count=Sum("paid_count"),
+                paid_amount=Sum("paid_amount"),
+            )
+            .order_by("day", "paid_course", "paid_lesson", "payment_method")
+        )
+
+
+class StripePaymentStatusAPIView(AsyncAPIViewMixin, APIView):
+    """Проверка статуса оплаты по session_id (или payment_id). Контроллер асинхронный (см. users/async_views.py):
+    платеж читается и сохраняется асинхронным ORM, а запрос в Stripe не блокирует цикл событий."""
+
+    # Ограничение частоты проверок статуса (каждый запрос - это обращение в Stripe), см. users/throttles.py
+    throttle_scope = "payment_status"
 
-    def get(self, request, pk):
-        """Возвращает статус платежа из Stripe."""
+    async def get(self, request, pk):
+        """Возвращает статус платежа.
+        - Если настроены webhook-события Stripe (STRIPE_WEBHOOK_SECRET), то статус актуализирует
+        StripeWebhookAPIView, и тут только чтение из БД без обращения к Stripe.
+        - Иначе статус запрашивается в Stripe и сохраняется в БД."""
         try:
-            payment = Payments.objects.get(pk=pk, user=request.user)
+            payment = await Payments.objects.aget(pk=pk, user=request.user)
+
+            # Асинхронный режим: ссылка на оплату еще создается (или не была создана), в Stripe идти не нужно
+            if payment.payment_status in (Payments.CHECKOUT_PENDING, Payments.CHECKOUT_FAILED):
+                return Response({"payment_status": payment.payment_status, "payment_url": payment.payment_url})
+
             if not payment.stripe_session_id:
                 return Response({"detail": "Платёж не связан с Stripe-сессией."}, status=400)
 
+            # Статус обновляется webhook-событиями, поэтому достаточно прочитать его из БД
+            if settings.STRIPE_WEBHOOK_SECRET:
+                return Response({"payment_status": payment.payment_status, "payment_url": payment.payment_url})
+
             # Получаю статус из Stripe
-            payment_status = get_stripe_payment_status(payment.stripe_session_id)
+            payment_status = await sync_to_async(get_stripe_payment_status)(payment.stripe_session_id)
 
             # Обновляю в БД статус (опционально)
             payment.payment_status = payment_status
-            payment.save(update_fields=["payment_status"])
+            await payment.asave(update_fields=["payment_status"])
 
-            return Response({"payment_status": payment_status})
+            return Response({"payment_status": payment_status, "payment_url": payment.payment_url})
 
         except Payments.DoesNotExist:
             return Response({"detail": "Платёж не найден."}, status=404)
 
         except Exception as e:
             return Response({"detail": str(e)}, status=drf_status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class StripeWebhookAPIView(APIView):
+    """Класс-контроллер на основе низкоуровневого APIView для приема webhook-событий от Stripe
+    (checkout.session.completed, checkout.session.async_payment_succeeded и т.д.).
+    Доступно: всем (запрос аутентифицируется подписью Stripe-Signature, а не JWT-токеном)."""
+
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        """Проверяет подпись события, обновляет статус платежа и отвечает Stripe 200, чтобы он не повторял
+        доставку. Повторно доставленные события не обрабатываются второй раз."""
+        if not settings.STRIPE_WEBHOOK_SECRET:
+            return Response({"detail": "Webhook-события Stripe не настроены."}, status=drf_status.HTTP_404_NOT_FOUND)
+
+        try:
+            event = construct_stripe_webhook_event(request.body, request.META.get("HTTP_STRIPE_SIGNATURE", ""))
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=drf_status.HTTP_400_BAD_REQUEST)
+
+        processed = apply_stripe_webhook_event(event)
+        return Response({"processed": processed})
+
+
+class ProtectedMediaAPIView(APIView):
+    """Класс-контроллер на основе низкоуровневого APIView для выдачи загруженных файлов (аватары пользователей,
+    превью курсов и уроков) по адресу MEDIA_URL (/media/<путь>).
+    Доступно: аутентифицированным пользователям и только для файлов, загруженных в поле существующего объекта
+    (users/media.py). Сам файл за nginx отдает nginx по заголовку X-Accel-Redirect."""
+
+    def get(self, request, path):
+        """Проверяет доступ к файлу и возвращает ответ с файлом (или 404)."""
+        if not is_media_referenced(path):
+            return Response({"detail": "Файл не найден."}, status=drf_status.HTTP_404_NOT_FOUND)
+        return build_media_response(path)